@@ -11,7 +11,9 @@ import logger
 from jose import jwk, jwt
 from jose.utils import base64url_decode
 import auth_manager
+import authorizer_layer
 import utils
+from jwks_cache import JwksCache
 
 region = os.environ['AWS_REGION']
 # sts_client = boto3.client("sts", region_name=region)
@@ -20,6 +22,7 @@ table_tenant_details = dynamodb.Table('MLaaS-TenantDetails')
 user_pool_operation_user = os.environ['OPERATION_USERS_USER_POOL']
 app_client_operation_user = os.environ['OPERATION_USERS_APP_CLIENT']
 # api_key_operation_user = os.environ['OPERATION_USERS_API_KEY']
+jwks_cache = JwksCache(region)
 
 def lambda_handler(event, context):
     
@@ -42,14 +45,11 @@ def lambda_handler(event, context):
         logger.error('Unauthorized: Only SaaS provider can invoke this API')
         raise Exception('Unauthorized')
 
-    #get keys for tenant user pool to validate
-    keys_url = 'https://cognito-idp.{}.amazonaws.com/{}/.well-known/jwks.json'.format(region, userpool_id)
-    with urllib.request.urlopen(keys_url) as f:
-        response = f.read()
-    keys = json.loads(response.decode('utf-8'))['keys']
+    #get keys for tenant user pool to validate, cached across warm invocations
+    keys = jwks_cache.key_resolver(userpool_id)
 
     #authenticate against cognito user pool using the key
-    response = validateJWT(jwt_bearer_token, appclient_id, keys)
+    response = authorizer_layer.validateJWT(jwt_bearer_token, appclient_id, keys)
     
     #get authenticated claims
     if (response == False):
@@ -92,47 +92,6 @@ def lambda_handler(event, context):
     
     return authResponse
 
-def validateJWT(token, app_client_id, keys):
-    # get the kid from the headers prior to verification
-    headers = jwt.get_unverified_headers(token)
-    kid = headers['kid']
-    # search for the kid in the downloaded public keys
-    key_index = -1
-    for i in range(len(keys)):
-        if kid == keys[i]['kid']:
-            key_index = i
-            break
-    if key_index == -1:
-        logger.info('Public key not found in jwks.json')
-        return False
-    # construct the public key
-    public_key = jwk.construct(keys[key_index])
-    # get the last two sections of the token,
-    # message and signature (encoded in base64)
-    message, encoded_signature = str(token).rsplit('.', 1)
-    # decode the signature
-    decoded_signature = base64url_decode(encoded_signature.encode('utf-8'))
-    # verify the signature
-    if not public_key.verify(message.encode("utf8"), decoded_signature):
-        logger.info('Signature verification failed')
-        return False
-    logger.info('Signature successfully verified')
-    # since we passed the verification, we can now safely
-    # use the unverified claims
-    claims = jwt.get_unverified_claims(token)
-    # additionally we can verify the token expiration
-    if time.time() > claims['exp']:
-        logger.info('Token is expired')
-        return False
-    # and the Audience  (use claims['client_id'] if verifying an access token)
-    if claims['aud'] != app_client_id:
-        logger.info('Token was not issued for this audience')
-        return False
-    # now we can use the claims
-    logger.info(claims)
-    return claims
-
-
 class HttpVerb:
     GET     = "GET"
     POST    = "POST"
@@ -2,31 +2,74 @@
 # SPDX-License-Identifier: MIT-0
 from jose import jwk, jwt
 from jose.utils import base64url_decode
+import hashlib
+import os
+import threading
 import time
 import logger
 import re
-from collections import namedtuple
+from collections import OrderedDict, namedtuple
 
 SessionParameters = namedtuple(
     typename="SessionParameters",
     field_names=["aws_access_key_id", "aws_secret_access_key", "aws_session_token"],
 )
 
+class VerifiedTokenCache:
+    """Bounded LRU of claims for tokens whose signature was already verified, keyed by
+    a hash of the whole token so a tampered token never matches. Entries are only
+    served until the token's exp."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._claims = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token_hash):
+        with self._lock:
+            claims = self._claims.get(token_hash)
+            if claims is not None and time.time() <= claims['exp']:
+                self._claims.move_to_end(token_hash)
+                self.hits += 1
+                return claims
+            self._claims.pop(token_hash, None)
+            self.misses += 1
+            return None
+
+    def put(self, token_hash, claims):
+        with self._lock:
+            self._claims[token_hash] = claims
+            self._claims.move_to_end(token_hash)
+            while len(self._claims) > self.max_size:
+                self._claims.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._claims.clear()
+
+verified_token_cache = VerifiedTokenCache(int(os.getenv("VERIFIED_TOKEN_CACHE_MAX_SIZE", "1024")))
+
 def validateJWT(token, app_client_id, keys):
+    """keys is either the downloaded jwks.json key list or a kid -> public key
+    callable such as jwks_cache.JwksCache.key_resolver"""
+    # tokens reused across calls skip signature verification until they expire
+    token_hash = hashlib.sha256(str(token).encode('utf-8')).hexdigest()
+    claims = verified_token_cache.get(token_hash)
+    if claims is not None:
+        if claims['aud'] != app_client_id:
+            logger.info('Token was not issued for this audience')
+            return False
+        logger.info('Token verified from cache')
+        return claims
     # get the kid from the headers prior to verification
     headers = jwt.get_unverified_headers(token)
     kid = headers['kid']
-    # search for the kid in the downloaded public keys
-    key_index = -1
-    for i in range(len(keys)):
-        if kid == keys[i]['kid']:
-            key_index = i
-            break
-    if key_index == -1:
+    public_key = get_public_key(keys, kid)
+    if public_key is None:
         logger.info('Public key not found in jwks.json')
         return False
-    # construct the public key
-    public_key = jwk.construct(keys[key_index])
     # get the last two sections of the token,
     # message and signature (encoded in base64)
     message, encoded_signature = str(token).rsplit('.', 1)
@@ -50,8 +93,18 @@ def validateJWT(token, app_client_id, keys):
         return False
     # now we can use the claims
     logger.info(claims)
+    verified_token_cache.put(token_hash, claims)
     return claims    
 
+def get_public_key(keys, kid):
+    if callable(keys):
+        return keys(kid)
+    # search for the kid in the downloaded public keys and construct it
+    for key in keys:
+        if kid == key['kid']:
+            return jwk.construct(key)
+    return None
+
 class HttpVerb:
     GET = "GET"
     POST = "POST"
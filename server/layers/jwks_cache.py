@@ -0,0 +1,120 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+import os
+import threading
+import time
+import urllib.request
+from jose import jwk
+import logger
+
+JWKS_URL = 'https://cognito-idp.{}.amazonaws.com/{}/.well-known/jwks.json'
+
+DEFAULT_TTL_SECONDS = int(os.getenv("JWKS_CACHE_TTL_SECONDS", "3600"))
+DEFAULT_STALE_TTL_SECONDS = int(os.getenv("JWKS_CACHE_STALE_TTL_SECONDS", "86400"))
+DEFAULT_MIN_REFRESH_INTERVAL_SECONDS = int(os.getenv("JWKS_MIN_REFRESH_INTERVAL_SECONDS", "60"))
+FETCH_TIMEOUT_SECONDS = 3
+
+
+def fetch_jwks(region, userpool_id):
+    """Downloads the JSON Web Key Set of a Cognito user pool"""
+    keys_url = JWKS_URL.format(region, userpool_id)
+    with urllib.request.urlopen(keys_url, timeout=FETCH_TIMEOUT_SECONDS) as f:
+        response = f.read()
+    return json.loads(response.decode('utf-8'))['keys']
+
+
+class UserPoolKeySet:
+    """Public keys of one user pool, constructed once and indexed by kid"""
+
+    def __init__(self, keys):
+        self.public_keys = {key['kid']: jwk.construct(key) for key in keys}
+        self.fetched_at = time.monotonic()
+
+
+class JwksCache:
+    """Per user pool JWKS cache held across warm invocations.
+
+    A key set younger than ttl_seconds is served as is. Between ttl_seconds and
+    stale_ttl_seconds it is still served while a background thread refreshes it, so a
+    Cognito hiccup does not stall authorization. An unknown kid forces a refresh, at
+    most once every min_refresh_interval_seconds per user pool, so tokens carrying
+    random kids cannot turn the authorizer into a JWKS download loop.
+    """
+
+    def __init__(self, region, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 stale_ttl_seconds=DEFAULT_STALE_TTL_SECONDS,
+                 min_refresh_interval_seconds=DEFAULT_MIN_REFRESH_INTERVAL_SECONDS,
+                 fetch_keys=fetch_jwks):
+        self.region = region
+        self.ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self.min_refresh_interval_seconds = min_refresh_interval_seconds
+        self.fetch_keys = fetch_keys
+        self.fetch_count = 0
+        self._key_sets = {}
+        self._last_refresh_attempt = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get_public_key(self, userpool_id, kid):
+        """Returns the constructed public key for kid, or None if the pool does not publish it"""
+        key_set = self._key_sets.get(userpool_id)
+        if key_set is None:
+            key_set = self.refresh(userpool_id)
+        else:
+            age = time.monotonic() - key_set.fetched_at
+            if age > self.stale_ttl_seconds:
+                key_set = self.refresh(userpool_id)
+            elif age > self.ttl_seconds:
+                self._refresh_in_background(userpool_id)
+
+        public_key = key_set.public_keys.get(kid)
+        if public_key is None and self._may_refresh(userpool_id):
+            logger.info(f'Unknown kid {kid}, refreshing JWKS for {userpool_id}')
+            key_set = self._refresh_or_stale(userpool_id, key_set)
+            public_key = key_set.public_keys.get(kid)
+        return public_key
+
+    def key_resolver(self, userpool_id):
+        """Returns a kid -> public key callable for authorizer_layer.validateJWT"""
+        return lambda kid: self.get_public_key(userpool_id, kid)
+
+    def refresh(self, userpool_id):
+        with self._lock:
+            self._last_refresh_attempt[userpool_id] = time.monotonic()
+        key_set = UserPoolKeySet(self.fetch_keys(self.region, userpool_id))
+        with self._lock:
+            self._key_sets[userpool_id] = key_set
+            self.fetch_count += 1
+        return key_set
+
+    def _refresh_or_stale(self, userpool_id, key_set):
+        try:
+            return self.refresh(userpool_id)
+        except Exception as e:
+            logger.error(f'Error refreshing JWKS for {userpool_id}, serving stale keys: {e}')
+            return key_set
+
+    def _may_refresh(self, userpool_id):
+        with self._lock:
+            last_attempt = self._last_refresh_attempt.get(userpool_id, 0)
+            return time.monotonic() - last_attempt >= self.min_refresh_interval_seconds
+
+    def _refresh_in_background(self, userpool_id):
+        with self._lock:
+            if userpool_id in self._refreshing:
+                return
+            self._refreshing.add(userpool_id)
+
+        def run():
+            try:
+                self.refresh(userpool_id)
+            except Exception as e:
+                logger.error(f'Background JWKS refresh failed for {userpool_id}: {e}')
+            finally:
+                with self._lock:
+                    self._refreshing.discard(userpool_id)
+
+        threading.Thread(target=run, daemon=True).start()
@@ -16,7 +16,20 @@ def record_metric(event, metric_name, metric_unit, metric_value):
         metric_unit ([type]): [description]
         metric_value ([type]): [description]
     """
-    metrics.add_dimension(name="tenant_id", value=event['requestContext']['authorizer']['tenantId'])
+    record_tenant_metric(event['requestContext']['authorizer']['tenantId'], metric_name, metric_unit, metric_value)
+
+
+def record_tenant_metric(tenant_id, metric_name, metric_unit, metric_value):
+    """ Record the metric in Cloudwatch using EMF format, for callers that have the
+    tenant id but no API Gateway request context (authorizers, event driven functions)
+
+    Args:
+        tenant_id ([type]): [description]
+        metric_name ([type]): [description]
+        metric_unit ([type]): [description]
+        metric_value ([type]): [description]
+    """
+    metrics.add_dimension(name="tenant_id", value=tenant_id)
     metrics.add_metric(name=metric_name, unit=metric_unit, value=metric_value)
     metrics_object = metrics.serialize_metric_set()
     metrics.clear_metrics()
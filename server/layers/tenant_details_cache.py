@@ -0,0 +1,76 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL_SECONDS = int(os.getenv("TENANT_DETAILS_CACHE_TTL_SECONDS", "60"))
+DEFAULT_NEGATIVE_TTL_SECONDS = int(os.getenv("TENANT_DETAILS_CACHE_NEGATIVE_TTL_SECONDS", "10"))
+DEFAULT_MAX_SIZE = int(os.getenv("TENANT_DETAILS_CACHE_MAX_SIZE", "256"))
+
+
+class TenantDetailsCache:
+    """Read-through cache of MLaaS-TenantDetails items held across warm invocations.
+
+    Items are kept for ttl_seconds and evicted least recently used beyond max_size.
+    Unknown tenants are cached as None for negative_ttl_seconds so that a burst of
+    requests for a deleted tenant does not hammer the table.
+    When version_attribute is set, get() refetches an item whose cached version is
+    older than the min_version the caller already knows about.
+    """
+
+    def __init__(self, table, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 negative_ttl_seconds=DEFAULT_NEGATIVE_TTL_SECONDS,
+                 max_size=DEFAULT_MAX_SIZE, version_attribute=None):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_size = max_size
+        self.version_attribute = version_attribute
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id, min_version=None):
+        """Returns the tenant item, or None if the tenant does not exist"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._items.get(tenant_id)
+            if entry is not None and entry[1] > now and not self._is_stale(entry[0], min_version):
+                self._items.move_to_end(tenant_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        response = self.table.get_item(Key={'tenantId': tenant_id})
+        item = response.get('Item')
+        self.put(tenant_id, item)
+        return item
+
+    def put(self, tenant_id, item):
+        ttl = self.ttl_seconds if item is not None else self.negative_ttl_seconds
+        with self._lock:
+            self._items[tenant_id] = (item, time.monotonic() + ttl)
+            self._items.move_to_end(tenant_id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, tenant_id=None):
+        """Drops one tenant, or every tenant when tenant_id is None"""
+        with self._lock:
+            if tenant_id is None:
+                self._items.clear()
+            else:
+                self._items.pop(tenant_id, None)
+
+    def stats(self):
+        return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
+
+    def _is_stale(self, item, min_version):
+        if min_version is None or self.version_attribute is None or item is None:
+            return False
+        cached_version = item.get(self.version_attribute)
+        return cached_version is None or int(cached_version) < int(min_version)
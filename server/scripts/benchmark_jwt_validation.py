@@ -0,0 +1,72 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+import argparse
+import os
+import sys
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'layers'))
+import authorizer_layer
+
+APP_CLIENT_ID = 'benchmark-app-client'
+
+
+def create_signing_key():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()).decode()
+    public_jwk = jwk.construct(pem, 'RS256').public_key().to_dict()
+    public_jwk['kid'] = 'benchmark-kid'
+    return pem, public_jwk
+
+
+def create_token(pem):
+    claims = {
+        'aud': APP_CLIENT_ID,
+        'exp': int(time.time()) + 3600,
+        'sub': 'benchmark-user'
+    }
+    return jwt.encode(claims, pem, algorithm='RS256', headers={'kid': 'benchmark-kid'})
+
+
+def measure(token, keys, iterations, warm):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if not warm:
+            authorizer_layer.verified_token_cache.clear()
+        if not authorizer_layer.validateJWT(token, APP_CLIENT_ID, keys):
+            raise Exception('Token validation failed')
+    return time.perf_counter() - start
+
+
+def run_benchmark(iterations):
+    pem, public_jwk = create_signing_key()
+    token = create_token(pem)
+    public_key = jwk.construct(public_jwk)
+    keys = lambda kid: public_key
+
+    # Keep the per-call claims logging out of the measurement
+    authorizer_layer.logger.logger.setLevel('WARNING')
+
+    cold = measure(token, keys, iterations, warm=False)
+    warm = measure(token, keys, iterations, warm=True)
+
+    print(f"cold validation: {iterations / cold:,.0f} tokens/s ({cold / iterations * 1e6:.1f} us/token)")
+    print(f"warm validation: {iterations / warm:,.0f} tokens/s ({warm / iterations * 1e6:.1f} us/token)")
+    print(f"speedup: {cold / warm:.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Compare cold and warm (cached) JWT validation throughput')
+    parser.add_argument('--iterations', type=int,
+                        help='validations per run', default=2000)
+    args = parser.parse_args()
+
+    run_benchmark(**vars(args))
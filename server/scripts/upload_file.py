@@ -5,6 +5,13 @@ import base64
 import requests
 import argparse
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Part numbers re-signed per request when resuming an upload
+REFRESH_BATCH_SIZE = 500
 
 def get_jwt(username, password, tenant_name, api_url):
 
@@ -27,11 +34,221 @@ def get_jwt(username, password, tenant_name, api_url):
         print("Error getting JWT", e)
         exit(1)
 
-def upload_file(username, password, tenant_name, file, file_type, api_url):
+class UploadCheckpoint:
+    """
+    Local record of a multipart upload in progress, next to the file by default, so
+    an interrupted upload resumes with the parts that are still missing. It is only
+    reused for the same file, unchanged since the upload started.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self, file_name, file_type, file_size, modified_ns):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            state = json.load(f)
+        if (state.get('fileName'), state.get('fileType'), state.get('fileSize'), state.get('modifiedNs')) != \
+                (file_name, file_type, file_size, modified_ns):
+            print(f"Ignoring checkpoint {self.path}, it belongs to another file")
+            return None
+        state['etags'] = {int(part_number): etag for part_number, etag in state['etags'].items()}
+        return state
+
+    def save(self, state):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.path)
+
+    def delete(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class UploadProgress:
+    """Prints the share of bytes uploaded and the throughput, at most every interval seconds"""
+
+    def __init__(self, total_bytes, done_bytes=0, interval=1.0):
+        self.total_bytes = total_bytes
+        self.done_bytes = done_bytes
+        self.interval = interval
+        self._start = time.monotonic()
+        self._start_bytes = done_bytes
+        self._last_print = 0
+
+    def add(self, part_bytes):
+        self.done_bytes += part_bytes
+        now = time.monotonic()
+        if now - self._last_print >= self.interval or self.done_bytes == self.total_bytes:
+            self._last_print = now
+            print(self.readout(now))
+
+    def readout(self, now=None):
+        elapsed = max((now or time.monotonic()) - self._start, 1e-6)
+        throughput = (self.done_bytes - self._start_bytes) / elapsed / (1024 * 1024)
+        percent = 100.0 * self.done_bytes / self.total_bytes if self.total_bytes else 100.0
+        return (f"{percent:5.1f}% {self.done_bytes / (1024 * 1024):,.1f}/{self.total_bytes / (1024 * 1024):,.1f} MiB"
+                f" at {throughput:,.1f} MiB/s")
+
+
+class MultipartUploader:
+    """
+    Uploads a file straight to S3 through the presigned part URLs of the upload API:
+    parts are read and sent concurrently, each part is retried with exponential
+    backoff (re-signing its URL once it expired), and every finished part is written
+    to a checkpoint so a failed or interrupted upload resumes where it stopped.
+    """
+
+    def __init__(self, api_url, jwt, part_size=None, concurrency=8, retries=5, backoff_seconds=1.0,
+                 checkpoint_path=None, http=requests):
+        self.api_url = api_url
+        self.authorization = 'Bearer {}'.format(jwt)
+        self.part_size = part_size
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.checkpoint_path = checkpoint_path
+        self.http = http
+        self._lock = threading.Lock()
+
+    def upload(self, file, file_type=None):
+        file_name = os.path.basename(file)
+        stat = os.stat(file)
+        checkpoint = UploadCheckpoint(self.checkpoint_path or file + '.upload.json')
+        state = checkpoint.load(file_name, file_type, stat.st_size, stat.st_mtime_ns)
+        urls = {}
+        if state is not None:
+            print(f"Resuming upload of {file}: {len(state['etags'])} parts already uploaded")
+            try:
+                urls = self._refresh_urls(state, self._missing_parts(state))
+            except requests.HTTPError as e:
+                print(f"Cannot resume, starting over: {e}")
+                state = None
+        if state is None:
+            state, urls = self._start(file_name, file_type, stat.st_size, stat.st_mtime_ns)
+            checkpoint.save(state)
+
+        missing = self._missing_parts(state)
+        progress = UploadProgress(stat.st_size, stat.st_size - sum(self._part_length(state, part_number)
+                                                                   for part_number in missing))
+        print(f"Uploading file: {file} in {state['partCount']} parts of {state['partSize']} bytes, "
+              f"{len(missing)} to go")
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(self._upload_part, file, state, part_number, urls, checkpoint, progress)
+                       for part_number in missing]
+            for future in futures:
+                future.result()
+
+        response = self._api('POST', 'v1/upload/complete', data=json.dumps({
+            'uploadId': state['uploadId'],
+            'fileName': file_name,
+            'fileType': file_type,
+            'parts': [{'partNumber': part_number, 'etag': etag} for part_number, etag in sorted(state['etags'].items())]
+        }))
+        checkpoint.delete()
+        print(response.text if response.text else response.reason)
+        return response
+
+    def abort(self, file, file_type=None):
+        """Aborts the checkpointed upload of file so S3 discards its parts"""
+        checkpoint = UploadCheckpoint(self.checkpoint_path or file + '.upload.json')
+        stat = os.stat(file)
+        state = checkpoint.load(os.path.basename(file), file_type, stat.st_size, stat.st_mtime_ns)
+        if state is not None:
+            self._api('DELETE', 'v1/upload/complete', data=json.dumps(
+                {'uploadId': state['uploadId'], 'fileName': state['fileName'], 'fileType': file_type}))
+        checkpoint.delete()
+
+    def _start(self, file_name, file_type, file_size, modified_ns):
+        headers = {'upload-mode': 'multipart', 'file-name': file_name, 'file-type': file_type or '',
+                   'file-size': str(file_size)}
+        if self.part_size:
+            headers['part-size'] = str(self.part_size)
+        upload = self._api('PUT', 'v1/upload', headers=headers).json()
+        state = {
+            'uploadId': upload['uploadId'],
+            'fileName': file_name,
+            'fileType': file_type,
+            'fileSize': file_size,
+            'modifiedNs': modified_ns,
+            'partSize': upload['partSize'],
+            'partCount': len(upload['parts']),
+            'etags': {}
+        }
+        return state, {part['partNumber']: part['url'] for part in upload['parts']}
+
+    def _refresh_urls(self, state, part_numbers):
+        urls = {}
+        # keep the part-numbers header well under the API Gateway header limit
+        for start in range(0, len(part_numbers), REFRESH_BATCH_SIZE):
+            batch = part_numbers[start:start + REFRESH_BATCH_SIZE]
+            upload = self._api('PUT', 'v1/upload', headers={
+                'upload-mode': 'multipart', 'file-name': state['fileName'], 'file-type': state['fileType'] or '',
+                'upload-id': state['uploadId'], 'part-numbers': ','.join(str(number) for number in batch)}).json()
+            urls.update({part['partNumber']: part['url'] for part in upload['parts']})
+        return urls
+
+    def _upload_part(self, file, state, part_number, urls, checkpoint, progress):
+        length = self._part_length(state, part_number)
+        with open(file, 'rb') as f:
+            f.seek((part_number - 1) * state['partSize'])
+            data = f.read(length)
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.http.put(urls[part_number], data=data)
+                if response.status_code == 403:
+                    # the presigned URL expired, sign it again before the next attempt
+                    with self._lock:
+                        urls.update(self._refresh_urls(state, [part_number]))
+                response.raise_for_status()
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff_seconds * 2 ** attempt * (0.5 + random.random() / 2)
+                print(f"Part {part_number} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+        with self._lock:
+            state['etags'][part_number] = response.headers['ETag']
+            checkpoint.save(state)
+            progress.add(length)
+
+    def _api(self, method, path, headers=None, data=None):
+        response = self.http.request(method, self.api_url + path,
+                                     headers=dict(headers or {}, Authorization=self.authorization), data=data)
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _missing_parts(state):
+        return [part_number for part_number in range(1, state['partCount'] + 1) if part_number not in state['etags']]
+
+    @staticmethod
+    def _part_length(state, part_number):
+        return min(state['partSize'], state['fileSize'] - (part_number - 1) * state['partSize'])
+
+
+def upload_file(username, password, tenant_name, file, file_type, api_url,
+                multipart=False, part_size=None, concurrency=8, retries=5, checkpoint=None, abort=False):
 
     jwt = get_jwt(username, password, tenant_name, api_url)
     file_name =  os.path.basename(file)
 
+    if multipart:
+        uploader = MultipartUploader(api_url, jwt, part_size=part_size, concurrency=concurrency,
+                                     retries=retries, checkpoint_path=checkpoint)
+        try:
+            if abort:
+                uploader.abort(file, file_type)
+            else:
+                uploader.upload(file, file_type)
+        except Exception as e:
+            print("Error uploading file, run again to resume", e)
+            exit(1)
+        return
+
     headers = {
         'Authorization': 'Bearer {}'.format(jwt),
         'Content-Type': 'text/csv',
@@ -61,6 +278,18 @@ if __name__ == '__main__':
                         help='file type', required=False)
     parser.add_argument('--api-url', type=str,
                         help='rest api url endpoint', required=True)
+    parser.add_argument('--multipart', action='store_true',
+                        help='upload straight to S3 in parallel parts, for large files')
+    parser.add_argument('--part-size', type=int,
+                        help='multipart part size in bytes', required=False)
+    parser.add_argument('--concurrency', type=int,
+                        help='parts uploaded in parallel', default=8)
+    parser.add_argument('--retries', type=int,
+                        help='retries per part', default=5)
+    parser.add_argument('--checkpoint', type=str,
+                        help='resume checkpoint file, <file>.upload.json by default', required=False)
+    parser.add_argument('--abort', action='store_true',
+                        help='abort the checkpointed multipart upload instead of resuming it')
     args = parser.parse_args()
 
     upload_file(**vars(args))
\ No newline at end of file
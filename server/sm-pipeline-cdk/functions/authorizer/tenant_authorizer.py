@@ -8,12 +8,16 @@ import boto3
 from jose import jwk, jwt
 from jose.utils import base64url_decode
 import time
+import threading
 import logger
+import metrics_manager
 import re
 import authorizer_layer
 from authorizer_layer import SessionParameters
 import auth_manager
 import utils
+from tenant_details_cache import TenantDetailsCache
+from jwks_cache import JwksCache
 from collections import namedtuple
 
 region = os.environ['AWS_REGION']
@@ -21,6 +25,14 @@ region = os.environ['AWS_REGION']
 dynamodb = boto3.resource('dynamodb')
 sts_client = boto3.client('sts')
 table_tenant_details = dynamodb.Table('MLaaS-TenantDetails')
+tenant_details_cache = TenantDetailsCache(table_tenant_details)
+jwks_cache = JwksCache(region)
+
+# Credentials are reused until this many seconds before they expire. Keep it at least
+# as long as the API Gateway authorizer result cache TTL, because cached policies hand
+# the same credentials to the request processors after the authorizer returned them.
+STS_SESSION_DURATION_SECONDS = 900
+STS_CREDENTIALS_SAFETY_MARGIN_SECONDS = int(os.environ.get("STS_CREDENTIALS_SAFETY_MARGIN_SECONDS", "300"))
 
 
 def lambda_handler(event, context):
@@ -42,25 +54,22 @@ def lambda_handler(event, context):
     logger.info(unauthorized_claims)
 
     # get tenant user pool and app client to validate jwt token against
-    tenant_details = table_tenant_details.get_item(
-        Key={
-            'tenantId': unauthorized_claims['custom:tenantId']
-        }
-    )
+    tenant_details = tenant_details_cache.get(unauthorized_claims['custom:tenantId'])
     logger.info(tenant_details)
 
-    userpool_id = tenant_details['Item']['userPoolId']
-    appclient_id = tenant_details['Item']['appClientId']
-    # apigateway_url = tenant_details['Item']['apiGatewayUrl']
-    tenant_tier = tenant_details['Item']['tenantTier']
-    bucket = tenant_details['Item']['s3Bucket']
+    if tenant_details is None:
+        logger.error('Unauthorized: unknown tenant')
+        raise Exception('Unauthorized')
+
+    userpool_id = tenant_details['userPoolId']
+    appclient_id = tenant_details['appClientId']
+    # apigateway_url = tenant_details['apiGatewayUrl']
+    tenant_tier = tenant_details['tenantTier']
+    bucket = tenant_details['s3Bucket']
+    model_version = tenant_details.get('modelVersion')
 
-    # get keys for tenant user pool to validate
-    keys_url = 'https://cognito-idp.{}.amazonaws.com/{}/.well-known/jwks.json'.format(
-        region, userpool_id)
-    with urllib.request.urlopen(keys_url) as f:
-        response = f.read()
-    keys = json.loads(response.decode('utf-8'))['keys']
+    # get keys for tenant user pool to validate, cached across warm invocations
+    keys = jwks_cache.key_resolver(userpool_id)
 
     # authenticate against cognito user pool using the key
     response = authorizer_layer.validateJWT(
@@ -81,20 +90,26 @@ def lambda_handler(event, context):
 
     try:
         # TODO Add missing code to create temporary credentials
-        session_parameters = assume_role(
+        session_parameters, session_expiration = tenant_credentials_cache.get_credentials(
             access_role_arn=role_to_assume_arn, tenant_id=tenant_id
         )
 
         if session_parameters is None:
             return authorizer_layer.create_auth_denied_policy(methodArn)
 
-        # After succesfully assuming the role we can return a success policy
+        # After succesfully assuming the role we can return a success policy.
+        # API Gateway caches it per token for every route (e.g. /upload and
+        # /upload/complete), so it has to allow all of them
         authorization_success_policy = authorizer_layer.create_auth_success_policy(
-            methodArn, tenant_id, session_parameters
+            api_wildcard_arn(methodArn), tenant_id, session_parameters
         )
 
         authorization_success_policy['context']['bucket'] = bucket
         authorization_success_policy['context']['tier'] = tenant_tier
+        authorization_success_policy['context']['aws_session_expiration'] = int(session_expiration)
+        # Routing metadata for the request processors, so they do not read the tenant item again
+        if model_version is not None:
+            authorization_success_policy['context']['model_version'] = str(model_version)
 
         logger.info("Authorization succeeded")
         return authorization_success_policy
@@ -104,16 +119,24 @@ def lambda_handler(event, context):
         logger.error("Error Authorizing Tenant")
         return authorizer_layer.create_auth_denied_policy(methodArn)
 
-def assume_role(access_role_arn: str, tenant_id: str, duration_sec: int = 900) -> SessionParameters:
+def api_wildcard_arn(method_arn: str) -> str:
+    """arn:...:api-id/stage/METHOD/resource -> arn:...:api-id/stage/*"""
+    api_arn, stage = method_arn.split('/')[:2]
+    return f"{api_arn}/{stage}/*"
+
+
+def assume_role(access_role_arn: str, tenant_id: str, duration_sec: int = STS_SESSION_DURATION_SECONDS):
+    """
+    Assumes the ABAC role tagged with the tenant id.
+    Returns the session parameters and their expiration as epoch seconds, or (None, None).
+    """
 
     logger.info(
         f"Trying to assume role ARN: {access_role_arn} with tag TenantID={tenant_id}"
     )
 
-    sts = boto3.client("sts")
-
     try:
-        assume_role_response = sts.assume_role(
+        assume_role_response = sts_client.assume_role(
             RoleArn=access_role_arn,
             DurationSeconds=duration_sec,
             RoleSessionName=tenant_id,
@@ -121,7 +144,7 @@ def assume_role(access_role_arn: str, tenant_id: str, duration_sec: int = 900) -
         )
     except Exception as exception:
         logger.error(exception)
-        return None
+        return None, None
 
     logger.info(
         f"Assumed role ARN: {assume_role_response['AssumedRoleUser']['Arn']}")
@@ -132,4 +155,66 @@ def assume_role(access_role_arn: str, tenant_id: str, duration_sec: int = 900) -
         aws_session_token=assume_role_response["Credentials"]["SessionToken"],
     )
 
-    return session_parameters
\ No newline at end of file
+    return session_parameters, assume_role_response["Credentials"]["Expiration"].timestamp()
+
+
+def record_metric(tenant_id, metric_name, metric_unit, metric_value):
+    """
+    Emits a tenant metric without ever failing the authorization: an error here would
+    otherwise end in a deny policy for a valid request
+    """
+    try:
+        metrics_manager.record_tenant_metric(tenant_id, metric_name, metric_unit, metric_value)
+    except Exception as exception:
+        logger.error(f"Recording metric {metric_name} failed: {exception}")
+
+
+class TenantCredentialsCache:
+    """
+    Reuses the tagged STS credentials of a tenant across warm invocations until
+    safety_margin_seconds before they expire. Concurrent refreshes for the same tenant
+    are single-flighted so a burst results in one AssumeRole call.
+    """
+
+    def __init__(self, safety_margin_seconds: int):
+        self.safety_margin_seconds = safety_margin_seconds
+        self.sts_calls = 0
+        self.sts_calls_saved = 0
+        self._credentials = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get_credentials(self, access_role_arn: str, tenant_id: str):
+        key = (access_role_arn, tenant_id)
+        cached = self._fresh(key)
+        if cached is None:
+            with self._tenant_lock(key):
+                # another thread may have refreshed while we waited
+                cached = self._fresh(key)
+                if cached is None:
+                    return self._refresh(key, access_role_arn, tenant_id)
+
+        self.sts_calls_saved += 1
+        record_metric(tenant_id, "STSCallsSaved", "Count", 1)
+        return cached
+
+    def _refresh(self, key, access_role_arn, tenant_id):
+        self.sts_calls += 1
+        record_metric(tenant_id, "STSAssumeRoleCalls", "Count", 1)
+        session_parameters, expiration = assume_role(access_role_arn, tenant_id)
+        if session_parameters is not None:
+            self._credentials[key] = (session_parameters, expiration)
+        return session_parameters, expiration
+
+    def _fresh(self, key):
+        cached = self._credentials.get(key)
+        if cached is not None and cached[1] - self.safety_margin_seconds > time.time():
+            return cached
+        return None
+
+    def _tenant_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+
+tenant_credentials_cache = TenantCredentialsCache(STS_CREDENTIALS_SAFETY_MARGIN_SECONDS)
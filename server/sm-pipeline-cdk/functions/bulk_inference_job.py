@@ -0,0 +1,176 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import inference_batching
+from s3_multipart_writer import S3MultipartWriter
+
+# Tenants drop files to score under <tenant_id>/inference/input/, results are written
+# under <tenant_id>/inference/output/ in the same bucket
+INPUT_PREFIX = "inference/input/"
+OUTPUT_PREFIX = "inference/output/"
+
+JOB_STATUS_RUNNING = "RUNNING"
+JOB_STATUS_SUCCEEDED = "SUCCEEDED"
+JOB_STATUS_FAILED = "FAILED"
+
+pooled_endpoint_name = os.getenv("POOLED_ENDPOINT_NAME")
+jobs_table_name = os.getenv("BULK_INFERENCE_JOBS_TABLE", "MLaaS-BulkInferenceJobs")
+max_concurrency = int(os.getenv("BULK_INFERENCE_MAX_CONCURRENCY", "4"))
+# Left to record the outcome and abort the upload once the invocation runs out of time
+DEADLINE_MARGIN_SECONDS = 30
+
+root = logging.getLogger()
+root.setLevel("INFO")
+
+
+def handler(event, context):
+    bucket_name = event['detail']['bucket']['name']
+    object_key = event['detail']['object']['key']
+    logging.info(f"Bulk inference input: s3://{bucket_name}/{object_key}")
+
+    tenant_id = object_key.split('/')[0]
+    if not is_bulk_inference_input(object_key):
+        logging.info(f"Skipping {object_key}, not a bulk inference input")
+        return
+
+    dynamodb = boto3.resource('dynamodb')
+    tenant_details_table = dynamodb.Table('MLaaS-TenantDetails')
+    # stop at a chunk boundary while there is still time to record the outcome
+    deadline = time.time() + context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN_SECONDS \
+        if context else None
+
+    return run_bulk_inference_job(
+        s3_client=boto3.client('s3'),
+        runtime_client=boto3.client('runtime.sagemaker'),
+        jobs_table=dynamodb.Table(jobs_table_name),
+        bucket_name=bucket_name,
+        input_key=object_key,
+        tenant_id=tenant_id,
+        endpoint_name=pooled_endpoint_name,
+        resolve_target_model=lambda: target_model_for(tenant_details_table, tenant_id),
+        job_id=event.get('id', str(int(time.time() * 1000))),
+        deadline=deadline,
+    )
+
+
+def target_model_for(tenant_details_table, tenant_id: str) -> str:
+    """The pooled endpoint target model of the version the tenant is served"""
+    item = tenant_details_table.get_item(Key={'tenantId': tenant_id}).get('Item')
+    if item is None:
+        raise KeyError(f"Unknown tenant {tenant_id}")
+    if 'modelVersion' not in item:
+        raise KeyError(f"Tenant {tenant_id} has no model version")
+    return f"{tenant_id}.model.{item['modelVersion']}.tar.gz"
+
+
+def is_bulk_inference_input(object_key: str) -> bool:
+    parts = object_key.split('/', 1)
+    return len(parts) == 2 and parts[1].startswith(INPUT_PREFIX) and object_key.endswith('.csv')
+
+
+def output_key_for(input_key: str) -> str:
+    tenant_id, relative_key = input_key.split('/', 1)
+    file_name = relative_key[len(INPUT_PREFIX):]
+    return f"{tenant_id}/{OUTPUT_PREFIX}{file_name[:-len('.csv')]}.out.csv"
+
+
+def run_bulk_inference_job(s3_client, runtime_client, jobs_table, bucket_name: str, input_key: str,
+                           tenant_id: str, endpoint_name: str, resolve_target_model, job_id: str,
+                           concurrency: int = max_concurrency,
+                           max_rows_per_chunk: int = inference_batching.MAX_ROWS_PER_CHUNK,
+                           deadline: float = None) -> dict:
+    """
+    Streams the input object in payload sized chunks, scores up to `concurrency` chunks
+    at a time and streams "row,prediction,error" lines, in input order, to a multipart
+    upload next to the input. The job is recorded as RUNNING before the tenant's target
+    model is resolved, its progress is written after every chunk and its outcome when
+    it ends, FAILED with the error when any step fails.
+
+    A job runs within a single invocation, so an input must be scored before the
+    function timeout (15 minutes, the Lambda maximum); larger inputs are to be split
+    into several files. A job reaching `deadline` stops at a chunk boundary and is
+    recorded FAILED with the rows scored so far.
+    """
+    output_key = output_key_for(input_key)
+    job = {
+        'tenantId': tenant_id,
+        'jobId': job_id,
+        'jobStatus': JOB_STATUS_RUNNING,
+        'inputUri': f"s3://{bucket_name}/{input_key}",
+        'outputUri': f"s3://{bucket_name}/{output_key}",
+        'rowsTotal': 0,
+        'rowsFailed': 0,
+        'chunksDone': 0,
+        'startedAt': int(time.time()),
+    }
+    jobs_table.put_item(Item=job)
+    target_model = None
+
+    def invoke_chunk(payload: str) -> str:
+        invoke_args = {
+            'EndpointName': endpoint_name,
+            'ContentType': "text/csv",
+            'Body': payload,
+        }
+        if target_model:
+            invoke_args['TargetModel'] = target_model
+        response = runtime_client.invoke_endpoint(**invoke_args)
+        return response["Body"].read().decode()
+
+    try:
+        target_model = resolve_target_model()
+        job['targetModel'] = target_model
+        body = s3_client.get_object(Bucket=bucket_name, Key=input_key)['Body']
+        rows = (line.decode('utf-8') for line in body.iter_lines() if line.strip())
+
+        with S3MultipartWriter(s3_client, bucket_name, output_key) as writer, \
+                ThreadPoolExecutor(max_workers=concurrency) as executor:
+            in_flight = deque()
+            for first_row_index, chunk in inference_batching.chunk_rows(
+                    rows, max_rows_per_chunk=max_rows_per_chunk):
+                # bound memory to `concurrency` chunks by draining the oldest one first
+                if len(in_flight) >= concurrency:
+                    write_chunk_results(writer, jobs_table, job, in_flight.popleft())
+                if deadline is not None and time.time() > deadline:
+                    raise TimeoutError(f"Out of time after {job['rowsTotal']} rows, "
+                                       f"split the input into smaller files")
+                in_flight.append(executor.submit(
+                    inference_batching.score_chunk, first_row_index, chunk, invoke_chunk))
+            while in_flight:
+                write_chunk_results(writer, jobs_table, job, in_flight.popleft())
+
+        job['jobStatus'] = JOB_STATUS_SUCCEEDED
+    except Exception as e:
+        logging.error(f"Bulk inference job {job_id} failed: {e}")
+        job['jobStatus'] = JOB_STATUS_FAILED
+        job['errorMessage'] = str(e)
+
+    job['completedAt'] = int(time.time())
+    jobs_table.put_item(Item=job)
+    logging.info(f"Bulk inference job {job_id}: {job['jobStatus']}, "
+                 f"{job['rowsTotal']} rows, {job['rowsFailed']} failed")
+    return job
+
+
+def write_chunk_results(writer: S3MultipartWriter, jobs_table, job: dict, future) -> None:
+    lines = []
+    for result in future.result():
+        error = result.get('error', '').replace('\n', ' ').replace(',', ';')
+        lines.append(f"{result['row']},{result.get('prediction', '')},{error}\n")
+        job['rowsTotal'] += 1
+        if 'error' in result:
+            job['rowsFailed'] += 1
+    writer.write(''.join(lines).encode('utf-8'))
+    job['chunksDone'] += 1
+    jobs_table.update_item(
+        Key={'tenantId': job['tenantId'], 'jobId': job['jobId']},
+        UpdateExpression='SET rowsTotal = :rows, rowsFailed = :failed, chunksDone = :chunks',
+        ExpressionAttributeValues={':rows': job['rowsTotal'], ':failed': job['rowsFailed'],
+                                   ':chunks': job['chunksDone']})
@@ -0,0 +1,133 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+# Rollout modes a tenant can select through rolloutMode in MLaaS-TenantDetails
+ALL_AT_ONCE_MODE = 'all_at_once'
+# the new model joins as a second production variant taking a growing share of traffic
+CANARY_MODE = 'canary'
+# the new model receives a copy of the traffic, its responses are discarded
+SHADOW_MODE = 'shadow'
+ROLLOUT_MODES = (ALL_AT_ONCE_MODE, CANARY_MODE, SHADOW_MODE)
+
+DEFAULT_TRAFFIC_PERCENTS = (10, 50)
+DEFAULT_STEP_SECONDS = 600
+DEFAULT_MAX_LATENCY_REGRESSION_PERCENT = 20
+DEFAULT_MAX_ERROR_RATE_PERCENT = 1
+
+METRIC_NAMESPACE = 'AWS/SageMaker'
+# CloudWatch periods are whole minutes
+MIN_PERIOD_SECONDS = 60
+
+
+class RolloutPolicy:
+    """
+    How a new model reaches the traffic of a dedicated endpoint. In canary mode it
+    takes traffic_percents in turn, each for step_seconds; in shadow mode it is
+    mirrored the traffic for one step. A step passes unless the new variant's p99
+    ModelLatency exceeds the serving variant's by more than max_latency_regression_percent
+    or its 5XX error rate exceeds max_error_rate_percent.
+    """
+
+    def __init__(self, mode=ALL_AT_ONCE_MODE, traffic_percents=DEFAULT_TRAFFIC_PERCENTS,
+                 step_seconds=DEFAULT_STEP_SECONDS,
+                 max_latency_regression_percent=DEFAULT_MAX_LATENCY_REGRESSION_PERCENT,
+                 max_error_rate_percent=DEFAULT_MAX_ERROR_RATE_PERCENT):
+        if mode not in ROLLOUT_MODES:
+            raise ValueError(f"Unknown rollout mode {mode}")
+        self.mode = mode
+        self.traffic_percents = [int(percent) for percent in traffic_percents]
+        if not self.traffic_percents or not all(0 < percent < 100 for percent in self.traffic_percents):
+            raise ValueError("traffic_percents must be between 0 and 100")
+        self.step_seconds = int(step_seconds)
+        self.max_latency_regression_percent = Decimal(str(max_latency_regression_percent))
+        self.max_error_rate_percent = Decimal(str(max_error_rate_percent))
+
+    @property
+    def gradual(self):
+        return self.mode != ALL_AT_ONCE_MODE
+
+    @property
+    def steps(self):
+        return len(self.traffic_percents) if self.mode == CANARY_MODE else 1
+
+    def to_item(self):
+        """DynamoDB map of the policy; numbers are kept as int and Decimal"""
+        return {
+            'mode': self.mode,
+            'trafficPercents': self.traffic_percents,
+            'stepSeconds': self.step_seconds,
+            'maxLatencyRegressionPercent': self.max_latency_regression_percent,
+            'maxErrorRatePercent': self.max_error_rate_percent,
+        }
+
+    @classmethod
+    def from_item(cls, item):
+        if not item:
+            return cls()
+        return cls(item['mode'], item['trafficPercents'], item['stepSeconds'],
+                   item['maxLatencyRegressionPercent'], item['maxErrorRatePercent'])
+
+
+def variant_metrics(cloudwatch, endpoint_name, variant_names, start_time, end_time):
+    """
+    Returns {variant: {'p99Latency': ..., 'errors': ..., 'invocations': ...}} over
+    [start_time, end_time] epoch seconds in one GetMetricData call. p99Latency is in
+    microseconds, None when the variant served nothing.
+    """
+    period = max(MIN_PERIOD_SECONDS, -(-int(end_time - start_time) // MIN_PERIOD_SECONDS) * MIN_PERIOD_SECONDS)
+    queries = []
+    for index, variant_name in enumerate(variant_names):
+        for metric, metric_name, stat in (('p99Latency', 'ModelLatency', 'p99'),
+                                          ('errors', 'Invocation5XXErrors', 'Sum'),
+                                          ('invocations', 'Invocations', 'Sum')):
+            queries.append({
+                'Id': f"{metric.lower()}{index}",
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': METRIC_NAMESPACE,
+                        'MetricName': metric_name,
+                        'Dimensions': [{'Name': 'EndpointName', 'Value': endpoint_name},
+                                       {'Name': 'VariantName', 'Value': variant_name}],
+                    },
+                    'Period': period,
+                    'Stat': stat,
+                },
+                'Label': f"{variant_name} {metric}",
+            })
+    response = cloudwatch.get_metric_data(
+        MetricDataQueries=queries,
+        StartTime=datetime.fromtimestamp(start_time, timezone.utc),
+        EndTime=datetime.fromtimestamp(end_time + period, timezone.utc))
+    values = {result['Id']: result['Values'] for result in response['MetricDataResults']}
+
+    metrics = {}
+    for index, variant_name in enumerate(variant_names):
+        latencies = values.get(f"p99latency{index}", [])
+        metrics[variant_name] = {
+            'p99Latency': max(latencies) if latencies else None,
+            'errors': sum(values.get(f"errors{index}", [])),
+            'invocations': sum(values.get(f"invocations{index}", [])),
+        }
+    return metrics
+
+
+def find_regression(metrics, baseline_variant, new_variant, policy):
+    """
+    Compares the new variant with the baseline. Returns why the new variant regressed,
+    None when it did not or served no traffic to judge it by.
+    """
+    new, baseline = metrics[new_variant], metrics[baseline_variant]
+    if not new['invocations']:
+        return None
+    error_rate_percent = Decimal(str(new['errors'])) * 100 / Decimal(str(new['invocations']))
+    if error_rate_percent > policy.max_error_rate_percent:
+        return f"{new_variant} 5XX error rate {error_rate_percent:.2f}% exceeds {policy.max_error_rate_percent}%"
+    if new['p99Latency'] is not None and baseline['p99Latency']:
+        limit = Decimal(str(baseline['p99Latency'])) * (100 + policy.max_latency_regression_percent) / 100
+        if Decimal(str(new['p99Latency'])) > limit:
+            return (f"{new_variant} p99 latency {new['p99Latency']:.0f}us exceeds {baseline_variant} "
+                    f"{baseline['p99Latency']:.0f}us by more than {policy.max_latency_regression_percent}%")
+    return None
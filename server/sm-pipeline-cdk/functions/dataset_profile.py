@@ -0,0 +1,148 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+
+INT_DTYPE = 'int'
+FLOAT_DTYPE = 'float'
+STRING_DTYPE = 'string'
+# A column only widens: int -> float -> string
+DTYPE_ORDER = (INT_DTYPE, FLOAT_DTYPE, STRING_DTYPE)
+
+# Columns past this index are counted but not profiled
+MAX_PROFILED_COLUMNS = 1000
+
+PROFILE_FILE_NAME = 'profile.json'
+
+
+class ColumnProfile:
+    """
+    Running statistics of one column. Empty values count as nulls; min and max are
+    kept while the column is numeric and dropped once it turns out to hold strings.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self.dtype = None
+        self.count = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.count += 1
+        if not value:
+            self.nulls += 1
+            return
+        if self.dtype == STRING_DTYPE:
+            return
+        try:
+            number = int(value)
+            dtype = INT_DTYPE
+        except ValueError:
+            try:
+                number = float(value)
+                dtype = FLOAT_DTYPE
+            except ValueError:
+                self._widen(STRING_DTYPE)
+                return
+        self._widen(dtype)
+        self._update_range(number, number)
+
+    def merge(self, dtype, count, nulls, minimum=None, maximum=None):
+        """Folds in statistics computed elsewhere, e.g. from Parquet row group metadata"""
+        self.count += count
+        self.nulls += nulls
+        if dtype is None:
+            return
+        self._widen(dtype)
+        if self.dtype != STRING_DTYPE and minimum is not None and maximum is not None:
+            self._update_range(minimum, maximum)
+
+    def _widen(self, dtype):
+        if self.dtype is None or DTYPE_ORDER.index(dtype) > DTYPE_ORDER.index(self.dtype):
+            self.dtype = dtype
+            if dtype == STRING_DTYPE:
+                self.min = self.max = None
+
+    def _update_range(self, minimum, maximum):
+        if self.min is None or minimum < self.min:
+            self.min = minimum
+        if self.max is None or maximum > self.max:
+            self.max = maximum
+
+    def to_dict(self, index):
+        return {
+            'index': index,
+            'name': self.name,
+            'dtype': self.dtype,
+            'count': self.count,
+            'nulls': self.nulls,
+            'min': self.min,
+            'max': self.max,
+        }
+
+
+class DatasetProfiler:
+    """
+    Profiles CSV rows as the splitter routes them, so the statistics come from the
+    same single pass over the data. Values are split on commas without quoting, the
+    layout of the built-in XGBoost CSV input.
+    """
+
+    def __init__(self, max_columns=MAX_PROFILED_COLUMNS):
+        self.max_columns = max_columns
+        self.columns = []
+        self.rows = 0
+        self.max_row_bytes = 0
+        self.min_column_count = None
+        self.max_column_count = 0
+
+    def observe_header(self, line):
+        names = bytes(line).rstrip(b'\r\n').decode('utf-8', errors='replace').split(',')
+        for index, name in enumerate(names[:self.max_columns]):
+            self.column(index).name = name.strip()
+
+    def observe(self, line):
+        self.rows += 1
+        self.max_row_bytes = max(self.max_row_bytes, len(line))
+        values = bytes(line).rstrip(b'\r\n').split(b',')
+        self.min_column_count = len(values) if self.min_column_count is None else min(self.min_column_count, len(values))
+        self.max_column_count = max(self.max_column_count, len(values))
+        for index, value in enumerate(values[:self.max_columns]):
+            self.column(index).observe(value.strip())
+
+    def column(self, index):
+        while len(self.columns) <= index:
+            self.columns.append(ColumnProfile())
+        return self.columns[index]
+
+    def to_dict(self, split_stats=None):
+        profile = {
+            'rows': self.rows,
+            'maxRowBytes': self.max_row_bytes,
+            'columnCount': self.max_column_count,
+            # rows with fewer columns than others usually mean a malformed upload
+            'raggedRows': self.min_column_count is not None and self.min_column_count != self.max_column_count,
+            'columns': [column.to_dict(index) for index, column in enumerate(self.columns)],
+        }
+        if split_stats is not None:
+            profile['splits'] = split_stats
+            profile['bytes'] = sum(stat['bytes'] for stat in split_stats.values())
+        return profile
+
+
+def write_profile(s3_client, bucket, key, profile):
+    s3_client.put_object(Bucket=bucket, Key=key, Body=json.dumps(profile, default=str).encode('utf-8'),
+                         ContentType='application/json')
+    return f"s3://{bucket}/{key}"
+
+
+def record_profile_metrics(metrics_manager, tenant_id, profile):
+    """Emits the profile's sizes as EMF metrics, one dimension set per tenant"""
+    metrics_manager.record_tenant_metric(tenant_id, "TrainingDataRows", "Count", profile['rows'])
+    metrics_manager.record_tenant_metric(tenant_id, "TrainingDataColumns", "Count", profile['columnCount'])
+    metrics_manager.record_tenant_metric(tenant_id, "TrainingDataMaxRowBytes", "Bytes", profile['maxRowBytes'])
+    for split, stat in profile.get('splits', {}).items():
+        metrics_manager.record_tenant_metric(tenant_id, f"{split.capitalize()}Rows", "Count", stat['rows'])
+        metrics_manager.record_tenant_metric(tenant_id, f"{split.capitalize()}Bytes", "Bytes", stat['bytes'])
@@ -0,0 +1,258 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import hashlib
+import math
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from s3_multipart_writer import S3MultipartWriter
+
+TRAIN = 'train'
+VALIDATION = 'validation'
+TEST = 'test'
+SPLITS = (TRAIN, VALIDATION, TEST)
+
+DEFAULT_SPLIT_RATIOS = {TRAIN: 0.7, VALIDATION: 0.15, TEST: 0.15}
+
+# Split strategies a tenant can select through splitStrategy in MLaaS-TenantDetails
+ROW_INDEX_STRATEGY = 'row_index'
+HASH_STRATEGY = 'hash'
+RANDOM_STRATEGY = 'random'
+STRATIFIED_STRATEGY = 'stratified'
+# Rows whose label is not among the first MAX_STRATIFIED_LABELS seen share one stratum
+MAX_STRATIFIED_LABELS = 1000
+# Once STRATIFIED_SAMPLE_ROWS rows were seen, a label column with more distinct values
+# than this share of the rows is taken for a continuous target and split by hash
+MAX_STRATIFIED_LABEL_RATIO = 0.5
+STRATIFIED_SAMPLE_ROWS = 100
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def iter_lines(body, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yields the lines of a streaming S3 body, newline included, reading chunk_size bytes
+    at a time. Lines are memoryview slices of the chunk that was read, so they are only
+    copied once, into the part buffer of the split they are routed to. Only a line that
+    straddles two chunks is joined into a new bytes object.
+    """
+    pending = b''
+    for chunk in body.iter_chunks(chunk_size):
+        start = 0
+        end = chunk.find(b'\n')
+        if pending:
+            if end == -1:
+                pending += chunk
+                continue
+            yield memoryview(pending + chunk[:end + 1])
+            pending = b''
+            start = end + 1
+            end = chunk.find(b'\n', start)
+        view = memoryview(chunk)
+        while end != -1:
+            yield view[start:end + 1]
+            start = end + 1
+            end = chunk.find(b'\n', start)
+        pending = chunk[start:]
+    if pending:
+        yield memoryview(pending + b'\n')
+
+
+class RowIndexSplitStrategy:
+    """
+    Routes every row by its index so that each split holds its ratio of the rows seen
+    so far: row i goes to the split furthest below ratio * (i + 1). The result is
+    deterministic, interleaved across the whole file and exact to within one row.
+    """
+
+    def __init__(self, ratios=None):
+        self.ratios = ratios or DEFAULT_SPLIT_RATIOS
+        self._counts = {split: 0 for split in self.ratios}
+        self._rows = 0
+
+    def route(self, line):
+        self._rows += 1
+        split = max(self.ratios, key=lambda name: self.ratios[name] * self._rows - self._counts[name])
+        self._counts[split] += 1
+        return split
+
+
+def _route_by_fraction(ratios, fraction):
+    """Maps a fraction in [0, 1) onto the split owning that slice of the ratios"""
+    cumulative = 0.0
+    for split, ratio in ratios.items():
+        cumulative += ratio
+        if fraction < cumulative:
+            return split
+    return split
+
+
+class HashSplitStrategy:
+    """
+    Routes every row by a hash of its content, so a row lands in the same split on
+    every run and across files regardless of its position. Identical rows share a split.
+    """
+
+    def __init__(self, ratios=None, seed=''):
+        self.ratios = ratios or DEFAULT_SPLIT_RATIOS
+        self.seed = str(seed).encode()
+
+    def route(self, line):
+        digest = hashlib.blake2b(line, digest_size=8, key=self.seed[:64]).digest()
+        return _route_by_fraction(self.ratios, int.from_bytes(digest, 'big') / 2 ** 64)
+
+
+class RandomSplitStrategy:
+    """
+    Routes every row independently at random; a seed makes the split reproducible.
+    Ratios are exact in expectation without buffering any row.
+    """
+
+    def __init__(self, ratios=None, seed=None):
+        self.ratios = ratios or DEFAULT_SPLIT_RATIOS
+        self._random = random.Random(seed)
+
+    def route(self, line):
+        return _route_by_fraction(self.ratios, self._random.random())
+
+
+def _is_fractional(label):
+    """True for a numeric label with a fractional part, i.e. a continuous target"""
+    try:
+        value = float(label)
+    except ValueError:
+        return False
+    return math.isfinite(value) and not value.is_integer()
+
+
+class StratifiedSplitStrategy:
+    """
+    Keeps the ratios within every label: rows are grouped by the CSV column at
+    label_column (the first column for the built-in XGBoost container) and each label
+    is routed with its own RowIndexSplitStrategy. A continuous target, a fractional
+    label or nearly one label per row, has no strata to keep: the rows from there on
+    are routed with a HashSplitStrategy instead.
+    """
+
+    def __init__(self, ratios=None, label_column=0, max_labels=MAX_STRATIFIED_LABELS, seed=''):
+        self.ratios = ratios or DEFAULT_SPLIT_RATIOS
+        self.label_column = label_column
+        self.max_labels = max_labels
+        self.seed = seed
+        self._strata = {}
+        self._other = RowIndexSplitStrategy(self.ratios)
+        self._fallback = None
+        self._rows = 0
+
+    def route(self, line):
+        if self._fallback is not None:
+            return self._fallback.route(line)
+        self._rows += 1
+        columns = bytes(line).split(b',', self.label_column + 1)
+        label = columns[self.label_column].strip() if len(columns) > self.label_column else b''
+        stratum = self._strata.get(label)
+        if stratum is None:
+            if _is_fractional(label) or (self._rows >= STRATIFIED_SAMPLE_ROWS
+                                         and len(self._strata) >= MAX_STRATIFIED_LABEL_RATIO * self._rows):
+                print('## Warning: label column ' + str(self.label_column) + ' looks continuous after '
+                      + str(self._rows) + ' rows, splitting by hash instead of by label')
+                self._fallback = HashSplitStrategy(self.ratios, self.seed)
+                return self._fallback.route(line)
+            if len(self._strata) >= self.max_labels:
+                return self._other.route(line)
+            stratum = self._strata[label] = RowIndexSplitStrategy(self.ratios)
+        return stratum.route(line)
+
+
+def create_split_strategy(name=None, ratios=None, seed=None, label_column=0):
+    """
+    Builds the strategy registered under name, the row index strategy by default
+    """
+    name = name or ROW_INDEX_STRATEGY
+    if name == ROW_INDEX_STRATEGY:
+        return RowIndexSplitStrategy(ratios)
+    if name == HASH_STRATEGY:
+        return HashSplitStrategy(ratios, seed if seed is not None else '')
+    if name == RANDOM_STRATEGY:
+        return RandomSplitStrategy(ratios, seed)
+    if name == STRATIFIED_STRATEGY:
+        return StratifiedSplitStrategy(ratios, label_column, seed=seed if seed is not None else '')
+    raise ValueError(f"Unknown split strategy {name}")
+
+
+def split_lines(lines, writers, strategy, has_header=False, profiler=None):
+    """
+    Routes lines to the per split writers in a single pass.
+    When has_header is set the first line is copied to every split.
+    A profiler, when given, observes every line in the same pass.
+    Returns the row count of each split.
+    """
+    rows = {split: 0 for split in writers}
+    for index, line in enumerate(lines):
+        if line == b'\n' or line == b'\r\n':
+            continue
+        if has_header and index == 0:
+            if profiler is not None:
+                profiler.observe_header(line)
+            for writer in writers.values():
+                writer.write(line)
+            continue
+        if profiler is not None:
+            profiler.observe(line)
+        split = strategy.route(line)
+        writers[split].write(line)
+        rows[split] += 1
+    return rows
+
+
+def split_s3_object(s3_client, source_bucket, source_key, target_bucket, target_keys,
+                    strategy=None, has_header=False, executor=None, profiler=None):
+    """
+    Streams s3://source_bucket/source_key into one multipart upload per split, keeping
+    memory bounded by one read chunk plus a few parts per split regardless of file size.
+    target_keys maps each split name to its object key in target_bucket.
+    With an executor, parts of all splits upload while the source is still being read
+    and the splits are completed concurrently.
+    Returns {split: {'rows': ..., 'bytes': ...}}.
+    """
+    return split_s3_objects(s3_client, source_bucket, [source_key], target_bucket, target_keys,
+                            strategy, has_header, executor, profiler)
+
+
+def iter_object_lines(s3_client, source_bucket, source_keys, has_header=False):
+    """
+    Yields the lines of several objects as one stream. When has_header is set only the
+    header of the first object is kept.
+    """
+    for index, source_key in enumerate(source_keys):
+        body = s3_client.get_object(Bucket=source_bucket, Key=source_key)['Body']
+        lines = iter_lines(body)
+        if has_header and index > 0:
+            next(lines, None)
+        yield from lines
+
+
+def split_s3_objects(s3_client, source_bucket, source_keys, target_bucket, target_keys,
+                     strategy=None, has_header=False, executor=None, profiler=None):
+    """
+    Same as split_s3_object, merging the rows of all source_keys into one set of splits
+    """
+    strategy = strategy or RowIndexSplitStrategy()
+    writers = {split: S3MultipartWriter(s3_client, target_bucket, key, executor=executor)
+               for split, key in target_keys.items()}
+    try:
+        rows = split_lines(iter_object_lines(s3_client, source_bucket, source_keys, has_header),
+                           writers, strategy, has_header, profiler)
+        if executor is None:
+            for writer in writers.values():
+                writer.close()
+        else:
+            # closing waits on parts queued in executor, so completes run on their own threads
+            with ThreadPoolExecutor(max_workers=len(writers)) as closer:
+                for future in [closer.submit(writer.close) for writer in writers.values()]:
+                    future.result()
+    except Exception:
+        for writer in writers.values():
+            writer.abort()
+        raise
+    return {split: {'rows': rows[split], 'bytes': writers[split].bytes_written} for split in writers}
@@ -0,0 +1,28 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+
+import boto3
+
+import endpoint_rollout
+import model_retention
+
+table_tenant_details = boto3.resource('dynamodb').Table('MLaaS-TenantDetails')
+sm_client = boto3.client('sagemaker')
+
+tenant_id = os.getenv("TENANT_ID")
+
+
+def handler(event, context):
+    """
+    Runs on a schedule and deletes the dedicated tenant's models and endpoint configs
+    beyond the retained versions. Versions served, rolling out or queued are kept.
+    """
+    print('## EVENT')
+    print(event)
+    deleted = model_retention.prune_sagemaker_resources(
+        sm_client, tenant_id, model_retention.retained_versions,
+        endpoint_rollout.protected_versions(table_tenant_details, tenant_id))
+    print(f"## Pruned {deleted}")
+    return deleted
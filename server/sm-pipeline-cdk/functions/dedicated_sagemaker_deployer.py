@@ -4,97 +4,68 @@
 import os
 import json
 import boto3
-import pandas as pd
-import numpy as np
-from io import StringIO
+import model_versioning
+import endpoint_rollout
+from canary_analysis import ALL_AT_ONCE_MODE, RolloutPolicy
 
 sm = boto3.client('sagemaker')
 dynamo = boto3.client('dynamodb')
+table_tenant_details = boto3.resource('dynamodb').Table('MLaaS-TenantDetails')
 sm_client = boto3.client('sagemaker')
+cloudwatch = boto3.client('cloudwatch')
 
 endpoint_name = os.getenv("ENDPOINT_NAME")
 tenant_id = os.getenv("TENANT_ID")
 region = os.environ['AWS_REGION']
 role_arn = os.environ['ROLE_ARN']
 
+# Canary and shadow rollouts, selected per tenant through rolloutMode
+canary_traffic_percents = [int(percent) for percent in os.getenv("CANARY_TRAFFIC_PERCENTS", "10,50").split(',')]
+canary_step_seconds = int(os.getenv("CANARY_STEP_SECONDS", "600"))
+canary_max_latency_regression_percent = os.getenv("CANARY_MAX_LATENCY_REGRESSION_PERCENT", "20")
+canary_max_error_rate_percent = os.getenv("CANARY_MAX_ERROR_RATE_PERCENT", "1")
+
 def handler(event, context):
     print('## EVENT')
     print(event)
     
     print('## Region:' + region)
+    # S3 events start a rollout; SageMaker endpoint state changes and the scheduled
+    # poll advance the rollout in progress, so no invocation waits on the endpoint
+    if event.get('source') != 'aws.s3':
+        rollout_status = endpoint_rollout.advance_rollout(
+            sm_client, table_tenant_details, tenant_id, endpoint_name, role_arn, cloudwatch)
+        return response_for(rollout_status)
+
     bucket_name = event['detail']['bucket']['name']
     print('## Bucket_Name:' + bucket_name)
     object_key = event['detail']['object']['key']
     print('## Object_Key:' + object_key)
     
-    dynamo_item = dynamo.get_item(
-        TableName='MLaaS-TenantDetails',
-        Key={
-            'tenantId': {
-                'S': tenant_id
-                }
-        }
-    )    
-   
-    model_version_int = int(dynamo_item['Item']['modelVersion']['N'])
-    version = str(model_version_int)
+    # The artifact carries the version allocated to its training run; older artifact
+    # names fall back to the version the pipeline recorded as trained
+    model_version_int = model_versioning.parse_model_version(object_key)
+    if model_version_int is None:
+        model_version_int = model_versioning.candidate_model_version(table_tenant_details, tenant_id)
     model_data_uri = 's3://'+ bucket_name+ '/' + object_key
     
-    updated_model_name = tenant_id + "-SageMaker-Model-" + version
-    updated_endpoint_config_name = tenant_id + "-EndpointConfig-" + version
-    
-    describe_endpoint = sm_client.describe_endpoint(
-        EndpointName = endpoint_name 
-    )
-    
-    endpoint_config_name = describe_endpoint['EndpointConfigName']
-    
-    endpoint_config_desc = sm_client.describe_endpoint_config(
-        EndpointConfigName=endpoint_config_name
-    )
-    
-    current_model_name = ''
-    initial_instance_count = 0
-    instance_type = ""
-    for val in endpoint_config_desc['ProductionVariants']:
-        if val['InitialVariantWeight'] ==  1.0:
-           current_model_name = val['ModelName']
-           initial_instance_count = val['InitialInstanceCount']
-           instance_type = val['InstanceType']
-           break
-    
-    model_desc = sm_client.describe_model(ModelName=current_model_name)
-    image_uri = model_desc['PrimaryContainer']['Image']
-    
-    response = sm_client.create_model(
-        ModelName=updated_model_name,
-        PrimaryContainer={
-            'Image': image_uri,
-            'ModelDataUrl': model_data_uri,
-        },
-        ExecutionRoleArn=role_arn
-    )
-    
-    response = sm_client.create_endpoint_config(
-    EndpointConfigName = updated_endpoint_config_name,
-        ProductionVariants=[
-            {
-                'VariantName': 'Variant0',
-                'ModelName':  updated_model_name,
-                'InitialInstanceCount': initial_instance_count,
-                'InstanceType': instance_type,
-                'InitialVariantWeight': 1
-            }
-    ])
-     
-    response = sm_client.update_endpoint(
-        EndpointName=endpoint_name,
-        EndpointConfigName=updated_endpoint_config_name,
-        RetainAllVariantProperties=False,
-    )
-    
-    sm_client.get_waiter('endpoint_in_service').wait(EndpointName=endpoint_name)
-    
+    rollout_status = endpoint_rollout.start_rollout(
+        sm_client, table_tenant_details, tenant_id, endpoint_name, model_version_int, model_data_uri, role_arn,
+        rollout_policy_for(tenant_id))
+    return response_for(rollout_status)
+
+
+def rollout_policy_for(tenant_id):
+    tenant_details = table_tenant_details.get_item(Key={'tenantId': tenant_id}, ProjectionExpression='rolloutMode')
+    return RolloutPolicy(
+        mode=tenant_details.get('Item', {}).get('rolloutMode') or ALL_AT_ONCE_MODE,
+        traffic_percents=canary_traffic_percents,
+        step_seconds=canary_step_seconds,
+        max_latency_regression_percent=canary_max_latency_regression_percent,
+        max_error_rate_percent=canary_max_error_rate_percent)
+
+
+def response_for(rollout_status):
     return {
         "statusCode": 200,
         "headers": {
@@ -102,6 +73,7 @@ def handler(event, context):
         },
         "body": json.dumps({
             "Region ": region, 
-            "ProjectDescription" : "proj_desc" 
+            "ProjectDescription" : "proj_desc",
+            "RolloutStatus": rollout_status
         })
-    }
\ No newline at end of file
+    }
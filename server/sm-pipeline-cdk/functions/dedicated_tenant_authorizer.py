@@ -14,6 +14,8 @@ import authorizer_layer
 from authorizer_layer import SessionParameters
 import auth_manager
 import utils
+from tenant_details_cache import TenantDetailsCache
+from jwks_cache import JwksCache
 from collections import namedtuple
 
 region = os.environ['AWS_REGION']
@@ -22,6 +24,8 @@ tenant_id_lock = os.environ['TENANT_ID']
 dynamodb = boto3.resource('dynamodb')
 sts_client = boto3.client('sts')
 table_tenant_details = dynamodb.Table('MLaaS-TenantDetails')
+tenant_details_cache = TenantDetailsCache(table_tenant_details)
+jwks_cache = JwksCache(region)
 
 def lambda_handler(event, context):
 
@@ -40,25 +44,21 @@ def lambda_handler(event, context):
     logger.info(unauthorized_claims)
 
     # get tenant user pool and app client to validate jwt token against
-    tenant_details = table_tenant_details.get_item(
-        Key={
-            'tenantId': unauthorized_claims['custom:tenantId']
-        }
-    )
+    tenant_details = tenant_details_cache.get(unauthorized_claims['custom:tenantId'])
     logger.info(tenant_details)
 
-    userpool_id = tenant_details['Item']['userPoolId']
-    appclient_id = tenant_details['Item']['appClientId']
-    tenant_tier = tenant_details['Item']['tenantTier']
-    bucket = tenant_details['Item']['s3Bucket']
-    tenant_id = tenant_details['Item']['tenantId']    
-
-    # get keys for tenant user pool to validate
-    keys_url = 'https://cognito-idp.{}.amazonaws.com/{}/.well-known/jwks.json'.format(
-        region, userpool_id)
-    with urllib.request.urlopen(keys_url) as f:
-        response = f.read()
-    keys = json.loads(response.decode('utf-8'))['keys']
+    if tenant_details is None:
+        logger.error('Unauthorized: unknown tenant')
+        raise Exception('Unauthorized')
+
+    userpool_id = tenant_details['userPoolId']
+    appclient_id = tenant_details['appClientId']
+    tenant_tier = tenant_details['tenantTier']
+    bucket = tenant_details['s3Bucket']
+    tenant_id = tenant_details['tenantId']    
+
+    # get keys for tenant user pool to validate, cached across warm invocations
+    keys = jwks_cache.key_resolver(userpool_id)
 
     # authenticate against cognito user pool using the key
     response = authorizer_layer.validateJWT(
@@ -0,0 +1,508 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import re
+import time
+
+from botocore.exceptions import ClientError
+
+import model_versioning
+from canary_analysis import CANARY_MODE, RolloutPolicy, find_regression, variant_metrics
+
+# The rollout of a tenant's dedicated endpoint is kept in its MLaaS-TenantDetails item,
+# so every step runs in a short invocation instead of waiting on the endpoint:
+#   start_rollout   creates the model and endpoint configs and calls update_endpoint
+#   advance_rollout runs on endpoint state change events and on a schedule; once the
+#                   endpoint settles it takes the next step of the rollout
+ROLLOUT_ATTRIBUTE = 'endpointRollout'
+# The serving variant of the endpoint, see deployment_profile
+PROFILE_ATTRIBUTE = 'deploymentProfile'
+
+ROLLOUT_UPDATING = 'UPDATING'
+ROLLOUT_COMPLETED = 'COMPLETED'
+ROLLOUT_FAILED = 'FAILED'
+# Returned by start_rollout when another rollout is in progress; the newest queued
+# version starts once that rollout finishes
+ROLLOUT_QUEUED = 'QUEUED'
+
+# Phases of an UPDATING rollout. All at once rollouts only go through FINALIZING;
+# canary and shadow rollouts deploy the new model next to the serving one first:
+#   DEPLOYING -> SHIFTING (one step per traffic share) -> FINALIZING
+#   SHIFTING on a regression -> DRAINING (canary only) -> ROLLING_BACK
+DEPLOYING = 'DEPLOYING'
+SHIFTING = 'SHIFTING'
+DRAINING = 'DRAINING'
+ROLLING_BACK = 'ROLLING_BACK'
+FINALIZING = 'FINALIZING'
+
+ENDPOINT_IN_PROGRESS_STATUSES = ('Creating', 'Updating', 'SystemUpdating', 'RollingBack')
+
+# A transition that calls SageMaker sets updateRequested to False and back to True once
+# the call went through; until then the endpoint still shows the state before the call.
+# An invocation gets the longest Lambda run time to make the call before it is given up.
+UPDATE_REQUEST_TIMEOUT_SECONDS = 900
+
+VARIANT_NAME = 'Variant0'
+
+# Version in a model or endpoint config name, see model_name_for and endpoint_config_name_for
+VERSION_SUFFIX_PATTERN = re.compile(r'-(\d+)(?:-[a-z_]+)?$')
+
+
+def model_name_for(tenant_id, version):
+    return f"{tenant_id}-SageMaker-Model-{version}"
+
+
+def endpoint_config_name_for(tenant_id, version, mode=None):
+    """Config serving version alone, or next to the serving model for a canary or shadow mode"""
+    name = f"{tenant_id}-EndpointConfig-{version}"
+    return f"{name}-{mode}" if mode else name
+
+
+def new_variant_name_for(version):
+    return f"Variant{version}"
+
+
+def serving_variant(sm_client, endpoint_name):
+    """
+    Describes the production variant taking all traffic on the endpoint: its image,
+    instance type and count, and the endpoint config it belongs to
+    """
+    endpoint = sm_client.describe_endpoint(EndpointName=endpoint_name)
+    endpoint_config = sm_client.describe_endpoint_config(EndpointConfigName=endpoint['EndpointConfigName'])
+    for variant in endpoint_config['ProductionVariants']:
+        if variant['InitialVariantWeight'] == 1.0:
+            model = sm_client.describe_model(ModelName=variant['ModelName'])
+            return {
+                'VariantName': variant['VariantName'],
+                'ModelName': variant['ModelName'],
+                'InstanceType': variant['InstanceType'],
+                'InitialInstanceCount': variant['InitialInstanceCount'],
+                'Image': model['PrimaryContainer']['Image'],
+                'EndpointConfigName': endpoint['EndpointConfigName'],
+            }
+    raise ValueError(f"Endpoint {endpoint_name} has no variant taking all traffic")
+
+
+def deployment_profile(sm_client, table, tenant_id, endpoint_name, refresh=False):
+    """
+    Returns the serving variant as persisted under PROFILE_ATTRIBUTE in the tenant's
+    item. The image, instance type and count do not change between versions, so the
+    endpoint is only described when there is no profile yet or refresh is set.
+    """
+    if not refresh:
+        item = table.get_item(Key={'tenantId': tenant_id}, ProjectionExpression=PROFILE_ATTRIBUTE).get('Item', {})
+        if PROFILE_ATTRIBUTE in item:
+            profile = item[PROFILE_ATTRIBUTE]
+            return dict(profile, InitialInstanceCount=int(profile['InitialInstanceCount']))
+    profile = serving_variant(sm_client, endpoint_name)
+    save_deployment_profile(table, tenant_id, profile)
+    return profile
+
+
+def save_deployment_profile(table, tenant_id, profile):
+    table.update_item(
+        Key={'tenantId': tenant_id},
+        UpdateExpression='SET #profile = :profile',
+        ConditionExpression='attribute_exists(tenantId)',
+        ExpressionAttributeNames={'#profile': PROFILE_ATTRIBUTE},
+        ExpressionAttributeValues={':profile': profile})
+
+
+def invalidate_deployment_profile(table, tenant_id):
+    table.update_item(
+        Key={'tenantId': tenant_id},
+        UpdateExpression='REMOVE #profile',
+        ExpressionAttributeNames={'#profile': PROFILE_ATTRIBUTE})
+
+
+def _create_if_missing(create, **kwargs):
+    """Runs a SageMaker create call, tolerating a resource left by an earlier attempt"""
+    try:
+        create(**kwargs)
+    except ClientError as e:
+        if 'already exist' not in e.response['Error'].get('Message', ''):
+            raise
+
+
+def _production_variant(variant_name, model_name, variant, weight):
+    return {
+        'VariantName': variant_name,
+        'ModelName': model_name,
+        'InitialInstanceCount': variant['InitialInstanceCount'],
+        'InstanceType': variant['InstanceType'],
+        'InitialVariantWeight': weight
+    }
+
+
+def prepare_endpoint_config(sm_client, tenant_id, version, model_data_uri, role_arn, variant, policy=None):
+    """
+    Creates the model and endpoint config of version, copying the image, instance type
+    and count of variant, the one currently serving. For a canary or shadow policy it
+    also creates the config running version next to variant.
+    """
+    policy = policy or RolloutPolicy()
+    model_name = model_name_for(tenant_id, version)
+    _create_if_missing(
+        sm_client.create_model,
+        ModelName=model_name,
+        PrimaryContainer={
+            'Image': variant['Image'],
+            'ModelDataUrl': model_data_uri,
+        },
+        ExecutionRoleArn=role_arn)
+    _create_if_missing(
+        sm_client.create_endpoint_config,
+        EndpointConfigName=endpoint_config_name_for(tenant_id, version),
+        ProductionVariants=[_production_variant(VARIANT_NAME, model_name, variant, 1)])
+    if not policy.gradual:
+        return
+
+    # the new variant gets the serving variant's capacity so any traffic share fits
+    baseline = _production_variant(variant['VariantName'], variant['ModelName'], variant, 1)
+    new_variant = _production_variant(new_variant_name_for(version), model_name, variant, 1)
+    if policy.mode == CANARY_MODE:
+        percent = policy.traffic_percents[0]
+        baseline['InitialVariantWeight'] = 100 - percent
+        new_variant['InitialVariantWeight'] = percent
+        variants = {'ProductionVariants': [baseline, new_variant]}
+    else:
+        variants = {'ProductionVariants': [baseline], 'ShadowProductionVariants': [new_variant]}
+    _create_if_missing(
+        sm_client.create_endpoint_config,
+        EndpointConfigName=endpoint_config_name_for(tenant_id, version, policy.mode),
+        **variants)
+
+
+def start_rollout(sm_client, table, tenant_id, endpoint_name, version, model_data_uri, role_arn, policy=None):
+    """
+    Starts updating the endpoint to version and returns without waiting for it.
+    Returns ROLLOUT_UPDATING, or ROLLOUT_QUEUED when a rollout is already in progress.
+    """
+    version = int(version)
+    policy = policy or RolloutPolicy()
+    now = int(time.time())
+    rollout = {
+        'status': ROLLOUT_UPDATING,
+        'phase': DEPLOYING if policy.gradual else FINALIZING,
+        'step': 0,
+        'version': version,
+        'modelDataUri': model_data_uri,
+        'endpointConfigName': endpoint_config_name_for(tenant_id, version),
+        'policy': policy.to_item(),
+        'startedAt': now,
+        'updateRequested': False,
+        'updateClaimedAt': now,
+    }
+    while True:
+        try:
+            table.update_item(
+                Key={'tenantId': tenant_id},
+                UpdateExpression='SET #rollout = :rollout',
+                ConditionExpression='attribute_exists(tenantId) AND '
+                                    '(attribute_not_exists(#rollout) OR #rollout.#status <> :updating)',
+                ExpressionAttributeNames={'#rollout': ROLLOUT_ATTRIBUTE, '#status': 'status'},
+                ExpressionAttributeValues={':rollout': rollout, ':updating': ROLLOUT_UPDATING})
+            break
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+        current = get_rollout(table, tenant_id)
+        if current is None:
+            raise KeyError(f"Unknown tenant {tenant_id}")
+        # retry the claim when the rollout in progress finished meanwhile
+        if current['status'] == ROLLOUT_UPDATING and \
+                _queue_rollout(table, tenant_id, version, model_data_uri, policy):
+            return ROLLOUT_QUEUED
+
+    try:
+        variant = deployment_profile(sm_client, table, tenant_id, endpoint_name)
+        try:
+            updated = _update_endpoint(sm_client, table, tenant_id, endpoint_name, rollout, variant, role_arn, policy)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ValidationException':
+                raise
+            # the profile no longer matches the endpoint, e.g. it was changed by hand
+            print(f"## Refreshing the deployment profile: {e}")
+            variant = deployment_profile(sm_client, table, tenant_id, endpoint_name, refresh=True)
+            updated = _update_endpoint(sm_client, table, tenant_id, endpoint_name, rollout, variant, role_arn, policy)
+    except Exception as e:
+        _end_rollout(table, tenant_id, endpoint_name, rollout, ROLLOUT_FAILED, str(e))
+        raise
+    if not updated:
+        print(f"## Rollout of version {version} to {endpoint_name} was ended meanwhile, left the endpoint as is")
+        return get_rollout(table, tenant_id)['status']
+    print(f"## Rollout of version {version} to {endpoint_name} started, mode {policy.mode}")
+    return ROLLOUT_UPDATING
+
+
+def _update_endpoint(sm_client, table, tenant_id, endpoint_name, rollout, variant, role_arn, policy):
+    """Returns False, without touching the endpoint, when the rollout was ended meanwhile"""
+    version = rollout['version']
+    prepare_endpoint_config(sm_client, tenant_id, version, rollout['modelDataUri'], role_arn, variant, policy)
+    # the profile of the version's own config, kept once the rollout completes
+    changes = {'profile': dict(variant, VariantName=VARIANT_NAME, ModelName=model_name_for(tenant_id, version),
+                               EndpointConfigName=rollout['endpointConfigName'])}
+    target_config_name = rollout['endpointConfigName']
+    if policy.gradual:
+        target_config_name = endpoint_config_name_for(tenant_id, version, policy.mode)
+        changes.update(baselineConfigName=variant['EndpointConfigName'], baselineVariant=variant['VariantName'],
+                       newVariant=new_variant_name_for(version))
+    if not _transition(table, tenant_id, rollout, changes):
+        return False
+    sm_client.update_endpoint(
+        EndpointName=endpoint_name,
+        EndpointConfigName=target_config_name,
+        RetainAllVariantProperties=False)
+    return _transition(table, tenant_id, rollout, {'updateRequested': True})
+
+
+def _queue_rollout(table, tenant_id, version, model_data_uri, policy):
+    """
+    Records version to roll out next, unless the version rolling out or queued already
+    is as new. Returns False when no rollout is in progress anymore.
+    """
+    try:
+        table.update_item(
+            Key={'tenantId': tenant_id},
+            UpdateExpression='SET #rollout.#pending = :pending',
+            ConditionExpression='#rollout.#status = :updating AND #rollout.#version < :version AND '
+                                '(attribute_not_exists(#rollout.#pending) OR #rollout.#pending.#version < :version)',
+            ExpressionAttributeNames={'#rollout': ROLLOUT_ATTRIBUTE, '#status': 'status',
+                                      '#pending': 'pending', '#version': 'version'},
+            ExpressionAttributeValues={
+                ':pending': {'version': version, 'modelDataUri': model_data_uri, 'policy': policy.to_item()},
+                ':updating': ROLLOUT_UPDATING, ':version': version})
+        print(f"## Rollout in progress, version {version} queued")
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+    rollout = get_rollout(table, tenant_id)
+    if rollout is None or rollout['status'] != ROLLOUT_UPDATING:
+        return False
+    print(f"## Rollout in progress, version {version} superseded")
+    return True
+
+
+def _transition(table, tenant_id, rollout, changes):
+    """
+    Applies changes to the rollout if it is still in the phase and step it was read in,
+    updating rollout in place. Returns False when another invocation moved it first.
+    """
+    names = {'#rollout': ROLLOUT_ATTRIBUTE, '#status': 'status', '#version': 'version',
+             '#phase': 'phase', '#step': 'step'}
+    values = {':updating': ROLLOUT_UPDATING, ':version': rollout['version'],
+              ':phase': rollout['phase'], ':step': rollout['step']}
+    assignments = []
+    for index, (key, value) in enumerate(changes.items()):
+        names[f"#change{index}"] = key
+        values[f":change{index}"] = value
+        assignments.append(f"#rollout.#change{index} = :change{index}")
+    try:
+        table.update_item(
+            Key={'tenantId': tenant_id},
+            UpdateExpression='SET ' + ', '.join(assignments),
+            ConditionExpression='#rollout.#status = :updating AND #rollout.#version = :version AND '
+                                '#rollout.#phase = :phase AND #rollout.#step = :step',
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+    rollout.update(changes)
+    return True
+
+
+def _finish_rollout(table, tenant_id, rollout, status, failure_reason=None):
+    """
+    Moves the rollout out of ROLLOUT_UPDATING, keeping any version queued meanwhile.
+    Returns False when another invocation finished it first.
+    """
+    values = {':status': status, ':finished_at': int(time.time()), ':updating': ROLLOUT_UPDATING,
+              ':version': rollout['version']}
+    update_expression = 'SET #rollout.#status = :status, #rollout.finishedAt = :finished_at'
+    if failure_reason:
+        update_expression += ', #rollout.failureReason = :failure_reason'
+        values[':failure_reason'] = failure_reason
+    try:
+        table.update_item(
+            Key={'tenantId': tenant_id},
+            UpdateExpression=update_expression,
+            ConditionExpression='#rollout.#status = :updating AND #rollout.#version = :version',
+            ExpressionAttributeNames={'#rollout': ROLLOUT_ATTRIBUTE, '#status': 'status', '#version': 'version'},
+            ExpressionAttributeValues=values)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+
+
+def protected_versions(table, tenant_id):
+    """
+    Versions whose model or endpoint config must be kept: the served one, the one
+    rolling out or queued, and the ones behind the deployment profile and the baseline
+    a rollout may return to
+    """
+    item = table.get_item(Key={'tenantId': tenant_id}, ConsistentRead=True)['Item']
+    rollout = item.get(ROLLOUT_ATTRIBUTE, {})
+    versions = {int(item[model_versioning.VERSION_ATTRIBUTE])}
+    if rollout.get('status') == ROLLOUT_UPDATING:
+        versions.add(int(rollout['version']))
+    if 'pending' in rollout:
+        versions.add(int(rollout['pending']['version']))
+    names = [item.get(PROFILE_ATTRIBUTE, {}).get('ModelName'), rollout.get('baselineConfigName')]
+    versions.update(int(match.group(1)) for match in map(VERSION_SUFFIX_PATTERN.search, filter(None, names)) if match)
+    return versions
+
+
+def get_rollout(table, tenant_id):
+    item = table.get_item(Key={'tenantId': tenant_id}, ConsistentRead=True).get('Item', {})
+    return item.get(ROLLOUT_ATTRIBUTE)
+
+
+def advance_rollout(sm_client, table, tenant_id, endpoint_name, role_arn, cloudwatch=None):
+    """
+    Takes the next step of an in-progress rollout once the endpoint settled. The
+    version is promoted when the endpoint is InService on its config; a failed, rolled
+    back or regressing update ends as ROLLOUT_FAILED. A queued version is started once
+    no rollout is in progress. cloudwatch is required for canary and shadow rollouts.
+    Returns the rollout status, None when there is no rollout.
+    """
+    rollout = get_rollout(table, tenant_id)
+    if rollout is None:
+        return None
+    if rollout['status'] == ROLLOUT_UPDATING:
+        if _check_endpoint(sm_client, cloudwatch, table, tenant_id, endpoint_name, rollout) == ROLLOUT_UPDATING:
+            return ROLLOUT_UPDATING
+        rollout = get_rollout(table, tenant_id)
+
+    pending = rollout.get('pending')
+    if pending is not None and rollout['status'] != ROLLOUT_UPDATING:
+        return start_rollout(sm_client, table, tenant_id, endpoint_name, pending['version'],
+                             pending['modelDataUri'], role_arn, RolloutPolicy.from_item(pending.get('policy')))
+    return rollout['status']
+
+
+def _check_endpoint(sm_client, cloudwatch, table, tenant_id, endpoint_name, rollout):
+    # rollouts recorded before updateRequested existed had their update requested
+    if not rollout.get('updateRequested', True):
+        if int(time.time()) - rollout['updateClaimedAt'] < UPDATE_REQUEST_TIMEOUT_SECONDS:
+            print(f"## Update of {endpoint_name} for phase {rollout['phase']} is not requested yet")
+            return ROLLOUT_UPDATING
+        return _end_rollout(table, tenant_id, endpoint_name, rollout, ROLLOUT_FAILED,
+                            f"Update for phase {rollout['phase']} was never requested")
+
+    endpoint = sm_client.describe_endpoint(EndpointName=endpoint_name)
+    endpoint_status = endpoint['EndpointStatus']
+    if endpoint_status in ENDPOINT_IN_PROGRESS_STATUSES:
+        print(f"## Endpoint {endpoint_name} is {endpoint_status}")
+        return ROLLOUT_UPDATING
+
+    phase = rollout.get('phase', FINALIZING)
+    policy = RolloutPolicy.from_item(rollout.get('policy'))
+    expected_config_name = {
+        DEPLOYING: endpoint_config_name_for(tenant_id, rollout['version'], policy.mode),
+        SHIFTING: endpoint_config_name_for(tenant_id, rollout['version'], policy.mode),
+        DRAINING: endpoint_config_name_for(tenant_id, rollout['version'], policy.mode),
+        ROLLING_BACK: rollout.get('baselineConfigName'),
+        FINALIZING: rollout['endpointConfigName'],
+    }[phase]
+    if endpoint_status != 'InService' or endpoint['EndpointConfigName'] != expected_config_name:
+        # SageMaker rolls a failed update back to the previous config
+        failure_reason = endpoint.get('FailureReason') or \
+            f"Endpoint is {endpoint_status} on {endpoint['EndpointConfigName']}"
+        return _end_rollout(table, tenant_id, endpoint_name, rollout, ROLLOUT_FAILED, failure_reason)
+
+    if phase == FINALIZING:
+        return _end_rollout(table, tenant_id, endpoint_name, rollout, ROLLOUT_COMPLETED)
+    if phase == ROLLING_BACK:
+        return _end_rollout(table, tenant_id, endpoint_name, rollout, ROLLOUT_FAILED, rollout.get('failureReason'))
+
+    if phase == DRAINING:
+        _act(table, tenant_id, endpoint_name, rollout, {'phase': ROLLING_BACK}, sm_client.update_endpoint,
+             EndpointName=endpoint_name, EndpointConfigName=rollout['baselineConfigName'],
+             RetainAllVariantProperties=False)
+        return ROLLOUT_UPDATING
+    if phase == DEPLOYING:
+        _transition(table, tenant_id, rollout, {'phase': SHIFTING, 'stepStartedAt': int(time.time())})
+        return ROLLOUT_UPDATING
+    return _take_step(sm_client, cloudwatch, table, tenant_id, endpoint_name, rollout, policy)
+
+
+def _act(table, tenant_id, endpoint_name, rollout, changes, action, **kwargs):
+    """
+    Applies changes to the rollout and runs the SageMaker call they move it on to,
+    failing the rollout if the call is rejected. Returns False, without calling
+    SageMaker, when another invocation moved the rollout first.
+    """
+    if not _transition(table, tenant_id, rollout,
+                       dict(changes, updateRequested=False, updateClaimedAt=int(time.time()))):
+        return False
+    try:
+        action(**kwargs)
+    except Exception as e:
+        _end_rollout(table, tenant_id, endpoint_name, rollout, ROLLOUT_FAILED, str(e))
+        raise
+    return _transition(table, tenant_id, rollout, {'updateRequested': True})
+
+
+def _take_step(sm_client, cloudwatch, table, tenant_id, endpoint_name, rollout, policy):
+    """Judges the traffic share just served, then shifts more traffic, finalizes or rolls back"""
+    now = int(time.time())
+    if now - rollout['stepStartedAt'] < policy.step_seconds:
+        return ROLLOUT_UPDATING
+
+    baseline_variant, new_variant = rollout['baselineVariant'], rollout['newVariant']
+    metrics = variant_metrics(cloudwatch, endpoint_name, [baseline_variant, new_variant],
+                              int(rollout['stepStartedAt']), now)
+    print(f"## Step {rollout['step']} metrics: {metrics}")
+    regression = find_regression(metrics, baseline_variant, new_variant, policy)
+    if regression is not None:
+        print(f"## Rolling back version {rollout['version']}: {regression}")
+        if policy.mode == CANARY_MODE:
+            # take the canary out of traffic right away, the config swap takes minutes
+            _act(table, tenant_id, endpoint_name, rollout, {'phase': DRAINING, 'failureReason': regression},
+                 sm_client.update_endpoint_weights_and_capacities,
+                 EndpointName=endpoint_name, DesiredWeightsAndCapacities=[
+                     {'VariantName': baseline_variant, 'DesiredWeight': 1},
+                     {'VariantName': new_variant, 'DesiredWeight': 0}])
+        else:
+            _act(table, tenant_id, endpoint_name, rollout, {'phase': ROLLING_BACK, 'failureReason': regression},
+                 sm_client.update_endpoint,
+                 EndpointName=endpoint_name, EndpointConfigName=rollout['baselineConfigName'],
+                 RetainAllVariantProperties=False)
+        return ROLLOUT_UPDATING
+
+    step = int(rollout['step']) + 1
+    if step < policy.steps:
+        percent = policy.traffic_percents[step]
+        print(f"## Shifting {percent}% of traffic to {new_variant}")
+        _act(table, tenant_id, endpoint_name, rollout, {'step': step, 'stepStartedAt': now},
+             sm_client.update_endpoint_weights_and_capacities,
+             EndpointName=endpoint_name, DesiredWeightsAndCapacities=[
+                 {'VariantName': baseline_variant, 'DesiredWeight': 100 - percent},
+                 {'VariantName': new_variant, 'DesiredWeight': percent}])
+    else:
+        _act(table, tenant_id, endpoint_name, rollout, {'phase': FINALIZING}, sm_client.update_endpoint,
+             EndpointName=endpoint_name, EndpointConfigName=rollout['endpointConfigName'],
+             RetainAllVariantProperties=False)
+    return ROLLOUT_UPDATING
+
+
+def _end_rollout(table, tenant_id, endpoint_name, rollout, status, failure_reason=None):
+    if not _finish_rollout(table, tenant_id, rollout, status, failure_reason):
+        return status
+    version = int(rollout['version'])
+    if status == ROLLOUT_COMPLETED:
+        if 'profile' in rollout:
+            save_deployment_profile(table, tenant_id, rollout['profile'])
+        if not model_versioning.promote_model_version(table, tenant_id, version):
+            print('## A newer model version is already served, kept it')
+        print(f"## Rollout of version {version} to {endpoint_name} completed")
+    else:
+        # described afresh on the next rollout, in case the failure came from a stale profile
+        invalidate_deployment_profile(table, tenant_id)
+        print(f"## Rollout of version {version} to {endpoint_name} failed: {failure_reason}")
+    return status
@@ -0,0 +1,120 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+# SageMaker InvokeEndpoint accepts payloads up to 6 MB; stay below it
+MAX_PAYLOAD_BYTES = int(os.getenv("BATCH_MAX_PAYLOAD_BYTES", str(5 * 1024 * 1024)))
+MAX_ROWS_PER_CHUNK = int(os.getenv("BATCH_MAX_ROWS_PER_CHUNK", "1000"))
+MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+
+def parse_batch_rows(request_body_data: str) -> list:
+    """
+    Parses a batch request body into CSV rows.
+    The body is either newline separated CSV rows or a JSON array whose items are
+    CSV strings or lists of feature values.
+    """
+    if request_body_data.lstrip().startswith("["):
+        rows = json.loads(request_body_data)
+        return [
+            row if isinstance(row, str) else ",".join(str(value) for value in row)
+            for row in rows
+        ]
+    return [row for row in request_body_data.splitlines() if row.strip()]
+
+
+def chunk_rows(rows: list, max_payload_bytes: int = MAX_PAYLOAD_BYTES,
+               max_rows_per_chunk: int = MAX_ROWS_PER_CHUNK):
+    """
+    Groups consecutive rows into chunks whose newline joined payload stays under
+    max_payload_bytes. Yields (first_row_index, rows) tuples; a single row that is too
+    large on its own is yielded alone so it can be reported as an error.
+    """
+    chunk = []
+    chunk_bytes = 0
+    first_row_index = 0
+    for index, row in enumerate(rows):
+        row_bytes = len(row.encode("utf-8")) + 1
+        if chunk and (chunk_bytes + row_bytes > max_payload_bytes or len(chunk) >= max_rows_per_chunk):
+            yield first_row_index, chunk
+            chunk = []
+            chunk_bytes = 0
+        if not chunk:
+            first_row_index = index
+        chunk.append(row)
+        chunk_bytes += row_bytes
+    if chunk:
+        yield first_row_index, chunk
+
+
+def split_predictions(result: str, expected_count: int) -> list:
+    """
+    Splits a text/csv inference result into one prediction per input row.
+    The built-in XGBoost container separates predictions with newlines or commas
+    depending on its version.
+    """
+    predictions = [line for line in result.strip().splitlines() if line.strip()]
+    if len(predictions) == 1 and expected_count > 1:
+        predictions = predictions[0].split(",")
+    if len(predictions) != expected_count:
+        raise ValueError(
+            f"Endpoint returned {len(predictions)} predictions for {expected_count} rows")
+    return [prediction.strip() for prediction in predictions]
+
+
+def is_server_error(error: Exception) -> bool:
+    """
+    True when invoking the endpoint failed rather than the rows sent: throttling,
+    endpoint 5XX, expired or invalid credentials, connection errors. A ModelError whose
+    container answered 4XX and payload or prediction count errors are row errors.
+    """
+    if isinstance(error, ClientError):
+        original_status = error.response.get('OriginalStatusCode')
+        return not (error.response['Error'].get('Code') == 'ModelError'
+                    and original_status and 400 <= int(original_status) < 500)
+    return isinstance(error, BotoCoreError)
+
+
+def score_chunk(first_row_index: int, chunk: list, invoke_chunk,
+                max_payload_bytes: int = MAX_PAYLOAD_BYTES, raise_server_errors: bool = False) -> list:
+    """
+    Scores one chunk through invoke_chunk(payload) -> result text. Returns one result
+    per row holding either a prediction or the error of the chunk. With
+    raise_server_errors set, server errors (see is_server_error) are raised instead.
+    """
+    payload = "\n".join(chunk)
+    try:
+        if len(payload.encode("utf-8")) > max_payload_bytes:
+            raise ValueError(f"Row exceeds the {max_payload_bytes} byte payload limit")
+        predictions = split_predictions(invoke_chunk(payload), len(chunk))
+        return [{"row": first_row_index + offset, "prediction": prediction}
+                for offset, prediction in enumerate(predictions)]
+    except Exception as e:
+        logging.error(f"Chunk starting at row {first_row_index} failed: {e}")
+        if raise_server_errors and is_server_error(e):
+            raise
+        return [{"row": first_row_index + offset, "error": str(e)}
+                for offset in range(len(chunk))]
+
+
+def score_rows(rows: list, invoke_chunk, max_concurrency: int = MAX_CONCURRENCY,
+               max_payload_bytes: int = MAX_PAYLOAD_BYTES,
+               max_rows_per_chunk: int = MAX_ROWS_PER_CHUNK,
+               raise_server_errors: bool = False) -> list:
+    """
+    Scores rows in payload sized chunks dispatched concurrently.
+    Returns one result per row, in input order.
+    """
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [
+            executor.submit(score_chunk, first_row_index, chunk, invoke_chunk, max_payload_bytes,
+                            raise_server_errors)
+            for first_row_index, chunk in chunk_rows(rows, max_payload_bytes, max_rows_per_chunk)
+        ]
+        return [result for future in futures for result in future.result()]
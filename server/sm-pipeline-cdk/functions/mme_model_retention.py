@@ -0,0 +1,43 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import boto3
+
+import metrics_manager
+import model_retention
+import model_versioning
+
+# Gold tenants' artifacts belong to their dedicated endpoint and are never pruned here
+GOLD_TIER = 'GOLD'
+
+table_tenant_details = boto3.resource('dynamodb').Table('MLaaS-TenantDetails')
+s3 = boto3.client('s3')
+
+
+def handler(event, context):
+    """
+    Prunes a pooled tenant's multi-model endpoint artifacts when a new one lands
+    under model_artifacts_mme/. The served modelVersion and the one served before
+    it are never deleted.
+    """
+    print('## EVENT')
+    print(event)
+    bucket_name = event['detail']['bucket']['name']
+    object_key = event['detail']['object']['key']
+    artifact = model_retention.parse_mme_artifact_key(object_key)
+    if artifact is None:
+        print(f"## Skipping {object_key}, not a model artifact")
+        return None
+    tenant_id = artifact[0]
+
+    tenant_details = table_tenant_details.get_item(Key={'tenantId': tenant_id})['Item']
+    if tenant_details.get('tenantTier', '').upper() == GOLD_TIER:
+        print(f"## Skipping {object_key}, {tenant_id} has a dedicated endpoint")
+        return None
+    served_version = int(tenant_details[model_versioning.VERSION_ATTRIBUTE])
+    report = model_retention.prune_mme_artifacts(
+        s3, bucket_name, tenant_id, model_retention.retained_versions, [served_version])
+    print(f"## Pruned versions {report['deletedVersions']} of {tenant_id}, "
+          f"reclaimed {report['reclaimedBytes']} bytes, failed {report['failedKeys']}")
+    metrics_manager.record_tenant_metric(tenant_id, "ReclaimedModelBytes", "Bytes", report['reclaimedBytes'])
+    return report
@@ -0,0 +1,106 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+import time
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+import metrics_manager
+import model_retention
+import model_versioning
+
+# Gold tenants are served by their dedicated endpoint, whose deployer promotes them
+GOLD_TIER = 'GOLD'
+
+pooled_endpoint_name = os.getenv("POOLED_ENDPOINT_NAME")
+warmup_attempts = int(os.getenv("WARMUP_ATTEMPTS", "4"))
+warmup_backoff_seconds = float(os.getenv("WARMUP_BACKOFF_SECONDS", "5"))
+# Features of the synthetic row sent when the tenant has no warmupPayload
+warmup_feature_count = int(os.getenv("WARMUP_FEATURE_COUNT", "1"))
+
+table_tenant_details = boto3.resource('dynamodb').Table('MLaaS-TenantDetails')
+# the first invocation of a target model waits for it to be downloaded and loaded
+runtime = boto3.client('runtime.sagemaker', config=Config(read_timeout=120, retries={'max_attempts': 0}))
+
+
+def handler(event, context):
+    """
+    Warms a pooled tenant's new model up on the multi-model endpoint when its artifact
+    lands under model_artifacts_mme/, then promotes it from the pipeline's
+    candidateModelVersion to the tenant's modelVersion so the first tenant request
+    finds it loaded. Raises when the model cannot be loaded,
+    leaving the served version in place and the event to be retried.
+    """
+    print('## EVENT')
+    print(event)
+    object_key = event['detail']['object']['key']
+    artifact = model_retention.parse_mme_artifact_key(object_key)
+    if artifact is None:
+        print(f"## Skipping {object_key}, not a model artifact")
+        return None
+    tenant_id, version = artifact
+
+    tenant_details = table_tenant_details.get_item(Key={'tenantId': tenant_id})['Item']
+    if tenant_details.get('tenantTier', '').upper() == GOLD_TIER:
+        print(f"## Skipping {object_key}, {tenant_id} has a dedicated endpoint")
+        return None
+    served_version = int(tenant_details.get(model_versioning.VERSION_ATTRIBUTE, 0))
+    # A pipeline still writing modelVersion itself has already served this version,
+    # warm it up all the same
+    if version < served_version:
+        print(f"## Skipping {object_key}, version {served_version} is already served")
+        return None
+    print(f"## Candidate version {tenant_details.get(model_versioning.CANDIDATE_ATTRIBUTE)}, "
+          f"served version {served_version}")
+
+    target_model = object_key[len(model_retention.MME_ARTIFACT_PREFIX):]
+    start = time.time()
+    if not warm_up_target_model(runtime, pooled_endpoint_name, target_model, synthetic_payload(tenant_details),
+                                warmup_attempts, warmup_backoff_seconds):
+        raise RuntimeError(f"Warm-up of {target_model} failed, {tenant_id} stays on version {served_version}")
+    warmup_ms = int((time.time() - start) * 1000)
+    print(f"## Warmed up {target_model} in {warmup_ms} ms")
+    metrics_manager.record_tenant_metric(tenant_id, "ModelWarmupMilliseconds", "Milliseconds", warmup_ms)
+
+    promoted = model_versioning.promote_model_version(table_tenant_details, tenant_id, version)
+    if not promoted:
+        print('## A newer model version is already served, kept it')
+    return {'tenantId': tenant_id, 'version': version, 'promoted': promoted, 'warmupMilliseconds': warmup_ms}
+
+
+def synthetic_payload(tenant_details):
+    """A single CSV row to score: the tenant's warmupPayload, or zeros"""
+    return tenant_details.get('warmupPayload') or ','.join(['0'] * warmup_feature_count)
+
+
+def warm_up_target_model(runtime_client, endpoint_name, target_model, payload, attempts, backoff_seconds):
+    """
+    Invokes target_model until the endpoint has it loaded. A 4XX from the model
+    container means the model loaded and only rejected the payload, which still
+    counts as warm. Returns False when every attempt failed.
+    """
+    for attempt in range(attempts):
+        try:
+            runtime_client.invoke_endpoint(
+                EndpointName=endpoint_name,
+                ContentType="text/csv",
+                TargetModel=target_model,
+                Body=payload,
+            )["Body"].read()
+            return True
+        except ClientError as e:
+            original_status = e.response.get('OriginalStatusCode')
+            if e.response['Error']['Code'] == 'ModelError' and original_status and 400 <= int(original_status) < 500:
+                print(f"## {target_model} is loaded, it rejected the warm-up payload: {e}")
+                return True
+            error = e
+        except BotoCoreError as e:
+            # a read timeout while the model is still loading
+            error = e
+        print(f"## Warm-up attempt {attempt + 1} of {target_model} failed: {error}")
+        if attempt + 1 < attempts:
+            time.sleep(backoff_seconds * 2 ** attempt)
+    return False
@@ -0,0 +1,117 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+import re
+
+import model_versioning
+
+# Pooled tenants' artifacts, loaded by the multi-model endpoint as <tenant_id>.model.<version>.tar.gz
+MME_ARTIFACT_PREFIX = 'model_artifacts_mme/'
+
+DEFAULT_RETAINED_VERSIONS = 3
+# S3 DeleteObjects takes at most 1000 keys per request
+DELETE_BATCH_SIZE = 1000
+
+retained_versions = int(os.getenv('MODEL_RETENTION_VERSIONS', str(DEFAULT_RETAINED_VERSIONS)))
+
+
+def versions_to_delete(versions, keep, protected=()):
+    """
+    Picks the versions to delete out of versions: everything but the newest keep, the
+    protected ones and any version newer than the oldest protected one, which may
+    still be on its way to being served.
+    """
+    if keep < 1:
+        raise ValueError("keep must be at least 1")
+    retained = set(sorted(set(versions), reverse=True)[:keep])
+    retained.update(protected)
+    floor = min(protected) if protected else None
+    return sorted(version for version in set(versions)
+                  if version not in retained and (floor is None or version < floor))
+
+
+def mme_artifact_prefix(tenant_id):
+    return f"{MME_ARTIFACT_PREFIX}{tenant_id}.model."
+
+
+def parse_mme_artifact_key(object_key):
+    """Returns (tenant_id, version) of a multi-model endpoint artifact key, None for other keys"""
+    version = model_versioning.parse_model_version(object_key)
+    if not object_key.startswith(MME_ARTIFACT_PREFIX) or version is None:
+        return None
+    return object_key[len(MME_ARTIFACT_PREFIX):-len(f".model.{version}.tar.gz")], version
+
+
+def prune_mme_artifacts(s3_client, bucket, tenant_id, keep, protected=()):
+    """
+    Deletes the tenant's multi-model endpoint artifacts beyond the newest keep
+    versions, in DeleteObjects batches. The newest version older than the protected
+    ones is kept as well: authorizer policies cached before the last promotion still
+    send requests to it as TargetModel. Returns the deleted versions, the keys that
+    failed and the reclaimed bytes.
+    """
+    prefix = mme_artifact_prefix(tenant_id)
+    artifacts = {}
+    for page in s3_client.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            version = model_versioning.parse_model_version(obj['Key'])
+            # parse_model_version alone would also match tenants whose id starts with tenant_id
+            if version is not None and obj['Key'] == f"{prefix}{version}.tar.gz":
+                artifacts[version] = obj
+
+    previous = [version for version in artifacts if protected and version < min(protected)]
+    if previous:
+        protected = list(protected) + [max(previous)]
+    deleted_versions = versions_to_delete(artifacts, keep, protected)
+    failed_keys = []
+    for start in range(0, len(deleted_versions), DELETE_BATCH_SIZE):
+        batch = [artifacts[version]['Key'] for version in deleted_versions[start:start + DELETE_BATCH_SIZE]]
+        response = s3_client.delete_objects(
+            Bucket=bucket, Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True})
+        failed_keys.extend(error['Key'] for error in response.get('Errors', []))
+
+    deleted_versions = [version for version in deleted_versions if artifacts[version]['Key'] not in failed_keys]
+    return {
+        'deletedVersions': deleted_versions,
+        'failedKeys': failed_keys,
+        'reclaimedBytes': sum(artifacts[version]['Size'] for version in deleted_versions),
+    }
+
+
+def _list_versioned_names(pages, key, pattern):
+    """Maps version to resource names for the list pages whose names match pattern"""
+    names = {}
+    for page in pages:
+        for resource in page[key]:
+            match = pattern.match(resource[key[:-1] + 'Name'])
+            if match:
+                names.setdefault(int(match.group(1)), []).append(match.group(0))
+    return names
+
+
+def prune_sagemaker_resources(sm_client, tenant_id, keep, protected=()):
+    """
+    Deletes the tenant's dedicated endpoint configs and models, as named by
+    endpoint_rollout, beyond the newest keep versions. Configs go first so no
+    remaining config refers to a deleted model. Returns the deleted names.
+    """
+    tenant = re.escape(tenant_id)
+    endpoint_configs = _list_versioned_names(
+        sm_client.get_paginator('list_endpoint_configs').paginate(NameContains=f"{tenant_id}-EndpointConfig-"),
+        'EndpointConfigs', re.compile(rf"^{tenant}-EndpointConfig-(\d+)(?:-canary|-shadow)?$"))
+    models = _list_versioned_names(
+        sm_client.get_paginator('list_models').paginate(NameContains=f"{tenant_id}-SageMaker-Model-"),
+        'Models', re.compile(rf"^{tenant}-SageMaker-Model-(\d+)$"))
+
+    deleted = {'endpointConfigs': [], 'models': []}
+    deleted_versions = versions_to_delete(set(endpoint_configs) | set(models), keep, protected)
+    for version in deleted_versions:
+        for name in endpoint_configs.get(version, []):
+            sm_client.delete_endpoint_config(EndpointConfigName=name)
+            deleted['endpointConfigs'].append(name)
+    for version in deleted_versions:
+        for name in models.get(version, []):
+            sm_client.delete_model(ModelName=name)
+            deleted['models'].append(name)
+    return deleted
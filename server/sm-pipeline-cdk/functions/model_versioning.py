@@ -0,0 +1,98 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import re
+
+from botocore.exceptions import ClientError
+
+# modelVersion is the version being served, modelVersionCounter the last one handed out
+# to a training run; the counter is seeded from modelVersion the first time it is used
+VERSION_ATTRIBUTE = 'modelVersion'
+COUNTER_ATTRIBUTE = 'modelVersionCounter'
+# Written by the training pipeline for the version it trained, modelVersion is only
+# moved by promote_model_version once that model can serve
+CANDIDATE_ATTRIBUTE = 'candidateModelVersion'
+
+MODEL_ARTIFACT_VERSION_PATTERN = re.compile(r'\.model\.(\d+)\.tar\.gz$')
+
+
+def allocate_model_version(table, tenant_id):
+    """
+    Atomically hands out the next model version of the tenant, so concurrent training
+    runs never share a version. table is the MLaaS-TenantDetails boto3 Table resource.
+    """
+    while True:
+        try:
+            response = table.update_item(
+                Key={'tenantId': tenant_id},
+                UpdateExpression='ADD #counter :one',
+                ConditionExpression='attribute_exists(#counter)',
+                ExpressionAttributeNames={'#counter': COUNTER_ATTRIBUTE},
+                ExpressionAttributeValues={':one': 1},
+                ReturnValues='UPDATED_NEW')
+            return int(response['Attributes'][COUNTER_ATTRIBUTE])
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+        try:
+            response = table.update_item(
+                Key={'tenantId': tenant_id},
+                UpdateExpression='SET #counter = #version + :one',
+                ConditionExpression='attribute_exists(tenantId) AND attribute_not_exists(#counter)',
+                ExpressionAttributeNames={'#counter': COUNTER_ATTRIBUTE, '#version': VERSION_ATTRIBUTE},
+                ExpressionAttributeValues={':one': 1},
+                ReturnValues='UPDATED_NEW')
+            return int(response['Attributes'][COUNTER_ATTRIBUTE])
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+        # Either another run seeded the counter first, retry the increment, or the
+        # tenant does not exist
+        if 'Item' not in table.get_item(Key={'tenantId': tenant_id}, ProjectionExpression='tenantId'):
+            raise KeyError(f"Unknown tenant {tenant_id}")
+
+
+def promote_model_version(table, tenant_id, version):
+    """
+    Makes version the tenant's served model version unless a newer one already is.
+    Returns False when the promotion was skipped.
+    """
+    try:
+        table.update_item(
+            Key={'tenantId': tenant_id},
+            UpdateExpression='SET #version = :version',
+            ConditionExpression='attribute_exists(tenantId) AND '
+                                '(attribute_not_exists(#version) OR #version < :version)',
+            ExpressionAttributeNames={'#version': VERSION_ATTRIBUTE},
+            ExpressionAttributeValues={':version': int(version)})
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+
+
+def current_model_version(table, tenant_id):
+    item = table.get_item(Key={'tenantId': tenant_id}, ProjectionExpression=VERSION_ATTRIBUTE)['Item']
+    return int(item[VERSION_ATTRIBUTE])
+
+
+def candidate_model_version(table, tenant_id):
+    """
+    The version the training pipeline last trained, falling back to the served version
+    for pipelines that still write modelVersion themselves
+    """
+    item = table.get_item(Key={'tenantId': tenant_id},
+                          ProjectionExpression='#candidate, #version',
+                          ExpressionAttributeNames={'#candidate': CANDIDATE_ATTRIBUTE,
+                                                    '#version': VERSION_ATTRIBUTE})['Item']
+    return int(item.get(CANDIDATE_ATTRIBUTE, item[VERSION_ATTRIBUTE]))
+
+
+def parse_model_version(object_key):
+    """
+    Returns the version of a <tenant_id>.model.<version>.tar.gz artifact, None for
+    artifacts that are not named after their version
+    """
+    match = MODEL_ARTIFACT_VERSION_PATTERN.search(object_key)
+    return int(match.group(1)) if match else None
@@ -0,0 +1,225 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import io
+
+from s3_multipart_writer import S3MultipartWriter
+from dataset_splitter import DEFAULT_SPLIT_RATIOS
+from dataset_profile import FLOAT_DTYPE, INT_DTYPE, STRING_DTYPE
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pa_csv = pq = None
+
+PARQUET_SUFFIX = '.parquet'
+CSV_FORMAT = 'csv'
+PARQUET_FORMAT = 'parquet'
+
+# Below this many row groups whole groups cannot approach the ratios, so every row
+# group is sliced across the splits instead
+MIN_ROW_GROUPS_PER_SPLIT = 10
+CONVERTED_ROW_GROUP_SIZE = 128 * 1024
+CSV_READ_BLOCK_SIZE = 8 * 1024 * 1024
+
+PARQUET_DTYPES = {'INT32': INT_DTYPE, 'INT64': INT_DTYPE, 'FLOAT': FLOAT_DTYPE, 'DOUBLE': FLOAT_DTYPE}
+
+
+def require_pyarrow():
+    if pq is None:
+        raise ImportError("pyarrow is required for Parquet training data")
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Seekable read-only view of an S3 object served through ranged GETs, so Parquet
+    readers fetch the footer and the column chunks they need instead of the object
+    """
+
+    def __init__(self, s3_client, bucket, key):
+        super().__init__()
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.size = s3_client.head_object(Bucket=bucket, Key=key)['ContentLength']
+        self.requests = 0
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence {whence}")
+        return self._position
+
+    def readinto(self, buffer):
+        length = min(len(buffer), self.size - self._position)
+        if length <= 0:
+            return 0
+        byte_range = f"bytes={self._position}-{self._position + length - 1}"
+        body = self.s3_client.get_object(Bucket=self.bucket, Key=self.key, Range=byte_range)['Body'].read()
+        self.requests += 1
+        buffer[:len(body)] = body
+        self._position += len(body)
+        return len(body)
+
+
+def plan_row_groups(row_group_rows, ratios=None):
+    """
+    Assigns row groups to splits. Returns, per row group, a list of
+    (split, offset, length) slices. With enough row groups each group goes whole to
+    the split furthest below its ratio; otherwise every group is sliced by the ratios.
+    """
+    ratios = ratios or DEFAULT_SPLIT_RATIOS
+    if len(row_group_rows) >= MIN_ROW_GROUPS_PER_SPLIT * len(ratios):
+        counts = {split: 0 for split in ratios}
+        total = 0
+        plan = []
+        for rows in row_group_rows:
+            total += rows
+            split = max(ratios, key=lambda name: ratios[name] * total - counts[name])
+            counts[split] += rows
+            plan.append([(split, 0, rows)])
+        return plan
+
+    plan = []
+    for rows in row_group_rows:
+        slices = []
+        offset = 0
+        cumulative = 0.0
+        for split, ratio in ratios.items():
+            cumulative += ratio
+            end = rows if split == list(ratios)[-1] else round(rows * cumulative)
+            if end > offset:
+                slices.append((split, offset, end - offset))
+            offset = max(offset, end)
+        plan.append(slices)
+    return plan
+
+
+class _SplitSink:
+    """Writes Arrow tables of one split as CSV or Parquet into a multipart upload"""
+
+    def __init__(self, writer, output_format, schema, has_header):
+        self.writer = writer
+        self.output_format = output_format
+        self.rows = 0
+        self._has_header = has_header
+        self._parquet_writer = pq.ParquetWriter(writer, schema) if output_format == PARQUET_FORMAT else None
+
+    def write(self, table):
+        self.rows += table.num_rows
+        if self._parquet_writer is not None:
+            self._parquet_writer.write_table(table)
+            return
+        buffer = io.BytesIO()
+        include_header = self._has_header and self.writer.bytes_written == 0
+        pa_csv.write_csv(table, buffer, pa_csv.WriteOptions(include_header=include_header))
+        self.writer.write(buffer.getbuffer())
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        self.writer.close()
+
+
+def split_parquet_objects(s3_client, sources, target_bucket, target_keys,
+                          output_format=CSV_FORMAT, has_header=False, ratios=None, executor=None,
+                          profiler=None):
+    """
+    Splits Parquet objects by row groups, read through ranged GETs and never parsed
+    as text. sources is a list of (bucket, key) tuples sharing one schema. Splits are
+    written as CSV (what the built-in XGBoost training expects by default) or Parquet;
+    has_header writes the column names as the CSV header. A profiler, when given, is
+    fed from the row group statistics instead of the values.
+    Returns {split: {'rows': ..., 'bytes': ...}}.
+    """
+    require_pyarrow()
+    content_type = 'application/x-parquet' if output_format == PARQUET_FORMAT else 'text/csv'
+    sinks = {}
+    try:
+        for source_bucket, source_key in sources:
+            parquet_file = pq.ParquetFile(S3RangeReader(s3_client, source_bucket, source_key))
+            if not sinks:
+                sinks = {split: _SplitSink(S3MultipartWriter(s3_client, target_bucket, key, content_type=content_type,
+                                                             executor=executor),
+                                           output_format, parquet_file.schema_arrow, has_header)
+                         for split, key in target_keys.items()}
+            metadata = parquet_file.metadata
+            plan = plan_row_groups(
+                [metadata.row_group(index).num_rows for index in range(metadata.num_row_groups)], ratios)
+            for index, slices in enumerate(plan):
+                if profiler is not None:
+                    profile_row_group(profiler, metadata.row_group(index), parquet_file.schema_arrow.names)
+                row_group = parquet_file.read_row_group(index)
+                for split, offset, length in slices:
+                    sinks[split].write(row_group.slice(offset, length))
+        for sink in sinks.values():
+            sink.close()
+    except Exception:
+        for sink in sinks.values():
+            sink.writer.abort()
+        raise
+    return {split: {'rows': sink.rows, 'bytes': sink.writer.bytes_written} for split, sink in sinks.items()}
+
+
+def profile_row_group(profiler, row_group, names):
+    """Folds the column statistics of a Parquet row group into a DatasetProfiler"""
+    profiler.rows += row_group.num_rows
+    profiler.max_column_count = max(profiler.max_column_count, row_group.num_columns)
+    profiler.min_column_count = row_group.num_columns if profiler.min_column_count is None \
+        else min(profiler.min_column_count, row_group.num_columns)
+    for index in range(min(row_group.num_columns, profiler.max_columns)):
+        column_chunk = row_group.column(index)
+        statistics = column_chunk.statistics
+        column = profiler.column(index)
+        column.name = names[index]
+        minimum = maximum = None
+        if statistics is not None and statistics.has_min_max:
+            minimum, maximum = statistics.min, statistics.max
+        column.merge(PARQUET_DTYPES.get(column_chunk.physical_type, STRING_DTYPE), row_group.num_rows,
+                     statistics.null_count if statistics is not None and statistics.has_null_count else 0,
+                     minimum, maximum)
+
+
+def convert_csv_to_parquet(s3_client, source_bucket, source_key, target_bucket, target_key, has_header=False):
+    """
+    Converts a CSV object to Parquet in one streaming pass so later runs split it by
+    row groups. Headerless files get the column names f0, f1, ... Returns the row count.
+    """
+    require_pyarrow()
+    body = s3_client.get_object(Bucket=source_bucket, Key=source_key)['Body']
+    read_options = pa_csv.ReadOptions(block_size=CSV_READ_BLOCK_SIZE, autogenerate_column_names=not has_header)
+    reader = pa_csv.open_csv(body, read_options=read_options)
+    rows = 0
+    with S3MultipartWriter(s3_client, target_bucket, target_key, content_type='application/x-parquet') as writer:
+        parquet_writer = pq.ParquetWriter(writer, reader.schema)
+        batches = []
+        batched_rows = 0
+        for batch in reader:
+            batches.append(batch)
+            batched_rows += batch.num_rows
+            if batched_rows >= CONVERTED_ROW_GROUP_SIZE:
+                parquet_writer.write_table(pa.Table.from_batches(batches), row_group_size=CONVERTED_ROW_GROUP_SIZE)
+                rows += batched_rows
+                batches, batched_rows = [], 0
+        if batches:
+            parquet_writer.write_table(pa.Table.from_batches(batches), row_group_size=CONVERTED_ROW_GROUP_SIZE)
+            rows += batched_rows
+        parquet_writer.close()
+    return rows
@@ -0,0 +1,66 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+import threading
+import time
+
+SHARED_STACK_NAME = 'mlaas-cdk-shared-template'
+PROJECT_NAME_OUTPUT_KEY = 'MlaasPoolSagemakerProjectName'
+PIPELINE_NAME_SETTING = 'sagemaker-pipeline-name-pooled'
+
+PIPELINE_NAME_CACHE_TTL_SECONDS = int(os.getenv('PIPELINE_NAME_CACHE_TTL_SECONDS', '3600'))
+
+
+class PipelineNameResolver:
+    """
+    Resolves the pooled SageMaker pipeline name once per container instead of once per
+    training trigger; describe_stacks is heavily throttled and the name rarely changes.
+    Sources, in order: the pipeline_name argument (e.g. from SM_PIPELINE_NAME), the
+    settings table item when a table is given, then the shared stack output and the
+    SageMaker project. Looked up names are cached for ttl_seconds; call invalidate()
+    when the pipeline turns out to be missing.
+    """
+
+    def __init__(self, cf_client, sm_client, pipeline_name=None, settings_table=None,
+                 stack_name=SHARED_STACK_NAME, ttl_seconds=PIPELINE_NAME_CACHE_TTL_SECONDS):
+        self.cf_client = cf_client
+        self.sm_client = sm_client
+        self.pipeline_name = pipeline_name
+        self.settings_table = settings_table
+        self.stack_name = stack_name
+        self.ttl_seconds = ttl_seconds
+        self.lookups = 0
+        self._cached = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        if self.pipeline_name:
+            return self.pipeline_name
+        with self._lock:
+            if self._cached is None or time.time() >= self._expires_at:
+                self._cached = self._lookup()
+                self._expires_at = time.time() + self.ttl_seconds
+                self.lookups += 1
+            return self._cached
+
+    def invalidate(self):
+        with self._lock:
+            self._cached = None
+
+    def _lookup(self):
+        if self.settings_table is not None:
+            item = self.settings_table.get_item(Key={'settingName': PIPELINE_NAME_SETTING}).get('Item')
+            if item:
+                print('## Pipeline name from setting ' + PIPELINE_NAME_SETTING)
+                return item['settingValue']
+
+        stack = self.cf_client.describe_stacks(StackName=self.stack_name)
+        outputs = stack['Stacks'][0]['Outputs']
+        sm_projectname = next(output['OutputValue'] for output in outputs
+            if output['OutputKey'] == PROJECT_NAME_OUTPUT_KEY)
+        print("##MlaasPoolSagemakerProjectName:", sm_projectname)
+
+        proj_desc = self.sm_client.describe_project(ProjectName=sm_projectname)
+        return proj_desc['ProjectName'] + "-" + proj_desc['ProjectId']
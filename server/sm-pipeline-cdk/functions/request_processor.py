@@ -4,8 +4,13 @@
 import json
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 
 import boto3
+import inference_batching
+from tenant_details_cache import TenantDetailsCache
 
 HTTP_BAD_REQUEST = 400
 HTTP_INTERNAL_ERROR = 500
@@ -13,11 +18,17 @@ HTTP_OK = 200
 
 pooled_endpoint_name = os.getenv("POOLED_ENDPOINT_NAME")
 
+# The authorizer issues STS credentials with DurationSeconds=900, so a cached client
+# is never useful for longer than that.
+CLIENT_CACHE_TTL_SECONDS = int(os.getenv("CLIENT_CACHE_TTL_SECONDS", "900"))
+CLIENT_CACHE_MAX_SIZE = int(os.getenv("CLIENT_CACHE_MAX_SIZE", "64"))
+
 root = logging.getLogger()
 root.setLevel("INFO")
 
 dynamodb = boto3.resource('dynamodb')
 table_tenant_details = dynamodb.Table('MLaaS-TenantDetails')
+tenant_details_cache = TenantDetailsCache(table_tenant_details, version_attribute='modelVersion')
 
 def lambda_handler(event, context):
     
@@ -30,32 +41,56 @@ def lambda_handler(event, context):
     aws_access_key_id = event["requestContext"]["authorizer"]["aws_access_key_id"]
     aws_secret_access_key = event["requestContext"]["authorizer"]["aws_secret_access_key"]
     aws_session_token = event["requestContext"]["authorizer"]["aws_session_token"]
+    aws_session_expiration = event["requestContext"]["authorizer"].get("aws_session_expiration")
 
     logging.info(f"tenant_id: {tenant_id}")
     logging.info(f"endpoint_name: {endpoint_name}")
     
-    # get tenant informationto extract the latest model version
-    tenant_details = table_tenant_details.get_item(
-        Key={
-            'tenantId': tenant_id
-        }
-    )    
-    
-    model_version = tenant_details['Item']['modelVersion']
+    # The authorizer passes the model version in its context; only look the tenant up
+    # when it is missing (e.g. a policy cached by API Gateway before it was added)
+    model_version = event["requestContext"]["authorizer"].get("model_version")
+    if model_version is None:
+        tenant_details = tenant_details_cache.get(tenant_id)
+        if tenant_details is None:
+            return return_json(HTTP_BAD_REQUEST, "[Error] Unknown tenant {}", tenant_id)
+        model_version = tenant_details['modelVersion']
     logging.info(f"latest model version: {model_version}")
     
-    # Generate a python session object from the session parameters created by the authorizer
+    # Reuse the runtime.sagemaker client built for these credentials by a previous
+    # invocation on this warm container, or create one from the authorizer session
     try:
-        temp_boto3_session = create_temp_boto3_session(
-            aws_access_key_id, aws_secret_access_key, aws_session_token
+        temp_client = runtime_client_cache.get_client(
+            aws_access_key_id, aws_secret_access_key, aws_session_token, aws_session_expiration
         )
     except Exception as e:
         logging.error(e)
-        return return_json(HTTP_INTERNAL_ERROR, "[Error] {}", e)    
-        
-    # Create a boto3 runtime.sagemaker client using the assumed session object
-    temp_client = temp_boto3_session.client("runtime.sagemaker")
+        return return_json(HTTP_INTERNAL_ERROR, "[Error] {}", e)
     
+    # Batch mode scores many rows per request in concurrent, payload sized chunks
+    if is_batch_request(event):
+        # Only a malformed body is the caller's error; rows the model rejects are
+        # reported per row
+        try:
+            rows = inference_batching.parse_batch_rows(request_body_data)
+        except (ValueError, TypeError) as e:
+            logging.error(e)
+            return return_json(HTTP_BAD_REQUEST, "[Error] {}", e)
+
+        try:
+            results = invoke_sagemaker_endpoint_batch(
+                rows, tenant_id, endpoint_name, model_version, temp_client
+            )
+        except Exception as e:
+            logging.error(e)
+            # Drop the client so that a failure tied to these credentials is not replayed
+            runtime_client_cache.invalidate(aws_access_key_id)
+            return return_json(HTTP_INTERNAL_ERROR, "[Error] {}", e)
+
+        failed = sum(1 for result in results if "error" in result)
+        logging.info(f"Batch scored {len(results)} rows, {failed} failed")
+        logging.info(f"Runtime client cache stats: {runtime_client_cache.stats()}")
+        return return_batch_json(HTTP_OK, results, failed)
+
     # Invoke the SageMaker endpoint
     try:
         result = invoke_sagemaker_endpoint(
@@ -63,9 +98,12 @@ def lambda_handler(event, context):
         )
     except Exception as e:
         logging.error(e)
+        # Drop the client so that a failure tied to these credentials is not replayed
+        runtime_client_cache.invalidate(aws_access_key_id)
         return return_json(HTTP_INTERNAL_ERROR, "[Error] {}", e)
 
     logging.info(f"Result: {result}")    
+    logging.info(f"Runtime client cache stats: {runtime_client_cache.stats()}")
         
     # Upon succesful invokation, return the results
     return return_json(HTTP_OK, "result: {}", result)
@@ -104,6 +142,40 @@ def invoke_sagemaker_endpoint(
     return result
 
 
+def is_batch_request(event: dict) -> bool:
+    """
+    Batch mode is requested with the ?mode=batch query string parameter.
+    """
+    query_string_parameters = event.get("queryStringParameters") or {}
+    return query_string_parameters.get("mode") == "batch"
+
+
+def invoke_sagemaker_endpoint_batch(
+    rows: list,
+    tenant_id: str,
+    endpoint_name: str,
+    model_version: str,
+    temp_client: boto3.client,
+) -> list:
+    """
+    Invokes the pool SageMaker Endpoint for every row of a batch request.
+    Returns one result per row, in request order; raises when the endpoint or the
+    credentials fail rather than the rows.
+    """
+    logging.info(f"Invoking bronze endpoint for a batch of {len(rows)} rows")
+
+    def invoke_chunk(payload: str) -> str:
+        response = temp_client.invoke_endpoint(
+            EndpointName=endpoint_name,
+            ContentType="text/csv",
+            TargetModel=f"{tenant_id}.model.{model_version}.tar.gz",
+            Body=payload,
+        )
+        return response["Body"].read().decode()
+
+    return inference_batching.score_rows(rows, invoke_chunk, raise_server_errors=True)
+
+
 def create_temp_boto3_session(
     aws_access_key_id: str, aws_secret_access_key: str, aws_session_token: str
 ) -> boto3.Session:
@@ -119,6 +191,85 @@ def create_temp_boto3_session(
     return session
 
 
+class RuntimeClientCache:
+    """
+    Per-container LRU cache of runtime.sagemaker clients keyed by the STS access key id.
+    Entries expire after ttl_seconds, matching the lifetime of the authorizer credentials.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_client(
+        self, aws_access_key_id: str, aws_secret_access_key: str, aws_session_token: str,
+        aws_session_expiration: int = None,
+    ) -> boto3.client:
+        """
+        aws_session_expiration is the epoch second the credentials expire, when the
+        authorizer provides it; the entry never outlives the credentials.
+        """
+        now = time.monotonic()
+        ttl_seconds = self.ttl_seconds
+        if aws_session_expiration is not None:
+            ttl_seconds = min(ttl_seconds, int(aws_session_expiration) - time.time())
+        with self._lock:
+            entry = self._clients.get(aws_access_key_id)
+            if entry is not None and entry[1] > now:
+                self._clients.move_to_end(aws_access_key_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        temp_boto3_session = create_temp_boto3_session(
+            aws_access_key_id, aws_secret_access_key, aws_session_token
+        )
+        client = temp_boto3_session.client("runtime.sagemaker")
+
+        with self._lock:
+            self._clients[aws_access_key_id] = (client, now + ttl_seconds)
+            self._clients.move_to_end(aws_access_key_id)
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+                self.evictions += 1
+        return client
+
+    def invalidate(self, aws_access_key_id: str) -> None:
+        with self._lock:
+            self._clients.pop(aws_access_key_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._clients),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+runtime_client_cache = RuntimeClientCache(CLIENT_CACHE_MAX_SIZE, CLIENT_CACHE_TTL_SECONDS)
+
+
+def return_batch_json(status_code: int, results: list, failed: int) -> dict:
+    """
+    Creates a JSON response holding per row batch results for the Lambda Function to return.
+    """
+    return {
+        "statusCode": status_code,
+        "headers": {"Content-Type": "application/json"},
+        "body": json.dumps({
+            "results": results,
+            "succeeded": len(results) - failed,
+            "failed": failed,
+        }),
+    }
+
+
 def return_json(status_code: int, body: str, *args) -> None:
     """
     Creates a JSON response for the Lambda Function to return.
@@ -0,0 +1,111 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from collections import deque
+
+# S3 rejects non-final multipart parts smaller than 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+class S3MultipartWriter:
+    """
+    Streams bytes to an S3 object through a multipart upload, holding at most one part
+    in memory. Objects smaller than a part are written with a single put_object.
+    Use as a context manager: the upload is completed on exit, or aborted if the block
+    raised.
+    """
+
+    def __init__(self, s3_client, bucket, key, part_size=DEFAULT_PART_SIZE, content_type="text/csv",
+                 executor=None, max_pending_parts=2):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.content_type = content_type
+        # With an executor parts are uploaded in the background while the caller keeps
+        # writing; at most max_pending_parts filled parts are held in memory meanwhile
+        self.executor = executor
+        self.max_pending_parts = max_pending_parts
+        self.bytes_written = 0
+        self.upload_id = None
+        self._buffer = bytearray()
+        self._parts = []
+        self._pending = deque()
+        self._completed = False
+        self.closed = False
+
+    def write(self, data) -> None:
+        """data is any bytes-like object; it is copied once, into the part buffer"""
+        self._buffer += data
+        self.bytes_written += len(data)
+        if len(self._buffer) >= self.part_size:
+            self._upload_part()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self.upload_id is None:
+            self.s3_client.put_object(
+                Bucket=self.bucket, Key=self.key, Body=self._buffer, ContentType=self.content_type)
+            self._buffer = bytearray()
+            return
+        if self._buffer:
+            self._upload_part()
+        while self._pending:
+            self._parts.append(self._pending.popleft().result())
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": self._parts},
+        )
+        self._completed = True
+
+    def abort(self) -> None:
+        # let in-flight parts settle so none lands after the upload is aborted
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.cancel():
+                future.exception()
+        if self.upload_id is not None and not self._completed:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            self.upload_id = None
+
+    def _upload_part(self) -> None:
+        if self.upload_id is None:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type)
+            self.upload_id = response["UploadId"]
+        part_number = len(self._parts) + len(self._pending) + 1
+        # the filled buffer is handed to boto3 without a copy; start a new one
+        body, self._buffer = self._buffer, bytearray()
+        if self.executor is None:
+            self._parts.append(self._send_part(part_number, body))
+            return
+        if len(self._pending) >= self.max_pending_parts:
+            self._parts.append(self._pending.popleft().result())
+        self._pending.append(self.executor.submit(self._send_part, part_number, body))
+
+    def _send_part(self, part_number: int, body: bytearray) -> dict:
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        return {"ETag": response["ETag"], "PartNumber": part_number}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
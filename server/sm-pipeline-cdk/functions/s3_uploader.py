@@ -3,8 +3,12 @@
 
 import logging
 import base64
+import json
+import math
+import time
 import boto3
 import os
+from botocore.exceptions import ClientError
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -18,10 +22,26 @@ response  = {
     'body': ''
 }
 
+# Multipart uploads go straight from the client to S3 through presigned part URLs
+# signed with the tenant's ABAC session, so the file never passes through API Gateway
+MULTIPART_UPLOAD_MODE = 'multipart'
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 64 * 1024 * 1024
+MAX_PARTS = 10000
+PRESIGNED_URL_TTL_SECONDS = int(os.getenv('PRESIGNED_URL_TTL_SECONDS', '3600'))
+
 def lambda_handler(event, context):
 
+    if event.get('resource') == '/upload/complete':
+        return finish_multipart_upload(event)
+    if event['headers'].get('upload-mode') == MULTIPART_UPLOAD_MODE:
+        return start_multipart_upload(event)
+
     filename = event['headers']['file-name']
     file_content = (event['body'])
+    # Binary uploads such as Parquet files arrive base64 encoded
+    if event.get('isBase64Encoded'):
+        file_content = base64.b64decode(file_content)
     tenant_id = event['requestContext']['authorizer']['principalId']
     tenant_tier = event['requestContext']['authorizer']['tier']
     bucket_name = event['requestContext']['authorizer']['bucket']
@@ -29,7 +49,7 @@ def lambda_handler(event, context):
     secret_key = event['requestContext']['authorizer']['aws_secret_access_key']
     session_token = event['requestContext']['authorizer']['aws_session_token']
 
-    s3_prefix = f'{tenant_id}/{filename}'
+    s3_prefix = object_key_for(tenant_id, filename, event['headers'].get('file-type'))
     s3_client = boto3.resource('s3', aws_access_key_id=access_key, aws_secret_access_key=secret_key, aws_session_token=session_token)
   
     try:
@@ -43,3 +63,121 @@ def lambda_handler(event, context):
     except Exception as e:
         logger.info(f"Error uploading {filename}")
         raise IOError(e) 
+
+
+def object_key_for(tenant_id, filename, file_type):
+    # Files uploaded for bulk scoring go to the prefix watched by the bulk inference job
+    if file_type == 'inference':
+        return f'{tenant_id}/inference/input/{filename}'
+    return f'{tenant_id}/{filename}'
+
+
+def tenant_s3_client(authorizer):
+    """S3 client on the tenant's ABAC session, which only reaches the tenant's prefix"""
+    return boto3.client('s3', aws_access_key_id=authorizer['aws_access_key_id'],
+                        aws_secret_access_key=authorizer['aws_secret_access_key'],
+                        aws_session_token=authorizer['aws_session_token'])
+
+
+def json_response(status_code, body):
+    return {
+        'statusCode': status_code,
+        'headers': dict(response['headers'], **{'Content-Type': 'application/json'}),
+        'body': json.dumps(body)
+    }
+
+
+def choose_part_size(file_size, requested_part_size=None):
+    part_size = max(MIN_PART_SIZE, requested_part_size or DEFAULT_PART_SIZE)
+    # S3 allows at most 10,000 parts per upload
+    return max(part_size, math.ceil(file_size / MAX_PARTS))
+
+
+def presigned_part_urls(s3_client, bucket_name, key, upload_id, part_numbers, expires_in):
+    return [{
+        'partNumber': part_number,
+        'url': s3_client.generate_presigned_url(
+            'upload_part',
+            Params={'Bucket': bucket_name, 'Key': key, 'UploadId': upload_id, 'PartNumber': part_number},
+            ExpiresIn=expires_in)
+    } for part_number in part_numbers]
+
+
+def start_multipart_upload(event):
+    """
+    Starts a multipart upload, or with an upload-id header re-signs the URLs of the
+    part-numbers listed (e.g. once the first URLs expired), and returns one presigned
+    URL per part. The URLs cannot outlive the tenant session they are signed with.
+    """
+    headers = event['headers']
+    authorizer = event['requestContext']['authorizer']
+    tenant_id = authorizer['principalId']
+    bucket_name = authorizer['bucket']
+    filename = headers['file-name']
+    key = object_key_for(tenant_id, filename, headers.get('file-type'))
+    s3_client = tenant_s3_client(authorizer)
+
+    session_expiration = int(authorizer.get('aws_session_expiration', time.time() + PRESIGNED_URL_TTL_SECONDS))
+    expires_in = max(1, min(PRESIGNED_URL_TTL_SECONDS, session_expiration - int(time.time())))
+
+    try:
+        upload_id = headers.get('upload-id')
+        if upload_id:
+            part_numbers = [int(part_number) for part_number in headers['part-numbers'].split(',')]
+            part_size = None
+        else:
+            file_size = int(headers['file-size'])
+            part_size = choose_part_size(file_size, int(headers['part-size']) if 'part-size' in headers else None)
+            part_numbers = range(1, max(1, math.ceil(file_size / part_size)) + 1)
+            upload_id = s3_client.create_multipart_upload(Bucket=bucket_name, Key=key)['UploadId']
+            logger.info(f"Started multipart upload of {key}: {len(part_numbers)} parts of {part_size} bytes")
+
+        return json_response(200, {
+            'uploadId': upload_id,
+            'fileName': filename,
+            'partSize': part_size,
+            'expiresAt': int(time.time()) + expires_in,
+            'parts': presigned_part_urls(s3_client, bucket_name, key, upload_id, part_numbers, expires_in)
+        })
+    except (KeyError, ValueError) as e:
+        return json_response(400, {'message': f'Invalid multipart upload request: {e}'})
+
+
+def finish_multipart_upload(event):
+    """
+    POST completes the upload from the part numbers and ETags the client collected,
+    DELETE aborts it so the uploaded parts stop being billed
+    """
+    authorizer = event['requestContext']['authorizer']
+    tenant_id = authorizer['principalId']
+    bucket_name = authorizer['bucket']
+    try:
+        request = json.loads(event['body'])
+        upload_id = request['uploadId']
+        key = object_key_for(tenant_id, request['fileName'], request.get('fileType'))
+        # an abort carries no parts
+        parts = None if event['httpMethod'] == 'DELETE' else sorted(
+            ({'PartNumber': int(part['partNumber']), 'ETag': part['etag']} for part in request['parts']),
+            key=lambda part: part['PartNumber'])
+    except (KeyError, TypeError, ValueError) as e:
+        return json_response(400, {'message': f'Invalid request: {e}'})
+    s3_client = tenant_s3_client(authorizer)
+
+    try:
+        if event['httpMethod'] == 'DELETE':
+            s3_client.abort_multipart_upload(Bucket=bucket_name, Key=key, UploadId=upload_id)
+            logger.info(f"Aborted multipart upload of {key}")
+            return json_response(200, {'message': f"{request['fileName']} upload has been aborted."})
+
+        s3_response = s3_client.complete_multipart_upload(
+            Bucket=bucket_name, Key=key, UploadId=upload_id, MultipartUpload={'Parts': parts})
+    except ClientError as e:
+        # e.g. InvalidPart, InvalidPartOrder or NoSuchUpload: the client's upload is at fault
+        status_code = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 500)
+        if not 400 <= status_code < 500:
+            raise
+        logger.info(f"Multipart upload of {key} failed: {e}")
+        return json_response(status_code, {'message': f"Invalid multipart upload: {e.response['Error']['Code']}",
+                                           'error': e.response['Error'].get('Message', '')})
+    logger.info(f"S3 Response: {s3_response}")
+    return json_response(200, {'message': f"{request['fileName']} has been uploaded successfully."})
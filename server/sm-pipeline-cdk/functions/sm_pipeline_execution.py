@@ -3,13 +3,110 @@
 
 import os
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 import boto3
-import pandas as pd
-import numpy as np
-from io import StringIO
+import dataset_profile
+import dataset_splitter
+import metrics_manager
+import model_versioning
+import parquet_dataset
+import training_manifest
+import upload_coalescing
+from pipeline_resolver import PipelineNameResolver
 
 sm = boto3.client('sagemaker')
 cf = boto3.client('cloudformation')
+sqs = boto3.client('sqs')
+
+# Uploads reach the handler through this queue so bursts are trained once per tenant
+coalesce_queue_url = os.getenv('COALESCE_QUEUE_URL')
+
+# Shared by the pipeline lookup running alongside the tenant reads and the split part uploads
+STAGE_EXECUTOR_WORKERS = int(os.getenv('STAGE_EXECUTOR_WORKERS', '8'))
+
+# Cached across invocations; SM_PIPELINE_NAME pins the pipeline and skips the lookup,
+# SETTINGS_TABLE_NAME lets the MLaaS-Setting table provide it ahead of the stack outputs
+settings_table_name = os.getenv('SETTINGS_TABLE_NAME')
+pipeline_resolver = PipelineNameResolver(
+    cf, sm,
+    pipeline_name=os.getenv('SM_PIPELINE_NAME'),
+    settings_table=boto3.resource('dynamodb').Table(settings_table_name) if settings_table_name else None)
+
+
+def timed(timings, stage, function, *args, **kwargs):
+    """
+    Runs function and records its wall time in milliseconds under timings[stage]
+    """
+    start = time.perf_counter()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000)
+
+
+def split_strategy_for(tenant_details):
+    """
+    Builds the tenant's split strategy from the optional splitStrategy, splitSeed and
+    splitLabelColumn attributes of its MLaaS-TenantDetails item
+    """
+    seed = tenant_details.get('splitSeed')
+    return dataset_splitter.create_split_strategy(
+        tenant_details.get('splitStrategy'),
+        seed=str(seed) if seed is not None else None,
+        label_column=int(tenant_details.get('splitLabelColumn', 0)))
+
+
+def split_training_data(s3, bucket_name, object_keys, sm_bucket_name, tenant_id, target_keys,
+                        tenant_details, executor, profiler=None):
+    """
+    Splits the uploads into target_keys in sm_bucket_name. CSV uploads are streamed
+    row by row with the tenant's split strategy. Parquet uploads are split by row
+    groups; CSV uploads are converted to Parquet first when they are mixed with Parquet
+    uploads, when Parquet splits are wanted or when convertCsvToParquet is set.
+    """
+    has_header = bool(tenant_details.get('trainingDataHasHeader', False))
+    output_format = tenant_details.get('trainingDataFormat', parquet_dataset.CSV_FORMAT)
+    csv_keys = [object_key for object_key in object_keys if object_key.endswith('.csv')]
+    parquet_sources = [(bucket_name, object_key) for object_key in object_keys
+                       if object_key.endswith(parquet_dataset.PARQUET_SUFFIX)]
+
+    if not parquet_sources and output_format == parquet_dataset.CSV_FORMAT \
+            and not tenant_details.get('convertCsvToParquet', False):
+        # Stream the uploads into the three splits without loading them in memory,
+        # uploading the parts of all three splits concurrently
+        return dataset_splitter.split_s3_objects(
+            s3, bucket_name, csv_keys, sm_bucket_name, target_keys,
+            strategy=split_strategy_for(tenant_details), has_header=has_header, executor=executor,
+            profiler=profiler)
+
+    for csv_key in csv_keys:
+        # Kept next to the splits, outside the bucket watched for uploads
+        parquet_key = tenant_id + '/data/parquet/' + csv_key.split('/')[-1][:-len('.csv')] + parquet_dataset.PARQUET_SUFFIX
+        rows = parquet_dataset.convert_csv_to_parquet(s3, bucket_name, csv_key, sm_bucket_name, parquet_key, has_header)
+        print('## Converted ' + csv_key + ' to Parquet, ' + str(rows) + ' rows')
+        parquet_sources.append((sm_bucket_name, parquet_key))
+    return parquet_dataset.split_parquet_objects(
+        s3, parquet_sources, sm_bucket_name, target_keys,
+        output_format=output_format, has_header=has_header, executor=executor, profiler=profiler)
+
+
+def start_pipeline_execution(pipeline_name, pipeline_parameters):
+    """
+    Starts the pipeline, looking its name up again once if the cached pipeline is gone
+    (e.g. the shared stack or SageMaker project was recreated)
+    """
+    try:
+        return sm.start_pipeline_execution(
+            PipelineName=pipeline_name, PipelineParameters=pipeline_parameters)
+    except sm.exceptions.ResourceNotFound:
+        pipeline_resolver.invalidate()
+        refreshed_pipeline_name = pipeline_resolver.resolve()
+        if refreshed_pipeline_name == pipeline_name:
+            raise
+        print("## Pipeline " + pipeline_name + " not found, retrying with " + refreshed_pipeline_name)
+        return sm.start_pipeline_execution(
+            PipelineName=refreshed_pipeline_name, PipelineParameters=pipeline_parameters)
 
 
 def create_temp_tenant_session(access_role_arn, session_name,duration_sec, tenant_id, tenant_type):
@@ -58,96 +155,178 @@ def create_temp_tenant_session(access_role_arn, session_name,duration_sec, tenan
 def handler(event, context):
     print('## EVENT')
     print(event)
-    json_region = os.environ['AWS_REGION']
-    print('## Region:' + json_region)
+    if 'Records' in event:
+        return handle_upload_batch(event['Records'])
+
     bucket_name = event['detail']['bucket']['name']
     print('## Bucket_Name:' + bucket_name)
     object_key = event['detail']['object']['key']
     print('## Object_Key:' + object_key)
     tenant_id = object_key.split('/')[0]
+
+    # Bulk inference inputs and results share the tenant bucket but are not training data
+    if object_key.startswith(tenant_id + '/inference/'):
+        print('## Skipping bulk inference object')
+        return
+
+    return start_training(bucket_name, tenant_id, [object_key])
+
+
+def tenant_details_table(tenant_id):
+    """
+    MLaaS-TenantDetails through the tenant scoped DynamoDB role
+    """
+    session = create_temp_tenant_session(os.environ['dynamodb_access_role_arn'], "dynamodb_assumed_session", 900,
+                                         tenant_id, os.environ['tenant_type'])
+    return session.resource('dynamodb').Table('MLaaS-TenantDetails')
+
+
+def handle_upload_batch(records):
+    """
+    Coalesces the queued uploads of each tenant into one training run. New uploads are
+    added to the tenant's pending uploads in MLaaS-TenantDetails, whichever batch or
+    poller receives them. Only the message carrying the latest pending upload time is
+    requeued, delayed until the debounce window closes, and only that message starts
+    the training run on all pending files; messages overtaken by a later upload are
+    dropped. Failures are reported per message so only the failed tenants are retried.
+    """
+    batch_item_failures = []
+    now = time.time()
+    for tenant_id, pending in upload_coalescing.group_upload_records(records).items():
+        try:
+            table = tenant_details_table(tenant_id)
+            if pending.object_keys:
+                last_upload_at = upload_coalescing.record_uploads(
+                    table, tenant_id, pending.object_keys, pending.last_upload_at)
+            else:
+                last_upload_at = upload_coalescing.pending_upload_time(table, tenant_id)
+            if last_upload_at != upload_coalescing.upload_time(pending.last_upload_at):
+                print('## Tenant ' + tenant_id + ' has a later upload pending, its message starts the training')
+                continue
+
+            delay = upload_coalescing.debounce_delay(float(last_upload_at), now)
+            if delay:
+                print('## Tenant ' + tenant_id + ' still uploading, requeued for ' + str(delay) + 's')
+                sqs.send_message(QueueUrl=coalesce_queue_url, MessageBody=pending.to_message(last_upload_at),
+                                 DelaySeconds=delay)
+                continue
+            object_keys = upload_coalescing.claim_uploads(table, tenant_id, last_upload_at)
+            if object_keys is None:
+                print('## Tenant ' + tenant_id + ' uploads were claimed by another message')
+                continue
+            print('## Tenant ' + tenant_id + ': training on ' + str(len(object_keys)) + ' files')
+            try:
+                start_training(pending.bucket_name, tenant_id, object_keys)
+            except Exception:
+                # pending again, for the retried message or the message of a later upload
+                upload_coalescing.record_uploads(table, tenant_id, object_keys, last_upload_at)
+                raise
+        except Exception as e:
+            print('## Training trigger failed for tenant ' + tenant_id + ': ' + str(e))
+            batch_item_failures.extend({'itemIdentifier': message_id} for message_id in pending.message_ids)
+    return {'batchItemFailures': batch_item_failures}
+
+
+def start_training(bucket_name, tenant_id, object_keys):
+    """
+    Splits the uploaded files into one train/validation/test set and starts one
+    pipeline execution on it
+    """
+    json_region = os.environ['AWS_REGION']
+    print('## Region:' + json_region)
     print('## Tenant ID:' + tenant_id)
 
-    dynamodb_access_role_arn= os.environ['dynamodb_access_role_arn']
-    tenant_type=os.environ['tenant_type']
-    dynamodb_assumed_session= create_temp_tenant_session(dynamodb_access_role_arn,"dynamodb_assumed_session", 900, tenant_id, tenant_type)
+    training_keys = [object_key for object_key in object_keys
+                     if object_key.endswith(('.csv', parquet_dataset.PARQUET_SUFFIX))]
+    if not training_keys:
+        # Nothing to train on, keep the model version for the next run
+        print('## No training data in ' + str(object_keys))
+        return None
 
-    dynamodb = dynamodb_assumed_session.resource('dynamodb')
-    table = dynamodb.Table('MLaaS-TenantDetails')
-    dynamo_item = table.get_item(
-        Key={
-            'tenantId':  tenant_id
-        }
-    )
-    s3_access_role_arn = dynamo_item['Item']['s3BucketTenantRole']
-    tenant_tier = dynamo_item['Item']['tenantTier']
-    sm_bucket_name = dynamo_item['Item']['sagemakerS3Bucket']
-    model_version_int = int(dynamo_item['Item']['modelVersion']) + 1
-    model_version = str(model_version_int)
-    
-    print('## Tenant S3 Access IAM Role:' + s3_access_role_arn)
+    timings = {}
+    with ThreadPoolExecutor(max_workers=STAGE_EXECUTOR_WORKERS) as executor:
+        # The pipeline lookup does not depend on the tenant, run it while the tenant is read
+        pipeline_name_future = executor.submit(timed, timings, 'pipeline_lookup', pipeline_resolver.resolve)
+
+        dynamodb_access_role_arn= os.environ['dynamodb_access_role_arn']
+        tenant_type=os.environ['tenant_type']
+        dynamodb_assumed_session= timed(timings, 'dynamodb_session', create_temp_tenant_session,
+            dynamodb_access_role_arn,"dynamodb_assumed_session", 900, tenant_id, tenant_type)
+
+        dynamodb = dynamodb_assumed_session.resource('dynamodb')
+        table = dynamodb.Table('MLaaS-TenantDetails')
+        dynamo_item = timed(timings, 'tenant_details', table.get_item,
+            Key={
+                'tenantId':  tenant_id
+            }
+        )
+        s3_access_role_arn = dynamo_item['Item']['s3BucketTenantRole']
+        tenant_tier = dynamo_item['Item']['tenantTier']
+        sm_bucket_name = dynamo_item['Item']['sagemakerS3Bucket']
+        # Concurrent runs of the same tenant each get their own version
+        model_version_int = timed(timings, 'version_allocation', model_versioning.allocate_model_version,
+            table, tenant_id)
+        model_version = str(model_version_int)
+        print('## Allocated model version:' + model_version)
+
+        print('## Tenant S3 Access IAM Role:' + s3_access_role_arn)
+
+        assumed_session = timed(timings, 's3_session', create_temp_tenant_session,
+            s3_access_role_arn,"assumed_session", 900, tenant_id, tenant_type)
+        s3 = assumed_session.client('s3')
+
+        # Splits are written in the format the training step reads, CSV by default
+        output_format = dynamo_item['Item'].get('trainingDataFormat', parquet_dataset.CSV_FORMAT)
+        incremental = dynamo_item['Item'].get('ingestionMode') == training_manifest.INCREMENTAL_MODE
+        if incremental:
+            # Only the new rows are split, into shards added to the tenant's dataset
+            target_keys = training_manifest.shard_keys(tenant_id, model_version, dataset_splitter.SPLITS,
+                                                       output_format)
+        else:
+            target_keys = {split: tenant_id + '/data/' + split + '.' + output_format
+                           for split in dataset_splitter.SPLITS}
+        data_paths = {split: 's3://' + sm_bucket_name + '/' + key for split, key in target_keys.items()}
 
-    csv_buffer = StringIO()
-    
-    stack = cf.describe_stacks(StackName='mlaas-cdk-shared-template')
-    print('## Stack')
-    print(stack)
-    outputs = stack['Stacks'][0]['Outputs'] 
-    sm_projectname = next(output['OutputValue'] for output in outputs
-        if output['OutputKey'] == 'MlaasPoolSagemakerProjectName')
-    print("##MlaasPoolSagemakerProjectName:", sm_projectname)
-    
-    if object_key.endswith('.csv'):
-        assumed_session = create_temp_tenant_session(s3_access_role_arn,"assumed_session", 900, tenant_id, tenant_type)
-        s3 = assumed_session.resource('s3')
-        
         try:
-            data_obj = s3.Object(bucket_name=bucket_name, key=object_key)
-            response = data_obj.get()
-            data_df = pd.read_csv(response['Body'])
-            train = data_df.iloc[:int(0.7 * len(data_df))]
-            validation = data_df.iloc[int(0.7 * len(data_df))+1:int(0.85 * len(data_df))]
-            test = data_df.iloc[int(0.85 * len(data_df))+1:]
-            
-            train.to_csv(csv_buffer, index = False)
-            train_file = tenant_id + '/data/train.csv'
-            train_obj = s3.Object(bucket_name=sm_bucket_name, key=train_file)
-            train_obj.put(Body=csv_buffer.getvalue())
-            
-            validation.to_csv(csv_buffer, index = False)
-            validation_file = tenant_id + '/data/validation.csv'
-            validation_obj = s3.Object(bucket_name=sm_bucket_name, key=validation_file)
-            validation_obj.put(Body=csv_buffer.getvalue())
-
-            test.to_csv(csv_buffer, index = False)
-            test_file = tenant_id + '/data/test.csv'
-            test_obj = s3.Object(bucket_name=sm_bucket_name, key=test_file)
-            test_obj.put(Body=csv_buffer.getvalue())
-            
+            profiler = dataset_profile.DatasetProfiler()
+            split_stats = timed(timings, 'dataset_split', split_training_data,
+                s3, bucket_name, training_keys, sm_bucket_name, tenant_id,
+                target_keys, dynamo_item['Item'], executor, profiler
+            )
+            print('## Split stats:', split_stats)
+
+            # Profiled during the split, stored next to the splits
+            profile = profiler.to_dict(split_stats)
+            profile_key = target_keys[dataset_splitter.TRAIN].rsplit('/', 1)[0] + '/' \
+                + dataset_profile.PROFILE_FILE_NAME
+            print('## Profile:', dataset_profile.write_profile(s3, sm_bucket_name, profile_key, profile))
+            dataset_profile.record_profile_metrics(metrics_manager, tenant_id, profile)
+
+            if incremental:
+                # The pipeline reads every shard through per split manifest files
+                data_paths = timed(timings, 'manifests', training_manifest.write_manifests,
+                    s3, sm_bucket_name, tenant_id, model_version, dataset_splitter.SPLITS, output_format)
+                print('## Manifests:', data_paths)
+
         except Exception as e:
-            raise IOError(e) 
-        
-
-    ''' Create a pipeline exeution from the pipeline template '''
-    proj_desc = sm.describe_project(
-        ProjectName=sm_projectname
-    )
-    pipeline_name = proj_desc['ProjectName'] + "-" + proj_desc['ProjectId']
-    print("## pipeline_name: " + pipeline_name)
-
-    response = sm.start_pipeline_execution(
-        PipelineName = pipeline_name,
-        PipelineParameters=[
+            raise IOError(e)
+
+        ''' Create a pipeline exeution from the pipeline template '''
+        pipeline_name = pipeline_name_future.result()
+        print("## pipeline_name: " + pipeline_name)
+
+    pipeline_parameters=[
         {
             'Name': 'TrainDataPath',
-            'Value': 's3://'+sm_bucket_name+'/' + train_file
+            'Value': data_paths[dataset_splitter.TRAIN]
         },
         {
             'Name': 'TestDataPath',
-            'Value': 's3://'+sm_bucket_name+'/' + test_file
+            'Value': data_paths[dataset_splitter.TEST]
         },
         {
             'Name': 'ValidationDataPath',
-            'Value': 's3://'+sm_bucket_name+ '/' + validation_file
+            'Value': data_paths[dataset_splitter.VALIDATION]
         },
         {
             'Name': 'ModelPath',
@@ -173,9 +352,11 @@ def handler(event, context):
             'Name': 'ModelVersion',
             'Value': model_version
         }
-    ]   
-    )
-    
+    ]
+    response = timed(timings, 'start_pipeline_execution', start_pipeline_execution,
+        pipeline_name, pipeline_parameters)
+    print('## Stage timings (ms):', json.dumps(timings))
+
 
     return {
         "statusCode": 200,
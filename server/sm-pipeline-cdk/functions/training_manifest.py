@@ -0,0 +1,57 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+import re
+
+# Incremental ingestion appends every upload as new shards under
+# <tenant_id>/data/shards/v<model_version>/ instead of rewriting the splits, and points
+# training at SageMaker manifest files listing all shards of each split
+INCREMENTAL_MODE = 'incremental'
+SHARDS_PREFIX = 'data/shards/'
+MANIFESTS_PREFIX = 'data/manifests/'
+
+SHARD_VERSION_PATTERN = re.compile(r'/v(\d+)/')
+
+
+def shard_keys(tenant_id, model_version, splits, output_format):
+    """
+    Keys of the shards a training run writes, one per split under a prefix versioned
+    by the run's model version, so concurrent runs never overwrite each other
+    """
+    return {split: f"{tenant_id}/{SHARDS_PREFIX}v{model_version}/{split}.{output_format}" for split in splits}
+
+
+def list_shards(s3_client, bucket, tenant_id, splits, output_format):
+    """
+    Returns {split: [shard keys]} in version order. The bucket listing is the source of
+    truth, so runs finishing in any order all end up in later manifests.
+    """
+    shards = {split: [] for split in splits}
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{tenant_id}/{SHARDS_PREFIX}"):
+        for item in page.get('Contents', []):
+            file_name = item['Key'].rsplit('/', 1)[-1]
+            split = file_name[:-len(output_format) - 1]
+            if split in shards and file_name.endswith('.' + output_format):
+                shards[split].append(item['Key'])
+    for keys in shards.values():
+        keys.sort(key=lambda key: int(SHARD_VERSION_PATTERN.search(key).group(1)))
+    return shards
+
+
+def write_manifests(s3_client, bucket, tenant_id, model_version, splits, output_format):
+    """
+    Writes one SageMaker manifest file per split listing every shard written so far.
+    Manifests are versioned like the shards so a running pipeline keeps reading the
+    manifest it was started with. Returns {split: manifest S3 URI}.
+    """
+    shard_prefix = f"{tenant_id}/{SHARDS_PREFIX}"
+    manifest_uris = {}
+    for split, keys in list_shards(s3_client, bucket, tenant_id, splits, output_format).items():
+        manifest = [{'prefix': f"s3://{bucket}/{shard_prefix}"}] + [key[len(shard_prefix):] for key in keys]
+        manifest_key = f"{tenant_id}/{MANIFESTS_PREFIX}v{model_version}/{split}.manifest"
+        s3_client.put_object(Bucket=bucket, Key=manifest_key, Body=json.dumps(manifest).encode('utf-8'),
+                             ContentType='application/json')
+        manifest_uris[split] = f"s3://{bucket}/{manifest_key}"
+    return manifest_uris
@@ -0,0 +1,165 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+import math
+import os
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+# A tenant's uploads are trained together once no new file arrived for this long
+UPLOAD_DEBOUNCE_SECONDS = int(os.getenv('UPLOAD_DEBOUNCE_SECONDS', '120'))
+# SQS caps per message delays at 15 minutes
+MAX_DELAY_SECONDS = 900
+
+# A tenant's uploads waiting for the debounce window, kept in its MLaaS-TenantDetails item
+# so every batch and poller sees the whole burst. Only the queue message carrying the
+# latest upload time may start the training run.
+PENDING_KEYS_ATTRIBUTE = 'pendingUploadKeys'
+PENDING_UPLOAD_AT_ATTRIBUTE = 'pendingUploadAt'
+
+
+class PendingUploads:
+    """
+    The uploads of one tenant collected from a batch of queue messages. Messages
+    requeued by this stage carry no keys, only the upload time they wait on.
+    """
+
+    def __init__(self, tenant_id, bucket_name):
+        self.tenant_id = tenant_id
+        self.bucket_name = bucket_name
+        self.object_keys = []
+        self.last_upload_at = 0
+        self.message_ids = []
+
+    def add(self, object_keys, uploaded_at, message_id):
+        for object_key in object_keys:
+            if object_key not in self.object_keys:
+                self.object_keys.append(object_key)
+        self.last_upload_at = max(self.last_upload_at, uploaded_at)
+        self.message_ids.append(message_id)
+
+    def to_message(self, last_upload_at=None):
+        return json.dumps({
+            'tenantId': self.tenant_id,
+            'bucketName': self.bucket_name,
+            'lastUploadAt': float(self.last_upload_at if last_upload_at is None else last_upload_at)
+        })
+
+
+def is_training_upload(object_key):
+    """
+    Training data is any CSV or Parquet file the tenant uploads, bulk inference files
+    share the bucket
+    """
+    tenant_id = object_key.split('/')[0]
+    return object_key.endswith(('.csv', '.parquet')) and not object_key.startswith(tenant_id + '/inference/')
+
+
+def group_upload_records(records):
+    """
+    Groups SQS records by tenant, deduplicating object keys. A record body is either
+    the S3 "Object Created" EventBridge event or a message requeued by this stage.
+    Returns {tenant_id: PendingUploads}; records holding no training data are dropped.
+    """
+    pending = {}
+    for record in records:
+        body = json.loads(record['body'])
+        if 'detail' in body:
+            bucket_name = body['detail']['bucket']['name']
+            object_keys = [body['detail']['object']['key']]
+            uploaded_at = int(record['attributes']['SentTimestamp']) / 1000
+            object_keys = [object_key for object_key in object_keys if is_training_upload(object_key)]
+            if not object_keys:
+                continue
+            tenant_id = object_keys[0].split('/')[0]
+        else:
+            tenant_id = body['tenantId']
+            bucket_name = body['bucketName']
+            object_keys = []
+            uploaded_at = body['lastUploadAt']
+        if tenant_id not in pending:
+            pending[tenant_id] = PendingUploads(tenant_id, bucket_name)
+        pending[tenant_id].add(object_keys, uploaded_at, record['messageId'])
+    return pending
+
+
+def debounce_delay(last_upload_at, now, debounce_seconds=UPLOAD_DEBOUNCE_SECONDS):
+    """
+    Seconds to wait before the uploads may be trained, 0 once the tenant went quiet
+    """
+    remaining = last_upload_at + debounce_seconds - now
+    if remaining <= 0:
+        return 0
+    return min(MAX_DELAY_SECONDS, math.ceil(remaining))
+
+
+def upload_time(seconds):
+    """Upload time as stored in DynamoDB, to the millisecond SQS timestamps have"""
+    return Decimal(str(seconds)).quantize(Decimal('0.001'))
+
+
+def record_uploads(table, tenant_id, object_keys, uploaded_at):
+    """
+    Adds object_keys to the tenant's pending uploads, moving the pending upload time
+    forward to uploaded_at unless a later upload is recorded already. Returns the
+    pending upload time after the update.
+    """
+    uploaded_at = upload_time(uploaded_at)
+    names = {'#keys': PENDING_KEYS_ATTRIBUTE, '#at': PENDING_UPLOAD_AT_ATTRIBUTE}
+    while True:
+        try:
+            response = table.update_item(
+                Key={'tenantId': tenant_id},
+                UpdateExpression='ADD #keys :keys SET #at = :at',
+                ConditionExpression='attribute_exists(tenantId) AND (attribute_not_exists(#at) OR #at <= :at)',
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={':keys': set(object_keys), ':at': uploaded_at},
+                ReturnValues='UPDATED_NEW')
+            return response['Attributes'][PENDING_UPLOAD_AT_ATTRIBUTE]
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+        try:
+            # a later upload is pending, its message starts the training run
+            response = table.update_item(
+                Key={'tenantId': tenant_id},
+                UpdateExpression='ADD #keys :keys',
+                ConditionExpression='#at > :at',
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={':keys': set(object_keys), ':at': uploaded_at},
+                ReturnValues='ALL_NEW')
+            return response['Attributes'][PENDING_UPLOAD_AT_ATTRIBUTE]
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+        # the pending uploads were claimed in between, record them afresh
+
+
+def pending_upload_time(table, tenant_id):
+    """The tenant's pending upload time, None when no upload is pending"""
+    item = table.get_item(Key={'tenantId': tenant_id}, ConsistentRead=True,
+                          ProjectionExpression='#at', ExpressionAttributeNames={'#at': PENDING_UPLOAD_AT_ATTRIBUTE})
+    return item.get('Item', {}).get(PENDING_UPLOAD_AT_ATTRIBUTE)
+
+
+def claim_uploads(table, tenant_id, last_upload_at):
+    """
+    Takes the tenant's pending uploads if last_upload_at is still the latest pending
+    upload. Returns the sorted object keys, None when a later upload or another
+    delivery of the same message got there first.
+    """
+    try:
+        response = table.update_item(
+            Key={'tenantId': tenant_id},
+            UpdateExpression='REMOVE #keys, #at',
+            ConditionExpression='#at = :at',
+            ExpressionAttributeNames={'#keys': PENDING_KEYS_ATTRIBUTE, '#at': PENDING_UPLOAD_AT_ATTRIBUTE},
+            ExpressionAttributeValues={':at': upload_time(last_upload_at)},
+            ReturnValues='ALL_OLD')
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return None
+    return sorted(response['Attributes'].get(PENDING_KEYS_ATTRIBUTE, []))
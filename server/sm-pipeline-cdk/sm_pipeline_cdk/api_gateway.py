@@ -5,6 +5,7 @@ from typing_extensions import runtime
 from aws_cdk import (
     Aws,
     CfnOutput,
+    Duration,
     aws_apigateway as apigateway,
     aws_lambda as lambda_,
     aws_lambda_python_alpha as lambda_python,
@@ -93,7 +94,8 @@ class MlaasApiGateway(Construct):
                                                policy_name="abac-mlaas-tenant-access-policy",
                                                statements=[iam.PolicyStatement(
                                                    actions=[
-                                                           "s3:GetObject", "s3:PutObject"],
+                                                           "s3:GetObject", "s3:PutObject",
+                                                           "s3:AbortMultipartUpload", "s3:ListMultipartUploadParts"],
                                                    effect=iam.Effect.ALLOW,
                                                    resources=[
                                                        f"{bucket_arn}/${{aws:PrincipalTag/TenantId}}",
@@ -139,6 +141,7 @@ class MlaasApiGateway(Construct):
                                                        layer],
                                                    environment={
                                                        'ROLE_TO_ASSUME_ARN': abac_tenant_access_role.role_arn,
+                                                       'POWERTOOLS_METRICS_NAMESPACE': 'MLaaS',
                                                    }
                                                    )
 
@@ -174,13 +177,21 @@ class MlaasApiGateway(Construct):
         # Create API gateway
         api_gateway = apigateway.RestApi(self, "TenantAPIGateway", 
             rest_api_name = f"mlaas-api-gateway-{tenant_id}-{Aws.REGION}",
-            deploy = False
+            deploy = False,
+            # Parquet training data is uploaded as binary
+            binary_media_types = ["application/octet-stream", "application/x-parquet"]
             )
             
         jwt = api_gateway.root.add_resource("jwt")
         
         # Create API Lambda Token Authorizer
-        s3_uploader_api_auth = apigateway.TokenAuthorizer(self, "s3UploadAuthorizer", handler=auth_lambda)
+        # Cached policies carry the tenant routing context (bucket, tier, model_version)
+        # so repeated calls skip both the authorizer and the tenant lookup. A promoted
+        # model_version therefore reaches requests only after this TTL, plus the
+        # authorizer's own 60s tenant details cache; until then the previous version
+        # is served, which is why model retention never deletes it.
+        s3_uploader_api_auth = apigateway.TokenAuthorizer(self, "s3UploadAuthorizer", handler=auth_lambda,
+                                                          results_cache_ttl=Duration.minutes(1))
 
         jwt.add_method(
              "GET",
@@ -200,6 +211,15 @@ class MlaasApiGateway(Construct):
              apigateway.LambdaIntegration(handler=s3_uploader_lambda,proxy=True),
              authorizer = s3_uploader_api_auth
         )
+
+        # Completes (POST) or aborts (DELETE) a presigned multipart upload
+        upload_complete = upload.add_resource("complete")
+        for method in ["POST", "DELETE"]:
+            upload_complete.add_method(
+                 method,
+                 apigateway.LambdaIntegration(handler=s3_uploader_lambda,proxy=True),
+                 authorizer = s3_uploader_api_auth
+            )
         
         deployment = apigateway.Deployment(self, "Deployment", 
             api=api_gateway,
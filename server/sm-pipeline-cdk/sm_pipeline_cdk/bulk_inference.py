@@ -0,0 +1,85 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from constructs import Construct
+
+import aws_cdk as cdk
+from aws_cdk import (
+    Aws,
+    aws_events as events,
+    aws_events_targets as targets,
+    aws_iam as iam,
+    aws_lambda as lambda_,
+    aws_lambda_python_alpha as python_lambda,
+    aws_s3 as s3,
+)
+
+# See bulk_inference_job: inputs under <tenant_id>/inference/input/, results under <tenant_id>/inference/output/
+INPUT_KEY_PATTERN = "*/inference/input/*.csv"
+OUTPUT_KEY_PATTERN = "*/inference/output/*"
+
+
+class BulkInference(Construct):
+    """
+    Scores the CSV files tenants upload under <tenant_id>/inference/input/ of the data
+    bucket on the pooled endpoint, see bulk_inference_job
+    """
+
+    @property
+    def job_function(self) -> lambda_.IFunction:
+        return self._job_function
+
+    def __init__(self, scope: Construct, id: str, tenant_id: str, data_bucket: s3.IBucket,
+                 endpoint_name: str, **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        job_role = iam.Role(self, "BulkInferenceJobRole",
+            role_name=f'mlaas-bulk-inference-role-{tenant_id}-{Aws.REGION}',
+            assumed_by=iam.ServicePrincipal("lambda.amazonaws.com"),
+            managed_policies=[iam.ManagedPolicy.from_aws_managed_policy_name(
+                "service-role/AWSLambdaBasicExecutionRole")])
+        job_role.add_to_policy(iam.PolicyStatement(
+            actions=["sagemaker:InvokeEndpoint"],
+            resources=[f"arn:aws:sagemaker:{Aws.REGION}:{Aws.ACCOUNT_ID}:endpoint/{endpoint_name}"]))
+        job_role.add_to_policy(iam.PolicyStatement(
+            actions=["s3:GetObject"],
+            resources=[data_bucket.arn_for_objects(INPUT_KEY_PATTERN)]))
+        # Results are streamed as a multipart upload, aborted when the job fails
+        job_role.add_to_policy(iam.PolicyStatement(
+            actions=["s3:PutObject", "s3:AbortMultipartUpload"],
+            resources=[data_bucket.arn_for_objects(OUTPUT_KEY_PATTERN)]))
+        # Reads the served modelVersion, records the job status and its progress per chunk
+        job_role.add_to_policy(iam.PolicyStatement(
+            actions=["dynamodb:GetItem"],
+            resources=[f"arn:aws:dynamodb:{Aws.REGION}:{Aws.ACCOUNT_ID}:table/MLaaS-TenantDetails"]))
+        job_role.add_to_policy(iam.PolicyStatement(
+            actions=["dynamodb:PutItem", "dynamodb:UpdateItem"],
+            resources=[f"arn:aws:dynamodb:{Aws.REGION}:{Aws.ACCOUNT_ID}:table/MLaaS-BulkInferenceJobs"]))
+
+        self._job_function = python_lambda.PythonFunction(self, "BulkInferenceJobFn",
+            runtime=lambda_.Runtime.PYTHON_3_9,
+            entry="functions",
+            index="bulk_inference_job.py",
+            handler="handler",
+            # A job is scored within one invocation: inputs that take longer than the
+            # Lambda maximum are recorded FAILED and have to be split into several files
+            timeout=cdk.Duration.minutes(15),
+            role=job_role,
+            environment={"POOLED_ENDPOINT_NAME": endpoint_name,
+                         "BULK_INFERENCE_JOBS_TABLE": "MLaaS-BulkInferenceJobs",
+                         "BULK_INFERENCE_MAX_CONCURRENCY": "4"},
+            function_name=f'BulkInferenceJobFunction-{tenant_id}-{Aws.REGION}')
+
+        # The data bucket has EventBridge notifications on, see TenantCdkStack
+        input_created_rule = events.Rule(self, "BulkInferenceInputRule",
+            rule_name=f'bulk-inference-rule-{tenant_id}-{Aws.REGION}',
+            event_pattern=events.EventPattern(
+                source=["aws.s3"],
+                detail_type=["Object Created"],
+                detail={
+                    "bucket": {"name": [data_bucket.bucket_name]},
+                    "object": {"key": [{"wildcard": INPUT_KEY_PATTERN}]}
+                }))
+        input_created_rule.add_target(targets.LambdaFunction(self._job_function,
+            max_event_age=cdk.Duration.hours(2),
+            retry_attempts=2))
@@ -0,0 +1,62 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from constructs import Construct
+
+import aws_cdk as cdk
+from aws_cdk import (
+    Aws,
+    aws_events as events,
+    aws_events_targets as targets,
+    aws_iam as iam,
+    aws_lambda as lambda_,
+    aws_lambda_python_alpha as python_lambda,
+)
+
+
+class DedicatedModelRetention(Construct):
+    """
+    Deletes a dedicated tenant's SageMaker models and endpoint configs beyond the
+    retained versions once a day, see dedicated_model_retention
+    """
+
+    @property
+    def retention_function(self) -> lambda_.IFunction:
+        return self._retention_function
+
+    def __init__(self, scope: Construct, id: str, tenant_id: str, **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        retention_role = iam.Role(self, "DedicatedModelRetentionRole",
+            role_name=f'mlaas-model-retention-role-{tenant_id}-{Aws.REGION}',
+            assumed_by=iam.ServicePrincipal("lambda.amazonaws.com"),
+            managed_policies=[iam.ManagedPolicy.from_aws_managed_policy_name(
+                "service-role/AWSLambdaBasicExecutionRole")])
+        # Reads the served, rolling out and queued versions
+        retention_role.add_to_policy(iam.PolicyStatement(
+            actions=["dynamodb:GetItem"],
+            resources=[f"arn:aws:dynamodb:{Aws.REGION}:{Aws.ACCOUNT_ID}:table/MLaaS-TenantDetails"]))
+        retention_role.add_to_policy(iam.PolicyStatement(
+            actions=["sagemaker:ListModels", "sagemaker:ListEndpointConfigs"],
+            resources=["*"]))
+        # SageMaker ARNs carry the resource names lowercased
+        retention_role.add_to_policy(iam.PolicyStatement(
+            actions=["sagemaker:DeleteModel", "sagemaker:DeleteEndpointConfig"],
+            resources=[f"arn:aws:sagemaker:{Aws.REGION}:{Aws.ACCOUNT_ID}:model/{tenant_id.lower()}-sagemaker-model-*",
+                       f"arn:aws:sagemaker:{Aws.REGION}:{Aws.ACCOUNT_ID}:endpoint-config/"
+                       f"{tenant_id.lower()}-endpointconfig-*"]))
+
+        self._retention_function = python_lambda.PythonFunction(self, "DedicatedModelRetentionFn",
+            runtime=lambda_.Runtime.PYTHON_3_9,
+            entry="functions",
+            index="dedicated_model_retention.py",
+            handler="handler",
+            timeout=cdk.Duration.minutes(5),
+            role=retention_role,
+            environment={"TENANT_ID": tenant_id, "MODEL_RETENTION_VERSIONS": "3"},
+            function_name=f'DedicatedModelRetentionFunction-{tenant_id}-{Aws.REGION}')
+
+        retention_schedule = events.Rule(self, "DedicatedModelRetentionSchedule",
+            rule_name=f'model-retention-rule-{tenant_id}-{Aws.REGION}',
+            schedule=events.Schedule.rate(cdk.Duration.days(1)))
+        retention_schedule.add_target(targets.LambdaFunction(self._retention_function))
@@ -0,0 +1,126 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from constructs import Construct
+
+import aws_cdk as cdk
+from aws_cdk import (
+    Aws,
+    aws_events as events,
+    aws_events_targets as targets,
+    aws_iam as iam,
+    aws_lambda as lambda_,
+    aws_lambda_python_alpha as python_lambda,
+    aws_s3 as s3,
+)
+
+MME_ARTIFACT_PREFIX = "model_artifacts_mme/"
+
+
+class PooledModelLifecycle(Construct):
+    """
+    Reacts to the pooled tenants' model artifacts landing under model_artifacts_mme/
+    of the models bucket: mme_model_warmup loads each new model on the multi-model
+    endpoint and is what moves the tenant's modelVersion forward, mme_model_retention
+    deletes the artifacts beyond the retained versions.
+    """
+
+    @property
+    def warmup_function(self) -> lambda_.IFunction:
+        return self._warmup_function
+
+    @property
+    def retention_function(self) -> lambda_.IFunction:
+        return self._retention_function
+
+    def __init__(self, scope: Construct, id: str, tenant_id: str, models_bucket: s3.IBucket,
+                 endpoint_name: str, **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        # metrics_manager for the tenant metrics
+        layer = python_lambda.PythonLayerVersion(self, "ModelLifecycleLayer",
+            entry="../layers/",
+            compatible_runtimes=[lambda_.Runtime.PYTHON_3_9],
+            description="MLaaS utilities")
+
+        # The models bucket has EventBridge notifications on, see TenantCdkStack
+        self._artifact_created_pattern = events.EventPattern(
+            source=["aws.s3"],
+            detail_type=["Object Created"],
+            detail={
+                "bucket": {"name": [models_bucket.bucket_name]},
+                "object": {"key": [{"prefix": MME_ARTIFACT_PREFIX}]}
+            })
+
+        warmup_role = iam.Role(self, "ModelWarmupRole",
+            role_name=f'mlaas-mme-warmup-role-{tenant_id}-{Aws.REGION}',
+            assumed_by=iam.ServicePrincipal("lambda.amazonaws.com"),
+            managed_policies=[iam.ManagedPolicy.from_aws_managed_policy_name(
+                "service-role/AWSLambdaBasicExecutionRole")])
+        warmup_role.add_to_policy(iam.PolicyStatement(
+            actions=["sagemaker:InvokeEndpoint"],
+            resources=[f"arn:aws:sagemaker:{Aws.REGION}:{Aws.ACCOUNT_ID}:endpoint/{endpoint_name}"]))
+        # Reads the tenant tier and warmupPayload, then promotes modelVersion
+        warmup_role.add_to_policy(iam.PolicyStatement(
+            actions=["dynamodb:GetItem", "dynamodb:UpdateItem"],
+            resources=[f"arn:aws:dynamodb:{Aws.REGION}:{Aws.ACCOUNT_ID}:table/MLaaS-TenantDetails"]))
+        models_bucket.grant_read(warmup_role, f"{MME_ARTIFACT_PREFIX}*")
+
+        self._warmup_function = python_lambda.PythonFunction(self, "ModelWarmupFn",
+            runtime=lambda_.Runtime.PYTHON_3_9,
+            entry="functions",
+            index="mme_model_warmup.py",
+            handler="handler",
+            # 4 attempts of up to 120s each plus their backoff
+            timeout=cdk.Duration.minutes(10),
+            role=warmup_role,
+            environment={"POOLED_ENDPOINT_NAME": endpoint_name,
+                         "WARMUP_ATTEMPTS": "4", "WARMUP_BACKOFF_SECONDS": "5",
+                         "POWERTOOLS_METRICS_NAMESPACE": "MLaaS"},
+            layers=[layer],
+            # a model that failed to load raises, its event is invoked again
+            retry_attempts=2,
+            function_name=f'MmeModelWarmupFunction-{tenant_id}-{Aws.REGION}')
+
+        warmup_rule = events.Rule(self, "ModelWarmupRule",
+            rule_name=f'mme-warmup-rule-{tenant_id}-{Aws.REGION}',
+            event_pattern=self._artifact_created_pattern)
+        warmup_rule.add_target(targets.LambdaFunction(self._warmup_function,
+            max_event_age=cdk.Duration.hours(2),
+            retry_attempts=2))
+
+        retention_role = iam.Role(self, "ModelRetentionRole",
+            role_name=f'mlaas-mme-retention-role-{tenant_id}-{Aws.REGION}',
+            assumed_by=iam.ServicePrincipal("lambda.amazonaws.com"),
+            managed_policies=[iam.ManagedPolicy.from_aws_managed_policy_name(
+                "service-role/AWSLambdaBasicExecutionRole")])
+        # Reads the tenant tier and the served modelVersion
+        retention_role.add_to_policy(iam.PolicyStatement(
+            actions=["dynamodb:GetItem"],
+            resources=[f"arn:aws:dynamodb:{Aws.REGION}:{Aws.ACCOUNT_ID}:table/MLaaS-TenantDetails"]))
+        retention_role.add_to_policy(iam.PolicyStatement(
+            actions=["s3:ListBucket"],
+            resources=[models_bucket.bucket_arn],
+            conditions={"StringLike": {"s3:prefix": [f"{MME_ARTIFACT_PREFIX}*"]}}))
+        retention_role.add_to_policy(iam.PolicyStatement(
+            actions=["s3:DeleteObject"],
+            resources=[models_bucket.arn_for_objects(f"{MME_ARTIFACT_PREFIX}*")]))
+
+        self._retention_function = python_lambda.PythonFunction(self, "ModelRetentionFn",
+            runtime=lambda_.Runtime.PYTHON_3_9,
+            entry="functions",
+            index="mme_model_retention.py",
+            handler="handler",
+            timeout=cdk.Duration.minutes(5),
+            role=retention_role,
+            environment={"MODEL_RETENTION_VERSIONS": "3",
+                         "POWERTOOLS_METRICS_NAMESPACE": "MLaaS"},
+            layers=[layer],
+            function_name=f'MmeModelRetentionFunction-{tenant_id}-{Aws.REGION}')
+
+        retention_rule = events.Rule(self, "ModelRetentionRule",
+            rule_name=f'mme-retention-rule-{tenant_id}-{Aws.REGION}',
+            event_pattern=self._artifact_created_pattern)
+        retention_rule.add_target(targets.LambdaFunction(self._retention_function,
+            max_event_age=cdk.Duration.hours(2),
+            retry_attempts=2))
@@ -254,6 +254,9 @@ class SageMakerRoles(Construct):
             inline_policies={"AmazonSageMakerServiceCatalogProductsUseRolyPolicy": sm_product_use_role_policy}
         )
 
+        # The pipeline records the version it trained as candidateModelVersion; modelVersion
+        # is moved once the model can serve, by mme_model_warmup for pooled tenants and the
+        # dedicated rollout for gold tenants
         sm_sc_product_use_role.add_to_policy(iam.PolicyStatement(
             actions=["dynamodb:UpdateItem"],
             resources=[f"arn:aws:dynamodb:{Aws.REGION}:{Aws.ACCOUNT_ID}:table/MLaaS-TenantDetails"]
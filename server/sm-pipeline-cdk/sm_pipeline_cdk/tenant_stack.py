@@ -17,6 +17,7 @@ from aws_cdk import (
     custom_resources as cr,
     aws_lambda_python_alpha as python_lambda,
     aws_lambda as lambda_,
+    aws_lambda_event_sources as lambda_event_sources,
     CustomResource,
     aws_events as events,
     aws_sqs as sqs,
@@ -31,10 +32,13 @@ from sm_pipeline_cdk.waf_rules import Waf
 # LAB3 changes
 # from sm_pipeline_cdk.pooled_sagemaker_endpoint import PooledSageMakerEndpoint
 # from sm_pipeline_cdk.pooled_sagemaker_infrastructure import PooledSageMakerInfrastructure
+# from sm_pipeline_cdk.pooled_model_lifecycle import PooledModelLifecycle
+# from sm_pipeline_cdk.bulk_inference import BulkInference
 
 # LAB4 changes
 # from sm_pipeline_cdk.dedicated_sagemaker_infrastructure import DedicatedSageMakerInfrastructure
 # from sm_pipeline_cdk.dedicated_sagemaker_endpoint import DedicatedSageMakerEndpoint
+# from sm_pipeline_cdk.dedicated_model_retention import DedicatedModelRetention
 
 class TenantCdkStack(Stack):
     
@@ -99,6 +103,13 @@ class TenantCdkStack(Stack):
                        f"arn:aws:s3::::{sm_bucket.bucket_name}/${{aws:PrincipalTag/TenantID}}/*"]
             )
             )
+            # Incremental ingestion lists the tenant's training data shards
+            s3_tenant_iam_role.add_to_policy(iam.PolicyStatement(
+            actions=["s3:ListBucket"],
+            resources=[f"arn:aws:s3:::{sm_bucket.bucket_name}"],
+            conditions={"StringLike": {"s3:prefix": [f"${{aws:PrincipalTag/TenantID}}/*"]}}
+            )
+            )
             tenant_iam_role = s3_tenant_iam_role
             # LAB 3 changes
             # pooled_sagemaker_endpoint_stack = PooledSageMakerEndpoint(self, "PooledSageMakerEndpoint")
@@ -106,6 +117,14 @@ class TenantCdkStack(Stack):
             # endpoint_name = pooled_sagemaker_endpoint_stack.model_endpoint_name, 
             # api_gateway_id = tenant_api_gateway._api_gateway_id,
             # api_gateway_root_resource_id = tenant_api_gateway._api_gateway_root_resource_id)
+            # pooled_model_lifecycle = PooledModelLifecycle(self, "PooledModelLifecycle",
+            # tenant_id = tenant_id,
+            # models_bucket = sm_bucket,
+            # endpoint_name = pooled_sagemaker_endpoint_stack.model_endpoint_name)
+            # bulk_inference = BulkInference(self, "BulkInference",
+            # tenant_id = tenant_id,
+            # data_bucket = bucket,
+            # endpoint_name = pooled_sagemaker_endpoint_stack.model_endpoint_name)
         # LAB 4 changes
         #else:
         
@@ -132,6 +151,8 @@ class TenantCdkStack(Stack):
         #         sagemaker_model_bucket_name = sm_bucket.bucket_name,
         #         api_gateway_id = tenant_api_gateway._api_gateway_id,
         #         api_gateway_root_resource_id = tenant_api_gateway._api_gateway_root_resource_id)
+
+        #    dedicated_model_retention = DedicatedModelRetention(self, "DedicatedModelRetention", tenant_id = tenant_id)
          
 
         # Custom Resource to Write Details to DynamoDB
@@ -205,6 +226,12 @@ class TenantCdkStack(Stack):
                             )
 
         queue = sqs.Queue(self, "Queue")
+
+        # Uploads are queued so a burst of files from one tenant is trained once, after
+        # UPLOAD_DEBOUNCE_SECONDS without a new upload
+        upload_queue = sqs.Queue(self, "UploadCoalescingQueue",
+                                 visibility_timeout=cdk.Duration.minutes(90),
+                                 dead_letter_queue=sqs.DeadLetterQueue(max_receive_count=3, queue=queue))
         '''
         
 
@@ -229,6 +256,13 @@ class TenantCdkStack(Stack):
             resources=["*"]
             )
         )
+
+        # Read the cached pipeline name from the settings table
+        lambda_pipe_exec_iam_role.add_to_policy(iam.PolicyStatement(
+            actions=["dynamodb:GetItem"],
+            resources=[f"arn:aws:dynamodb:{Aws.REGION}:{Aws.ACCOUNT_ID}:table/MLaaS-Setting"]
+            )
+        )
         '''
 
         '''
@@ -254,7 +288,7 @@ class TenantCdkStack(Stack):
             ))
 
             dynamodb_access_role.add_to_policy(iam.PolicyStatement(
-            actions=["dynamodb:GetItem"],
+            actions=["dynamodb:GetItem", "dynamodb:UpdateItem"],
             resources=[f"arn:aws:dynamodb:{Aws.REGION}:{Aws.ACCOUNT_ID}:table/MLaaS-TenantDetails"],
             conditions={"ForAllValues:StringEquals":{
                     "dynamodb:LeadingKeys": [
@@ -278,7 +312,7 @@ class TenantCdkStack(Stack):
             ))
 
             dynamodb_access_role.add_to_policy(iam.PolicyStatement(
-             actions=["dynamodb:GetItem"],
+             actions=["dynamodb:GetItem", "dynamodb:UpdateItem"],
              resources=[f"arn:aws:dynamodb:{Aws.REGION}:{Aws.ACCOUNT_ID}:table/MLaaS-TenantDetails"],
              conditions={"ForAllValues:StringEquals":{
                      "dynamodb:LeadingKeys": [
@@ -299,20 +333,41 @@ class TenantCdkStack(Stack):
             handler="handler",
             timeout = cdk.Duration.minutes(15),
             role = lambda_pipe_exec_iam_role,
-            environment={"dynamodb_access_role_arn":dynamodb_access_role.role_arn, "tenant_type":f"{tenant_id}"},
+            environment={"dynamodb_access_role_arn":dynamodb_access_role.role_arn, "tenant_type":f"{tenant_id}",
+                         "SETTINGS_TABLE_NAME": "MLaaS-Setting",
+                         "COALESCE_QUEUE_URL": upload_queue.queue_url, "UPLOAD_DEBOUNCE_SECONDS": "120",
+                         "POWERTOOLS_METRICS_NAMESPACE": "MLaaS"},
+            # metrics_manager for the training data profile metrics, pyarrow for the Parquet uploads
+            layers=[python_lambda.PythonLayerVersion(self, "PipelineExecutionLayer",
+                entry="../layers/",
+                compatible_runtimes=[lambda_.Runtime.PYTHON_3_9],
+                description="MLaaS utilities"),
+                # kept out of functions/requirements.txt, every function bundles those
+                python_lambda.PythonLayerVersion(self, "PyArrowLayer",
+                entry="layers/pyarrow/",
+                compatible_runtimes=[lambda_.Runtime.PYTHON_3_9],
+                description="pyarrow for the Parquet training data")],
             function_name=f'SMPipelineExeFunction-{tenant_id}-{Aws.REGION}'
         )
         '''
         
-        # Configure the Lambda Function as the Traget for the Event Bridge Rule
+        # Configure the upload queue as the Traget for the Event Bridge Rule and the Lambda Function as its consumer
         '''
-        rule_s3_object_created.add_target(targets.LambdaFunction(fn_execute_pipeline,
+        rule_s3_object_created.add_target(targets.SqsQueue(upload_queue,
                                         dead_letter_queue=queue,  # Optional: add a dead letter queue
                                         # Optional: set the maxEventAge retry policy
                                         max_event_age=cdk.Duration.hours(2),
                                         retry_attempts=2
                                     )
         )
+
+        upload_queue.grant_send_messages(fn_execute_pipeline)
+        fn_execute_pipeline.add_event_source(lambda_event_sources.SqsEventSource(upload_queue,
+                                        batch_size=100,
+                                        max_batching_window=cdk.Duration.seconds(60),
+                                        report_batch_item_failures=True
+                                    )
+        )
         '''
         
         CfnOutput(self, "APIGatewayURL", value=tenant_api_gateway.api_gateway_url)
@@ -0,0 +1,18 @@
+import os
+import sys
+
+# Lambda sources are not packages, so expose them the way the Lambda runtime does
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+for path in [
+    os.path.join(SERVER_DIR, "sm-pipeline-cdk", "functions"),
+    os.path.join(SERVER_DIR, "sm-pipeline-cdk", "functions", "authorizer"),
+    os.path.join(SERVER_DIR, "layers"),
+    os.path.join(SERVER_DIR, "scripts"),
+]:
+    if path not in sys.path:
+        sys.path.append(path)
+
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
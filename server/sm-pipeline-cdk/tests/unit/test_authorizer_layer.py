@@ -0,0 +1,116 @@
+import json
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+import authorizer_layer
+from jwks_cache import JwksCache
+
+APP_CLIENT_ID = "app-client"
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public_jwk = jwk.construct(pem, "RS256").public_key().to_dict()
+    public_jwk["kid"] = "kid-1"
+    public_jwk = json.loads(json.dumps(public_jwk))
+    return pem, public_jwk
+
+
+@pytest.fixture(autouse=True)
+def empty_token_cache():
+    authorizer_layer.verified_token_cache.clear()
+
+
+def make_token(pem, kid="kid-1", expires_in=3600):
+    claims = {"aud": APP_CLIENT_ID, "exp": int(time.time()) + expires_in, "sub": "user"}
+    return jwt.encode(claims, pem, algorithm="RS256", headers={"kid": kid})
+
+
+def test_validate_jwt_with_key_list(signing_key):
+    pem, public_jwk = signing_key
+
+    claims = authorizer_layer.validateJWT(make_token(pem), APP_CLIENT_ID, [public_jwk])
+
+    assert claims["sub"] == "user"
+
+
+def test_validate_jwt_with_jwks_cache(signing_key):
+    pem, public_jwk = signing_key
+    cache = JwksCache("us-east-1", fetch_keys=lambda region, pool: [public_jwk])
+    keys = cache.key_resolver("pool-1")
+
+    assert authorizer_layer.validateJWT(make_token(pem), APP_CLIENT_ID, keys)
+    assert authorizer_layer.validateJWT(make_token(pem), APP_CLIENT_ID, keys)
+    assert cache.fetch_count == 1
+
+
+def test_unknown_kid_refresh_is_rate_limited(signing_key):
+    pem, public_jwk = signing_key
+    cache = JwksCache("us-east-1", min_refresh_interval_seconds=60,
+                      fetch_keys=lambda region, pool: [public_jwk])
+
+    assert cache.get_public_key("pool-1", "kid-1") is not None
+    assert cache.get_public_key("pool-1", "kid-unknown") is None
+    assert cache.get_public_key("pool-1", "kid-unknown") is None
+    assert cache.fetch_count == 1
+
+
+def test_stale_keys_served_when_refresh_fails(signing_key):
+    pem, public_jwk = signing_key
+    responses = [[public_jwk]]
+
+    def fetch_keys(region, pool):
+        if not responses:
+            raise IOError("cognito unavailable")
+        return responses.pop()
+
+    cache = JwksCache("us-east-1", ttl_seconds=0, min_refresh_interval_seconds=0, fetch_keys=fetch_keys)
+    cache.get_public_key("pool-1", "kid-1")
+
+    assert cache.get_public_key("pool-1", "kid-1") is not None
+
+
+def test_repeated_token_skips_signature_verification(signing_key, monkeypatch):
+    pem, public_jwk = signing_key
+    token = make_token(pem)
+    assert authorizer_layer.validateJWT(token, APP_CLIENT_ID, [public_jwk])
+
+    def fail_lookup(keys, kid):
+        raise AssertionError("signature should not be verified again")
+
+    monkeypatch.setattr(authorizer_layer, "get_public_key", fail_lookup)
+
+    assert authorizer_layer.validateJWT(token, APP_CLIENT_ID, [public_jwk])["sub"] == "user"
+    assert authorizer_layer.validateJWT(token, "other-client", [public_jwk]) is False
+
+
+def test_tampered_token_is_not_served_from_cache(signing_key):
+    pem, public_jwk = signing_key
+    token = make_token(pem)
+    assert authorizer_layer.validateJWT(token, APP_CLIENT_ID, [public_jwk])
+
+    header, payload, signature = token.split(".")
+    tampered = ".".join([header, payload, signature[:-4] + ("AAAA" if signature[-4:] != "AAAA" else "BBBB")])
+
+    assert authorizer_layer.validateJWT(tampered, APP_CLIENT_ID, [public_jwk]) is False
+
+
+def test_cached_token_expires(signing_key, monkeypatch):
+    pem, public_jwk = signing_key
+    token = make_token(pem, expires_in=60)
+    assert authorizer_layer.validateJWT(token, APP_CLIENT_ID, [public_jwk])
+
+    later = time.time() + 120
+    monkeypatch.setattr(authorizer_layer.time, "time", lambda: later)
+
+    assert authorizer_layer.validateJWT(token, APP_CLIENT_ID, [public_jwk]) is False
@@ -0,0 +1,32 @@
+from aws_cdk import (
+    App,
+    Stack,
+    assertions,
+    aws_s3 as s3
+)
+from sm_pipeline_cdk.bulk_inference import BulkInference
+
+
+def test_bulk_inference_job_runs_on_tenant_inference_inputs():
+    # no Docker here to bundle the function
+    app = App(context={"aws:cdk:bundling-stacks": []})
+    stack = Stack(app, "TenantCdkStack")
+    data_bucket = s3.Bucket(stack, "TenantDataInputBucket", event_bridge_enabled=True)
+    BulkInference(stack, "BulkInference", tenant_id="pooled", data_bucket=data_bucket, endpoint_name="pooled-endpoint")
+    template = assertions.Template.from_stack(stack)
+
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Handler": "bulk_inference_job.handler",
+        "Environment": {"Variables": assertions.Match.object_like({"POOLED_ENDPOINT_NAME": "pooled-endpoint"})}
+    })
+    template.has_resource_properties("AWS::Events::Rule", {
+        "EventPattern": assertions.Match.object_like({
+            "detail": assertions.Match.object_like({"object": {"key": [{"wildcard": "*/inference/input/*.csv"}]}})
+        })
+    })
+    statements = [statement for policy in template.find_resources("AWS::IAM::Policy").values()
+                  for statement in policy["Properties"]["PolicyDocument"]["Statement"]]
+    actions = set()
+    for statement in statements:
+        actions.update([statement["Action"]] if isinstance(statement["Action"], str) else statement["Action"])
+    assert {"sagemaker:InvokeEndpoint", "s3:GetObject", "dynamodb:PutItem", "dynamodb:UpdateItem"} <= actions
@@ -0,0 +1,144 @@
+import io
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import bulk_inference_job
+
+BUCKET = "tenant-bucket"
+
+
+class FakeSageMakerRuntime:
+    """Scores each CSV row as the sum of its values and fails rows containing 'bad'"""
+
+    def __init__(self):
+        self.calls = []
+
+    def invoke_endpoint(self, EndpointName, ContentType, Body, TargetModel=None):
+        self.calls.append(TargetModel)
+        rows = Body.split("\n")
+        if any("bad" in row for row in rows):
+            raise RuntimeError("model error")
+        predictions = "\n".join(str(sum(float(value) for value in row.split(","))) for row in rows)
+        return {"Body": io.BytesIO(predictions.encode())}
+
+
+@pytest.fixture
+def aws():
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=BUCKET)
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        jobs_table = dynamodb.create_table(
+            TableName="MLaaS-BulkInferenceJobs",
+            KeySchema=[{"AttributeName": "tenantId", "KeyType": "HASH"},
+                       {"AttributeName": "jobId", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "tenantId", "AttributeType": "S"},
+                                  {"AttributeName": "jobId", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield s3, jobs_table
+
+
+def test_bulk_inference_job_scores_file_in_order(aws):
+    s3, jobs_table = aws
+    rows = [f"{i},1" for i in range(10)]
+    rows[4] = "bad,1"
+    s3.put_object(Bucket=BUCKET, Key="tenant-1/inference/input/scores.csv", Body="\n".join(rows))
+    runtime = FakeSageMakerRuntime()
+
+    job = bulk_inference_job.run_bulk_inference_job(
+        s3, runtime, jobs_table, BUCKET, "tenant-1/inference/input/scores.csv",
+        "tenant-1", "pooled-endpoint", lambda: "tenant-1.model.2.tar.gz", "job-1", concurrency=2,
+        max_rows_per_chunk=3)
+
+    output = s3.get_object(Bucket=BUCKET, Key="tenant-1/inference/output/scores.out.csv")["Body"].read().decode()
+    lines = output.splitlines()
+    assert [line.split(",")[0] for line in lines] == [str(i) for i in range(10)]
+    assert lines[0] == "0,1.0,"
+    assert lines[4] == "4,,model error"
+    assert lines[3].endswith(",model error")
+    assert job["jobStatus"] == "SUCCEEDED"
+    assert job["rowsTotal"] == 10
+    assert job["rowsFailed"] == 3
+    assert job["chunksDone"] == 4
+    assert set(runtime.calls) == {"tenant-1.model.2.tar.gz"}
+
+    record = jobs_table.get_item(Key={"tenantId": "tenant-1", "jobId": "job-1"})["Item"]
+    assert record["jobStatus"] == "SUCCEEDED"
+    assert record["outputUri"] == f"s3://{BUCKET}/tenant-1/inference/output/scores.out.csv"
+
+
+def test_bulk_inference_job_records_failure(aws):
+    s3, jobs_table = aws
+
+    job = bulk_inference_job.run_bulk_inference_job(
+        s3, FakeSageMakerRuntime(), jobs_table, BUCKET, "tenant-1/inference/input/missing.csv",
+        "tenant-1", "pooled-endpoint", lambda: "tenant-1.model.2.tar.gz", "job-2")
+
+    assert job["jobStatus"] == "FAILED"
+    assert jobs_table.get_item(Key={"tenantId": "tenant-1", "jobId": "job-2"})["Item"]["jobStatus"] == "FAILED"
+
+
+def test_bulk_inference_job_writes_progress_per_chunk(aws):
+    s3, jobs_table = aws
+    s3.put_object(Bucket=BUCKET, Key="tenant-1/inference/input/scores.csv",
+                  Body="\n".join(f"{i},1" for i in range(6)))
+    progress = []
+
+    class ProgressRecordingRuntime(FakeSageMakerRuntime):
+        def invoke_endpoint(self, **kwargs):
+            record = jobs_table.get_item(Key={"tenantId": "tenant-1", "jobId": "job-3"})["Item"]
+            progress.append((record["jobStatus"], int(record["rowsTotal"])))
+            return super().invoke_endpoint(**kwargs)
+
+    bulk_inference_job.run_bulk_inference_job(
+        s3, ProgressRecordingRuntime(), jobs_table, BUCKET, "tenant-1/inference/input/scores.csv",
+        "tenant-1", "pooled-endpoint", lambda: "tenant-1.model.2.tar.gz", "job-3", concurrency=1,
+        max_rows_per_chunk=2)
+
+    assert progress == [("RUNNING", 0), ("RUNNING", 2), ("RUNNING", 4)]
+
+
+def test_bulk_inference_job_out_of_time_is_recorded_failed(aws):
+    s3, jobs_table = aws
+    s3.put_object(Bucket=BUCKET, Key="tenant-1/inference/input/scores.csv", Body="1,1\n2,2")
+
+    job = bulk_inference_job.run_bulk_inference_job(
+        s3, FakeSageMakerRuntime(), jobs_table, BUCKET, "tenant-1/inference/input/scores.csv",
+        "tenant-1", "pooled-endpoint", lambda: "tenant-1.model.2.tar.gz", "job-4", deadline=0)
+
+    assert job["jobStatus"] == "FAILED"
+    assert "split the input" in job["errorMessage"]
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET, Prefix="tenant-1/inference/output/")
+
+
+@pytest.mark.parametrize("tenant_item", [None, {"tenantId": "tenant-1", "tenantTier": "Bronze"}])
+def test_handler_records_a_failed_job_without_a_served_model(aws, monkeypatch, tenant_item):
+    s3, jobs_table = aws
+    tenant_details = boto3.resource("dynamodb", region_name="us-east-1").create_table(
+        TableName="MLaaS-TenantDetails",
+        KeySchema=[{"AttributeName": "tenantId", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "tenantId", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST")
+    if tenant_item:
+        tenant_details.put_item(Item=tenant_item)
+    s3.put_object(Bucket=BUCKET, Key="tenant-1/inference/input/scores.csv", Body="1,1")
+    event = {"id": "job-5", "detail": {"bucket": {"name": BUCKET},
+                                       "object": {"key": "tenant-1/inference/input/scores.csv"}}}
+
+    job = bulk_inference_job.handler(event, None)
+
+    assert job["jobStatus"] == "FAILED"
+    record = jobs_table.get_item(Key={"tenantId": "tenant-1", "jobId": "job-5"})["Item"]
+    assert record["jobStatus"] == "FAILED"
+    assert "tenant-1" in record["errorMessage"]
+
+
+def test_only_bulk_inference_inputs_are_scored():
+    assert bulk_inference_job.is_bulk_inference_input("tenant-1/inference/input/a.csv")
+    assert not bulk_inference_job.is_bulk_inference_input("tenant-1/a.csv")
+    assert not bulk_inference_job.is_bulk_inference_input("tenant-1/inference/output/a.out.csv")
+
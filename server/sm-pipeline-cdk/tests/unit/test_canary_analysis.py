@@ -0,0 +1,39 @@
+import pytest
+
+from canary_analysis import CANARY_MODE, RolloutPolicy, find_regression
+
+
+def metrics(new_latency, new_errors=0, new_invocations=1000):
+    return {"Variant0": {"p99Latency": 1000.0, "errors": 0, "invocations": 5000},
+            "Variant4": {"p99Latency": new_latency, "errors": new_errors, "invocations": new_invocations}}
+
+
+@pytest.mark.parametrize("new_latency, new_errors, regressed", [
+    (1100.0, 0, False),
+    (1300.0, 0, True),
+    (900.0, 20, True),
+    (900.0, 5, False),
+])
+def test_find_regression(new_latency, new_errors, regressed):
+    policy = RolloutPolicy(CANARY_MODE, max_latency_regression_percent=20, max_error_rate_percent=1)
+
+    assert (find_regression(metrics(new_latency, new_errors), "Variant0", "Variant4", policy) is not None) == regressed
+
+
+def test_variant_without_traffic_does_not_regress():
+    assert find_regression(metrics(None, new_invocations=0), "Variant0", "Variant4", RolloutPolicy()) is None
+
+
+def test_policy_round_trips_through_its_item():
+    policy = RolloutPolicy(CANARY_MODE, traffic_percents=[5, 25, 50], step_seconds=300,
+                           max_latency_regression_percent="12.5")
+
+    restored = RolloutPolicy.from_item(policy.to_item())
+
+    assert (restored.mode, restored.traffic_percents, restored.steps, str(restored.max_latency_regression_percent)) == \
+        (CANARY_MODE, [5, 25, 50], 3, "12.5")
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        RolloutPolicy("blue_green")
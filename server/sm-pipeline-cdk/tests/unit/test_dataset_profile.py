@@ -0,0 +1,95 @@
+import io
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import dataset_profile
+import dataset_splitter
+
+BUCKET = "sagemaker-bucket"
+TARGET_KEYS = {
+    dataset_splitter.TRAIN: "tenant-1/data/train.csv",
+    dataset_splitter.VALIDATION: "tenant-1/data/validation.csv",
+    dataset_splitter.TEST: "tenant-1/data/test.csv",
+}
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def test_columns_are_typed_and_ranged():
+    profiler = dataset_profile.DatasetProfiler()
+    for line in [b"1,2.5,a\n", b"0,,b\n", b"1,-1,3\n"]:
+        profiler.observe(memoryview(line))
+
+    label, feature, text = profiler.to_dict()["columns"]
+    assert (label["dtype"], label["min"], label["max"], label["nulls"]) == ("int", 0, 1, 0)
+    assert (feature["dtype"], feature["min"], feature["max"], feature["nulls"]) == ("float", -1, 2.5, 1)
+    assert (text["dtype"], text["min"], text["max"]) == ("string", None, None)
+
+
+def test_ragged_rows_are_flagged():
+    profiler = dataset_profile.DatasetProfiler()
+    profiler.observe(b"1,2,3\n")
+    profiler.observe(b"1,2\n")
+
+    profile = profiler.to_dict()
+    assert profile["raggedRows"] is True
+    assert profile["columnCount"] == 3
+
+
+def test_profile_is_collected_in_the_split_pass(s3):
+    s3.put_object(Bucket=BUCKET, Key="tenant-1/upload.csv",
+                  Body="label,feature\n" + "".join(f"{i % 2},{i}\n" for i in range(100)))
+    profiler = dataset_profile.DatasetProfiler()
+
+    stats = dataset_splitter.split_s3_object(s3, BUCKET, "tenant-1/upload.csv", BUCKET, TARGET_KEYS,
+                                             has_header=True, profiler=profiler)
+    profile = profiler.to_dict(stats)
+
+    assert profile["rows"] == 100
+    assert profile["bytes"] == sum(stat["bytes"] for stat in stats.values())
+    assert [column["name"] for column in profile["columns"]] == ["label", "feature"]
+    assert (profile["columns"][1]["min"], profile["columns"][1]["max"]) == (0, 99)
+
+
+def test_parquet_profile_comes_from_row_group_statistics(s3):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    import parquet_dataset
+
+    buffer = io.BytesIO()
+    pq.write_table(pa.table({"label": [0, 1, None, 1], "feature": [0.5, 1.5, 2.5, 3.5]}), buffer, row_group_size=2)
+    s3.put_object(Bucket=BUCKET, Key="tenant-1/upload.parquet", Body=buffer.getvalue())
+    profiler = dataset_profile.DatasetProfiler()
+
+    parquet_dataset.split_parquet_objects(s3, [(BUCKET, "tenant-1/upload.parquet")], BUCKET, TARGET_KEYS,
+                                          profiler=profiler)
+
+    label, feature = profiler.to_dict()["columns"]
+    assert (label["name"], label["dtype"], label["nulls"], label["min"], label["max"]) == ("label", "int", 1, 0, 1)
+    assert (feature["dtype"], feature["min"], feature["max"]) == ("float", 0.5, 3.5)
+    assert profiler.rows == 4
+
+
+def test_profile_metrics_are_emitted_per_tenant():
+    recorded = []
+
+    class MetricsManager:
+        @staticmethod
+        def record_tenant_metric(tenant_id, metric_name, metric_unit, metric_value):
+            recorded.append((tenant_id, metric_name, metric_value))
+
+    profiler = dataset_profile.DatasetProfiler()
+    profiler.observe(b"1,2\n")
+    dataset_profile.record_profile_metrics(MetricsManager, "tenant-1", profiler.to_dict(
+        {"train": {"rows": 1, "bytes": 4}}))
+
+    assert ("tenant-1", "TrainingDataRows", 1) in recorded
+    assert ("tenant-1", "TrainBytes", 4) in recorded
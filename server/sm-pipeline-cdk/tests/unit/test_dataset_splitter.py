@@ -0,0 +1,160 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+import dataset_splitter
+
+SOURCE_BUCKET = "tenant-bucket"
+TARGET_BUCKET = "sagemaker-bucket"
+TARGET_KEYS = {
+    dataset_splitter.TRAIN: "tenant-1/data/train.csv",
+    dataset_splitter.VALIDATION: "tenant-1/data/validation.csv",
+    dataset_splitter.TEST: "tenant-1/data/test.csv",
+}
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=SOURCE_BUCKET)
+        client.create_bucket(Bucket=TARGET_BUCKET)
+        yield client
+
+
+def read_lines(s3, key):
+    return s3.get_object(Bucket=TARGET_BUCKET, Key=key)["Body"].read().decode().splitlines()
+
+
+def test_row_index_strategy_keeps_default_ratios():
+    strategy = dataset_splitter.RowIndexSplitStrategy()
+    routed = [strategy.route(b"row") for _ in range(1000)]
+
+    assert routed.count(dataset_splitter.TRAIN) == 700
+    assert routed.count(dataset_splitter.VALIDATION) == 150
+    assert routed.count(dataset_splitter.TEST) == 150
+    # splits are interleaved instead of positional slices
+    assert dataset_splitter.TEST in routed[:20]
+
+
+def test_iter_lines_handles_lines_across_chunks():
+    class Body:
+        def iter_chunks(self, chunk_size):
+            yield b"1,2\n3,"
+            yield b"4\n5,6"
+
+    assert [bytes(line) for line in dataset_splitter.iter_lines(Body())] == [b"1,2\n", b"3,4\n", b"5,6\n"]
+
+
+def test_split_s3_object_streams_every_row_once(s3):
+    rows = [f"{i},{i * 2}" for i in range(200)]
+    s3.put_object(Bucket=SOURCE_BUCKET, Key="tenant-1/upload.csv", Body="\n".join(rows) + "\n")
+
+    stats = dataset_splitter.split_s3_object(s3, SOURCE_BUCKET, "tenant-1/upload.csv", TARGET_BUCKET, TARGET_KEYS)
+
+    split_rows = {split: read_lines(s3, key) for split, key in TARGET_KEYS.items()}
+    assert sorted(sum(split_rows.values(), []), key=lambda row: int(row.split(",")[0])) == rows
+    assert {split: stat["rows"] for split, stat in stats.items()} == {"train": 140, "validation": 30, "test": 30}
+
+
+def test_split_s3_object_copies_header_to_every_split(s3):
+    s3.put_object(Bucket=SOURCE_BUCKET, Key="tenant-1/upload.csv", Body="label,feature\n1,2\n3,4\n5,6\n")
+
+    dataset_splitter.split_s3_object(s3, SOURCE_BUCKET, "tenant-1/upload.csv", TARGET_BUCKET, TARGET_KEYS,
+                                     has_header=True)
+
+    for key in TARGET_KEYS.values():
+        assert read_lines(s3, key)[0] == "label,feature"
+
+
+def test_split_s3_object_uploads_each_row_exactly_once(s3):
+    # regression: a shared buffer used to leak train rows into validation and test
+    body = "".join(f"{i},{i % 7},{'x' * (i % 13)}\n" for i in range(1000)).encode()
+    s3.put_object(Bucket=SOURCE_BUCKET, Key="tenant-1/upload.csv", Body=body)
+    uploaded = []
+    put_object, upload_part = s3.put_object, s3.upload_part
+
+    def record_put_object(**kwargs):
+        uploaded.append(len(kwargs["Body"]))
+        return put_object(**kwargs)
+
+    def record_upload_part(**kwargs):
+        uploaded.append(len(kwargs["Body"]))
+        return upload_part(**kwargs)
+
+    s3.put_object, s3.upload_part = record_put_object, record_upload_part
+    stats = dataset_splitter.split_s3_object(s3, SOURCE_BUCKET, "tenant-1/upload.csv", TARGET_BUCKET, TARGET_KEYS)
+
+    assert {split: len(read_lines(s3, key)) for split, key in TARGET_KEYS.items()} == {
+        "train": 700, "validation": 150, "test": 150}
+    assert {split: stat["rows"] for split, stat in stats.items()} == {"train": 700, "validation": 150, "test": 150}
+    assert sum(uploaded) == len(body)
+    assert sum(stat["bytes"] for stat in stats.values()) == len(body)
+
+
+def test_split_s3_objects_merges_files_keeping_one_header(s3):
+    s3.put_object(Bucket=SOURCE_BUCKET, Key="tenant-1/a.csv", Body="label,feature\n1,2\n3,4\n")
+    s3.put_object(Bucket=SOURCE_BUCKET, Key="tenant-1/b.csv", Body="label,feature\n5,6\n7,8\n")
+
+    stats = dataset_splitter.split_s3_objects(s3, SOURCE_BUCKET, ["tenant-1/a.csv", "tenant-1/b.csv"],
+                                              TARGET_BUCKET, TARGET_KEYS, has_header=True)
+
+    split_rows = {split: read_lines(s3, key) for split, key in TARGET_KEYS.items()}
+    assert all(rows[0] == "label,feature" for rows in split_rows.values())
+    assert sorted(row for rows in split_rows.values() for row in rows[1:]) == ["1,2", "3,4", "5,6", "7,8"]
+    assert sum(stat["rows"] for stat in stats.values()) == 4
+
+
+def sorted_rows(count):
+    # sorted by label, the layout that skews positional splits
+    return [f"{0 if i < count // 2 else 1},{i}\n".encode() for i in range(count)]
+
+
+def test_hash_strategy_is_deterministic_and_close_to_ratios():
+    rows = sorted_rows(10000)
+    first = [dataset_splitter.HashSplitStrategy(seed="s").route(row) for row in rows]
+    second = [dataset_splitter.HashSplitStrategy(seed="s").route(row) for row in rows]
+
+    assert first == second
+    assert 6700 < first.count(dataset_splitter.TRAIN) < 7300
+    assert first != [dataset_splitter.HashSplitStrategy(seed="other").route(row) for row in rows]
+
+
+def test_random_strategy_is_reproducible_with_a_seed():
+    rows = sorted_rows(10000)
+    first_strategy = dataset_splitter.RandomSplitStrategy(seed="42")
+    second_strategy = dataset_splitter.RandomSplitStrategy(seed="42")
+    first = [first_strategy.route(row) for row in rows]
+
+    assert first == [second_strategy.route(row) for row in rows]
+    assert 1200 < first.count(dataset_splitter.TEST) < 1800
+
+
+def test_stratified_strategy_keeps_ratios_per_label():
+    strategy = dataset_splitter.StratifiedSplitStrategy()
+    routed = [(row.split(b",")[0], strategy.route(memoryview(row))) for row in sorted_rows(2000)]
+
+    for label in (b"0", b"1"):
+        splits = [split for row_label, split in routed if row_label == label]
+        assert splits.count(dataset_splitter.TRAIN) == 700
+        assert splits.count(dataset_splitter.VALIDATION) == 150
+        assert splits.count(dataset_splitter.TEST) == 150
+
+
+@pytest.mark.parametrize("label", ["{}.5", "{}"])
+def test_stratified_strategy_splits_a_continuous_label_by_hash(label):
+    # prices: a fractional value, or a distinct whole value, on every row
+    rows = [f"{label.format(1000 + i)},{i}\n".encode() for i in range(10000)]
+    strategy = dataset_splitter.StratifiedSplitStrategy()
+    routed = [strategy.route(memoryview(row)) for row in rows]
+
+    assert routed[1000:] == [dataset_splitter.HashSplitStrategy().route(row) for row in rows[1000:]]
+    assert routed[:1000].count(dataset_splitter.TRAIN) < 800
+    assert 6700 < routed.count(dataset_splitter.TRAIN) < 7300
+
+
+def test_create_split_strategy_rejects_unknown_names():
+    assert isinstance(dataset_splitter.create_split_strategy(), dataset_splitter.RowIndexSplitStrategy)
+    assert isinstance(dataset_splitter.create_split_strategy("stratified"), dataset_splitter.StratifiedSplitStrategy)
+    with pytest.raises(ValueError):
+        dataset_splitter.create_split_strategy("positional")
@@ -0,0 +1,316 @@
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+import endpoint_rollout
+from canary_analysis import CANARY_MODE, SHADOW_MODE, RolloutPolicy
+
+ENDPOINT = "tenant-1-endpoint"
+
+
+class FakeSageMaker:
+    """Endpoint whose status walks through `transitions` on every describe_endpoint"""
+
+    def __init__(self):
+        self.endpoint = {"EndpointConfigName": "tenant-1-EndpointConfig-3", "EndpointStatus": "InService"}
+        self.transitions = []
+        self.models = {"tenant-1-SageMaker-Model-3": {"PrimaryContainer": {"Image": "xgboost:1"}}}
+        self.endpoint_configs = {"tenant-1-EndpointConfig-3": {"ProductionVariants": [{
+            "VariantName": "Variant0", "ModelName": "tenant-1-SageMaker-Model-3", "InitialInstanceCount": 2,
+            "InstanceType": "ml.m5.large", "InitialVariantWeight": 1.0}]}}
+        self.updates = []
+        self.weights = []
+        self.config_describes = 0
+        self.update_errors = []
+
+    def describe_endpoint(self, EndpointName):
+        if self.transitions:
+            self.endpoint = dict(self.endpoint, **self.transitions.pop(0))
+        return dict(self.endpoint)
+
+    def describe_endpoint_config(self, EndpointConfigName):
+        self.config_describes += 1
+        return self.endpoint_configs[EndpointConfigName]
+
+    def describe_model(self, ModelName):
+        return self.models[ModelName]
+
+    def create_model(self, ModelName, PrimaryContainer, ExecutionRoleArn):
+        if ModelName in self.models:
+            raise ClientError({"Error": {"Code": "ValidationException",
+                                         "Message": "Cannot create already existing model"}}, "CreateModel")
+        self.models[ModelName] = {"PrimaryContainer": PrimaryContainer}
+
+    def create_endpoint_config(self, EndpointConfigName, ProductionVariants, ShadowProductionVariants=()):
+        self.endpoint_configs[EndpointConfigName] = {"ProductionVariants": ProductionVariants,
+                                                     "ShadowProductionVariants": list(ShadowProductionVariants)}
+
+    def update_endpoint(self, EndpointName, EndpointConfigName, RetainAllVariantProperties):
+        if self.update_errors:
+            raise ClientError({"Error": {"Code": "ValidationException", "Message": self.update_errors.pop(0)}},
+                              "UpdateEndpoint")
+        self.updates.append(EndpointConfigName)
+        self.endpoint = dict(self.endpoint, EndpointStatus="Updating")
+        self.target_config = EndpointConfigName
+
+    def update_endpoint_weights_and_capacities(self, EndpointName, DesiredWeightsAndCapacities):
+        self.weights.append({weight["VariantName"]: weight["DesiredWeight"] for weight in DesiredWeightsAndCapacities})
+        self.endpoint = dict(self.endpoint, EndpointStatus="Updating")
+        self.target_config = self.endpoint["EndpointConfigName"]
+
+    def settle(self, status="InService", config=None):
+        self.transitions.append({"EndpointStatus": status, "EndpointConfigName": config or self.target_config})
+
+
+class FakeCloudWatch:
+    """Serves per variant p99 latency (us), 5XX errors and invocations"""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def get_metric_data(self, MetricDataQueries, StartTime, EndTime):
+        results = []
+        for query in MetricDataQueries:
+            variant = query["MetricStat"]["Metric"]["Dimensions"][1]["Value"]
+            metric = query["MetricStat"]["Metric"]["MetricName"]
+            value = self.metrics.get(variant, {}).get(metric)
+            results.append({"Id": query["Id"], "Values": [] if value is None else [value]})
+        return {"MetricDataResults": results}
+
+
+@pytest.fixture
+def table():
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName="MLaaS-TenantDetails",
+            KeySchema=[{"AttributeName": "tenantId", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "tenantId", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST")
+        table.put_item(Item={"tenantId": "tenant-1", "modelVersion": 3})
+        yield table
+
+
+def start(sm, table, version, policy=None):
+    return endpoint_rollout.start_rollout(sm, table, "tenant-1", ENDPOINT, version,
+                                          f"s3://models/tenant-1.model.{version}.tar.gz", "role", policy)
+
+
+def advance(sm, table, cloudwatch=None):
+    return endpoint_rollout.advance_rollout(sm, table, "tenant-1", ENDPOINT, "role", cloudwatch)
+
+
+def healthy(latency=1000):
+    return {"ModelLatency": latency, "Invocation5XXErrors": 0, "Invocations": 1000}
+
+
+def served_version(table):
+    return table.get_item(Key={"tenantId": "tenant-1"})["Item"]["modelVersion"]
+
+
+def test_rollout_is_promoted_once_the_endpoint_is_in_service(table):
+    sm = FakeSageMaker()
+
+    assert start(sm, table, 4) == endpoint_rollout.ROLLOUT_UPDATING
+    assert sm.updates == ["tenant-1-EndpointConfig-4"]
+    assert sm.endpoint_configs["tenant-1-EndpointConfig-4"]["ProductionVariants"][0]["InstanceType"] == "ml.m5.large"
+    assert advance(sm, table) == endpoint_rollout.ROLLOUT_UPDATING
+    assert served_version(table) == 3
+
+    sm.settle()
+    assert advance(sm, table) == endpoint_rollout.ROLLOUT_COMPLETED
+    assert served_version(table) == 4
+    # later events and polls are no-ops
+    assert advance(sm, table) == endpoint_rollout.ROLLOUT_COMPLETED
+
+
+def test_rolled_back_update_is_recorded_as_failed(table):
+    sm = FakeSageMaker()
+    start(sm, table, 4)
+    sm.transitions = [{"EndpointStatus": "RollingBack"},
+                      {"EndpointStatus": "InService", "EndpointConfigName": "tenant-1-EndpointConfig-3",
+                       "FailureReason": "health check failed"}]
+
+    assert advance(sm, table) == endpoint_rollout.ROLLOUT_UPDATING
+    assert advance(sm, table) == endpoint_rollout.ROLLOUT_FAILED
+    rollout = endpoint_rollout.get_rollout(table, "tenant-1")
+    assert rollout["failureReason"] == "health check failed"
+    assert served_version(table) == 3
+
+
+def test_poll_before_the_update_is_requested_keeps_the_rollout_going(table):
+    sm = FakeSageMaker()
+    polls = []
+    create_endpoint_config = sm.create_endpoint_config
+
+    def poll_while_preparing(**kwargs):
+        # the endpoint is still InService on the old config
+        polls.append(advance(sm, table))
+        create_endpoint_config(**kwargs)
+    sm.create_endpoint_config = poll_while_preparing
+
+    assert start(sm, table, 4) == endpoint_rollout.ROLLOUT_UPDATING
+    assert polls == [endpoint_rollout.ROLLOUT_UPDATING]
+    assert sm.updates == ["tenant-1-EndpointConfig-4"]
+
+    sm.settle()
+    assert advance(sm, table) == endpoint_rollout.ROLLOUT_COMPLETED
+    assert served_version(table) == 4
+
+
+def test_rollout_ended_before_the_update_is_requested_leaves_the_endpoint_alone(table, monkeypatch):
+    sm = FakeSageMaker()
+    create_endpoint_config = sm.create_endpoint_config
+
+    def give_up_while_preparing(**kwargs):
+        monkeypatch.setattr(endpoint_rollout, "UPDATE_REQUEST_TIMEOUT_SECONDS", 0)
+        advance(sm, table)
+        create_endpoint_config(**kwargs)
+    sm.create_endpoint_config = give_up_while_preparing
+
+    assert start(sm, table, 4) == endpoint_rollout.ROLLOUT_FAILED
+    assert sm.updates == []
+    assert "never requested" in endpoint_rollout.get_rollout(table, "tenant-1")["failureReason"]
+    assert served_version(table) == 3
+
+
+def test_versions_arriving_during_a_rollout_are_queued_newest_first(table):
+    sm = FakeSageMaker()
+    start(sm, table, 4)
+
+    assert start(sm, table, 6) == endpoint_rollout.ROLLOUT_QUEUED
+    assert start(sm, table, 5) == endpoint_rollout.ROLLOUT_QUEUED
+    assert sm.updates == ["tenant-1-EndpointConfig-4"]
+
+    sm.settle()
+    assert advance(sm, table) == endpoint_rollout.ROLLOUT_UPDATING
+    assert served_version(table) == 4
+    assert sm.updates == ["tenant-1-EndpointConfig-4", "tenant-1-EndpointConfig-6"]
+
+    sm.settle()
+    assert advance(sm, table) == endpoint_rollout.ROLLOUT_COMPLETED
+    assert served_version(table) == 6
+
+
+def test_retried_start_reuses_the_created_model(table):
+    sm = FakeSageMaker()
+    sm.models["tenant-1-SageMaker-Model-4"] = {"PrimaryContainer": {"Image": "xgboost:1"}}
+
+    assert start(sm, table, 4) == endpoint_rollout.ROLLOUT_UPDATING
+    assert sm.updates == ["tenant-1-EndpointConfig-4"]
+
+
+def test_canary_shifts_traffic_in_steps_then_finalizes(table):
+    sm = FakeSageMaker()
+    cloudwatch = FakeCloudWatch({"Variant0": healthy(1000), "Variant4": healthy(1100)})
+    policy = RolloutPolicy(CANARY_MODE, traffic_percents=[10, 50], step_seconds=0)
+
+    start(sm, table, 4, policy)
+    canary_config = sm.endpoint_configs["tenant-1-EndpointConfig-4-canary"]["ProductionVariants"]
+    assert [(variant["VariantName"], variant["InitialVariantWeight"]) for variant in canary_config] == \
+        [("Variant0", 90), ("Variant4", 10)]
+    assert sm.updates == ["tenant-1-EndpointConfig-4-canary"]
+
+    sm.settle()
+    assert advance(sm, table, cloudwatch) == endpoint_rollout.ROLLOUT_UPDATING  # canary config in service
+    assert advance(sm, table, cloudwatch) == endpoint_rollout.ROLLOUT_UPDATING  # 10% step passed
+    assert sm.weights == [{"Variant0": 50, "Variant4": 50}]
+    sm.settle()
+    assert advance(sm, table, cloudwatch) == endpoint_rollout.ROLLOUT_UPDATING  # 50% step passed
+    assert sm.updates[-1] == "tenant-1-EndpointConfig-4"
+    assert served_version(table) == 3
+
+    sm.settle()
+    assert advance(sm, table, cloudwatch) == endpoint_rollout.ROLLOUT_COMPLETED
+    assert served_version(table) == 4
+
+
+def test_canary_with_latency_regression_is_drained_and_rolled_back(table):
+    sm = FakeSageMaker()
+    cloudwatch = FakeCloudWatch({"Variant0": healthy(1000), "Variant4": healthy(1500)})
+    start(sm, table, 4, RolloutPolicy(CANARY_MODE, traffic_percents=[10, 50], step_seconds=0))
+    sm.settle()
+    advance(sm, table, cloudwatch)
+
+    assert advance(sm, table, cloudwatch) == endpoint_rollout.ROLLOUT_UPDATING
+    assert sm.weights == [{"Variant0": 1, "Variant4": 0}]
+    sm.settle()
+    advance(sm, table, cloudwatch)
+    assert sm.updates[-1] == "tenant-1-EndpointConfig-3"
+    sm.settle()
+
+    assert advance(sm, table, cloudwatch) == endpoint_rollout.ROLLOUT_FAILED
+    assert "p99 latency" in endpoint_rollout.get_rollout(table, "tenant-1")["failureReason"]
+    assert served_version(table) == 3
+
+
+def test_shadow_variant_mirrors_traffic_before_taking_over(table):
+    sm = FakeSageMaker()
+    cloudwatch = FakeCloudWatch({"Variant0": healthy(1000), "Variant4": healthy(900)})
+    start(sm, table, 4, RolloutPolicy(SHADOW_MODE, step_seconds=0))
+    shadow_config = sm.endpoint_configs["tenant-1-EndpointConfig-4-shadow"]
+    assert [variant["VariantName"] for variant in shadow_config["ShadowProductionVariants"]] == ["Variant4"]
+
+    sm.settle()
+    advance(sm, table, cloudwatch)
+    advance(sm, table, cloudwatch)
+    assert sm.weights == []
+    assert sm.updates[-1] == "tenant-1-EndpointConfig-4"
+    sm.settle()
+    assert advance(sm, table, cloudwatch) == endpoint_rollout.ROLLOUT_COMPLETED
+
+
+def test_step_waits_for_its_observation_window(table):
+    sm = FakeSageMaker()
+    start(sm, table, 4, RolloutPolicy(CANARY_MODE, step_seconds=600))
+    sm.settle()
+    advance(sm, table)
+
+    assert advance(sm, table) == endpoint_rollout.ROLLOUT_UPDATING
+    assert sm.weights == []
+
+
+def test_deployment_profile_spares_describe_calls_on_later_rollouts(table):
+    sm = FakeSageMaker()
+    start(sm, table, 4)
+    sm.settle()
+    advance(sm, table)
+
+    start(sm, table, 5)
+
+    assert sm.config_describes == 1
+    assert sm.endpoint_configs["tenant-1-EndpointConfig-5"]["ProductionVariants"][0]["InitialInstanceCount"] == 2
+    profile = table.get_item(Key={"tenantId": "tenant-1"})["Item"][endpoint_rollout.PROFILE_ATTRIBUTE]
+    assert (profile["ModelName"], profile["EndpointConfigName"], profile["InstanceType"]) == \
+        ("tenant-1-SageMaker-Model-4", "tenant-1-EndpointConfig-4", "ml.m5.large")
+
+
+def test_stale_deployment_profile_is_refreshed(table):
+    sm = FakeSageMaker()
+    endpoint_rollout.save_deployment_profile(table, "tenant-1", {
+        "VariantName": "Variant0", "ModelName": "tenant-1-SageMaker-Model-2", "InstanceType": "ml.m5.large",
+        "InitialInstanceCount": 2, "Image": "xgboost:1", "EndpointConfigName": "tenant-1-EndpointConfig-2"})
+    sm.update_errors = ["Could not find endpoint configuration"]
+
+    assert start(sm, table, 4, RolloutPolicy(CANARY_MODE)) == endpoint_rollout.ROLLOUT_UPDATING
+
+    assert sm.config_describes == 1
+    assert endpoint_rollout.get_rollout(table, "tenant-1")["baselineConfigName"] == "tenant-1-EndpointConfig-3"
+
+
+def test_failed_rollout_drops_the_deployment_profile(table):
+    sm = FakeSageMaker()
+    start(sm, table, 4)
+    sm.settle(status="Failed")
+
+    assert advance(sm, table) == endpoint_rollout.ROLLOUT_FAILED
+    assert endpoint_rollout.PROFILE_ATTRIBUTE not in table.get_item(Key={"tenantId": "tenant-1"})["Item"]
+
+
+def test_protected_versions_cover_served_rolling_out_and_queued_versions(table):
+    sm = FakeSageMaker()
+    start(sm, table, 5, RolloutPolicy(CANARY_MODE))
+    start(sm, table, 7)
+
+    assert endpoint_rollout.protected_versions(table, "tenant-1") == {3, 5, 7}
@@ -0,0 +1,48 @@
+import json
+import threading
+
+import inference_batching
+
+
+def test_parse_batch_rows_accepts_csv_and_json():
+    assert inference_batching.parse_batch_rows("1,2\n\n3,4\n") == ["1,2", "3,4"]
+    assert inference_batching.parse_batch_rows(json.dumps([[1, 2], "3,4"])) == ["1,2", "3,4"]
+
+
+def test_chunk_rows_respects_payload_and_row_limits():
+    rows = ["1,2,3"] * 10
+
+    chunks = list(inference_batching.chunk_rows(rows, max_payload_bytes=20, max_rows_per_chunk=100))
+    assert [first for first, _ in chunks] == [0, 3, 6, 9]
+    assert all(len("\n".join(chunk)) <= 20 for _, chunk in chunks)
+
+    chunks = list(inference_batching.chunk_rows(rows, max_payload_bytes=1000, max_rows_per_chunk=4))
+    assert [len(chunk) for _, chunk in chunks] == [4, 4, 2]
+
+
+def test_score_rows_keeps_order_and_reports_failed_chunks():
+    rows = [str(value) for value in range(10)]
+    threads = set()
+
+    def invoke_chunk(payload):
+        threads.add(threading.get_ident())
+        values = payload.split("\n")
+        if "5" in values:
+            raise RuntimeError("model error")
+        return "\n".join(str(int(value) * 10) for value in values)
+
+    results = inference_batching.score_rows(rows, invoke_chunk, max_concurrency=4,
+                                            max_payload_bytes=1000, max_rows_per_chunk=2)
+
+    assert [result["row"] for result in results] == list(range(10))
+    assert results[0]["prediction"] == "0"
+    assert results[9]["prediction"] == "90"
+    assert results[4]["error"] == "model error"
+    assert results[5]["error"] == "model error"
+    assert "error" not in results[6]
+
+
+def test_score_rows_accepts_comma_separated_predictions():
+    results = inference_batching.score_rows(["1", "2"], lambda payload: "0.1,0.2")
+
+    assert [result["prediction"] for result in results] == ["0.1", "0.2"]
@@ -0,0 +1,137 @@
+import io
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError, ReadTimeoutError
+from moto import mock_aws
+
+import mme_model_warmup
+
+
+def model_error(status):
+    return ClientError({"Error": {"Code": "ModelError", "Message": "model error"}, "OriginalStatusCode": status},
+                       "InvokeEndpoint")
+
+
+class FakeRuntime:
+    """Answers invoke_endpoint with the queued outcomes, then successfully"""
+
+    def __init__(self, outcomes=()):
+        self.outcomes = list(outcomes)
+        self.invocations = []
+
+    def invoke_endpoint(self, **kwargs):
+        self.invocations.append(kwargs)
+        if self.outcomes:
+            raise self.outcomes.pop(0)
+        return {"Body": io.BytesIO(b"0.5")}
+
+
+class FakeMetricsManager:
+    def __init__(self):
+        self.metrics = []
+
+    def record_tenant_metric(self, tenant_id, metric_name, metric_unit, metric_value):
+        self.metrics.append((tenant_id, metric_name))
+
+
+@pytest.fixture
+def table(monkeypatch):
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName="MLaaS-TenantDetails",
+            KeySchema=[{"AttributeName": "tenantId", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "tenantId", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST")
+        table.put_item(Item={"tenantId": "tenant-1", "tenantTier": "Bronze", "modelVersion": 3})
+        table.put_item(Item={"tenantId": "tenant-2", "tenantTier": "Gold", "modelVersion": 3})
+        monkeypatch.setattr(mme_model_warmup, "table_tenant_details", table)
+        monkeypatch.setattr(mme_model_warmup, "warmup_backoff_seconds", 0)
+        monkeypatch.setattr(mme_model_warmup, "pooled_endpoint_name", "pooled-endpoint")
+        monkeypatch.setattr(mme_model_warmup, "metrics_manager", FakeMetricsManager())
+        yield table
+
+
+def artifact_event(key):
+    return {"detail": {"bucket": {"name": "models-bucket"}, "object": {"key": key}}}
+
+
+def served_version(table, tenant_id="tenant-1"):
+    return table.get_item(Key={"tenantId": tenant_id})["Item"]["modelVersion"]
+
+
+def test_new_model_is_warmed_up_before_it_is_promoted(table, monkeypatch):
+    runtime = FakeRuntime([ClientError({"Error": {"Code": "ModelNotReadyException", "Message": "loading"}},
+                                       "InvokeEndpoint"),
+                           ReadTimeoutError(endpoint_url="https://runtime")])
+    monkeypatch.setattr(mme_model_warmup, "runtime", runtime)
+
+    result = mme_model_warmup.handler(artifact_event("model_artifacts_mme/tenant-1.model.4.tar.gz"), None)
+
+    assert result["promoted"] is True
+    assert served_version(table) == 4
+    assert len(runtime.invocations) == 3
+    assert runtime.invocations[-1]["TargetModel"] == "tenant-1.model.4.tar.gz"
+    assert runtime.invocations[-1]["EndpointName"] == "pooled-endpoint"
+    assert mme_model_warmup.metrics_manager.metrics == [("tenant-1", "ModelWarmupMilliseconds")]
+
+
+def test_model_rejecting_the_payload_counts_as_warm(table, monkeypatch):
+    monkeypatch.setattr(mme_model_warmup, "runtime", FakeRuntime([model_error(415)]))
+
+    mme_model_warmup.handler(artifact_event("model_artifacts_mme/tenant-1.model.4.tar.gz"), None)
+
+    assert served_version(table) == 4
+
+
+def test_model_failing_to_load_is_not_promoted(table, monkeypatch):
+    monkeypatch.setattr(mme_model_warmup, "runtime", FakeRuntime([model_error(500)] * 10))
+
+    with pytest.raises(RuntimeError):
+        mme_model_warmup.handler(artifact_event("model_artifacts_mme/tenant-1.model.4.tar.gz"), None)
+
+    assert served_version(table) == 3
+
+
+@pytest.mark.parametrize("key", ["model_artifacts_mme/tenant-1.model.2.tar.gz",
+                                 "model_artifacts_mme/tenant-2.model.4.tar.gz",
+                                 "model_artifacts/output/model.tar.gz"])
+def test_stale_gold_and_unrelated_artifacts_are_skipped(table, monkeypatch, key):
+    runtime = FakeRuntime()
+    monkeypatch.setattr(mme_model_warmup, "runtime", runtime)
+
+    assert mme_model_warmup.handler(artifact_event(key), None) is None
+    assert runtime.invocations == []
+
+
+def test_training_run_leaves_the_promotion_to_the_warmup(table, monkeypatch):
+    monkeypatch.setattr(mme_model_warmup, "runtime", FakeRuntime())
+    version = mme_model_warmup.model_versioning.allocate_model_version(table, "tenant-1")
+    assert served_version(table) == 3
+
+    result = mme_model_warmup.handler(artifact_event(f"model_artifacts_mme/tenant-1.model.{version}.tar.gz"), None)
+
+    assert result["promoted"] is True
+    assert served_version(table) == version == 4
+
+
+def test_candidate_from_the_pipeline_is_warmed_up_and_promoted(table, monkeypatch):
+    monkeypatch.setattr(mme_model_warmup, "runtime", FakeRuntime())
+    table.update_item(Key={"tenantId": "tenant-1"}, UpdateExpression="SET candidateModelVersion = :v",
+                      ExpressionAttributeValues={":v": 4})
+
+    result = mme_model_warmup.handler(artifact_event("model_artifacts_mme/tenant-1.model.4.tar.gz"), None)
+
+    assert result["promoted"] is True
+    assert served_version(table) == 4
+
+
+def test_version_already_written_by_the_pipeline_is_still_warmed_up(table, monkeypatch):
+    runtime = FakeRuntime()
+    monkeypatch.setattr(mme_model_warmup, "runtime", runtime)
+
+    result = mme_model_warmup.handler(artifact_event("model_artifacts_mme/tenant-1.model.3.tar.gz"), None)
+
+    assert result["promoted"] is False
+    assert runtime.invocations[0]["TargetModel"] == "tenant-1.model.3.tar.gz"
@@ -0,0 +1,66 @@
+from aws_cdk import (
+    App,
+    Stack,
+    assertions,
+    aws_s3 as s3
+)
+from sm_pipeline_cdk.dedicated_model_retention import DedicatedModelRetention
+from sm_pipeline_cdk.pooled_model_lifecycle import PooledModelLifecycle
+
+
+def tenant_stack():
+    # no Docker here to bundle the functions
+    app = App(context={"aws:cdk:bundling-stacks": []})
+    return Stack(app, "TenantCdkStack")
+
+
+def lifecycle_template():
+    stack = tenant_stack()
+    models_bucket = s3.Bucket(stack, "SagemakerDataInputBucket", event_bridge_enabled=True)
+    PooledModelLifecycle(stack, "PooledModelLifecycle", tenant_id="pooled", models_bucket=models_bucket,
+                         endpoint_name="pooled-endpoint")
+    return assertions.Template.from_stack(stack)
+
+
+def test_warmup_runs_on_new_mme_artifacts():
+    template = lifecycle_template()
+
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Handler": "mme_model_warmup.handler",
+        "Environment": {"Variables": assertions.Match.object_like({"POOLED_ENDPOINT_NAME": "pooled-endpoint"})}
+    })
+    template.has_resource_properties("AWS::Events::Rule", {
+        "EventPattern": assertions.Match.object_like({
+            "detail": assertions.Match.object_like({"object": {"key": [{"prefix": "model_artifacts_mme/"}]}})
+        })
+    })
+    template.has_resource_properties("AWS::IAM::Policy", {
+        "PolicyDocument": {"Statement": assertions.Match.array_with([assertions.Match.object_like({
+            "Action": "sagemaker:InvokeEndpoint"
+        })])}
+    })
+
+
+def test_mme_retention_runs_on_new_mme_artifacts_and_only_deletes_them():
+    template = lifecycle_template()
+
+    template.has_resource_properties("AWS::Lambda::Function", {"Handler": "mme_model_retention.handler"})
+    template.resource_count_is("AWS::Events::Rule", 2)
+    template.has_resource_properties("AWS::IAM::Policy", {
+        "PolicyDocument": {"Statement": assertions.Match.array_with([assertions.Match.object_like({
+            "Action": "s3:DeleteObject",
+            "Resource": {"Fn::Join": ["", assertions.Match.array_with(["/model_artifacts_mme/*"])]}
+        })])}
+    })
+
+
+def test_dedicated_retention_runs_daily():
+    stack = tenant_stack()
+    DedicatedModelRetention(stack, "DedicatedModelRetention", tenant_id="Tenant-1")
+    template = assertions.Template.from_stack(stack)
+
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Handler": "dedicated_model_retention.handler",
+        "Environment": {"Variables": assertions.Match.object_like({"TENANT_ID": "Tenant-1"})}
+    })
+    template.has_resource_properties("AWS::Events::Rule", {"ScheduleExpression": "rate(1 day)"})
@@ -0,0 +1,123 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+import mme_model_retention
+import model_retention
+
+
+@pytest.mark.parametrize("versions, keep, protected, expected", [
+    (range(1, 8), 3, [], [1, 2, 3, 4]),
+    (range(1, 8), 3, [2], [1]),
+    (range(1, 8), 3, [6], [1, 2, 3, 4]),
+    ([4], 1, [4], []),
+])
+def test_versions_to_delete(versions, keep, protected, expected):
+    assert model_retention.versions_to_delete(versions, keep, protected) == expected
+
+
+def test_mme_artifacts_beyond_the_retained_versions_are_deleted_in_batches(monkeypatch):
+    monkeypatch.setattr(model_retention, "DELETE_BATCH_SIZE", 2)
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="models-bucket")
+        for version in range(1, 7):
+            s3.put_object(Bucket="models-bucket", Key=f"model_artifacts_mme/tenant-1.model.{version}.tar.gz",
+                          Body=b"x" * 100 * version)
+        s3.put_object(Bucket="models-bucket", Key="model_artifacts_mme/tenant-10.model.1.tar.gz", Body=b"x")
+
+        report = model_retention.prune_mme_artifacts(s3, "models-bucket", "tenant-1", keep=2, protected=[5])
+
+        # 4 was served before 5 and may still be the target of cached authorizer policies
+        assert report == {"deletedVersions": [1, 2, 3], "failedKeys": [], "reclaimedBytes": 600}
+        remaining = [obj["Key"] for obj in s3.list_objects_v2(Bucket="models-bucket")["Contents"]]
+        assert remaining == ["model_artifacts_mme/tenant-1.model.4.tar.gz",
+                             "model_artifacts_mme/tenant-1.model.5.tar.gz",
+                             "model_artifacts_mme/tenant-1.model.6.tar.gz",
+                             "model_artifacts_mme/tenant-10.model.1.tar.gz"]
+
+
+class FakeSageMaker:
+    def __init__(self, models, endpoint_configs):
+        self.pages = {"list_models": [{"Models": [{"ModelName": name} for name in models]}],
+                      "list_endpoint_configs": [{"EndpointConfigs": [{"EndpointConfigName": name}
+                                                                     for name in endpoint_configs]}]}
+        self.deleted = []
+
+    def get_paginator(self, operation):
+        pages = self.pages[operation]
+
+        class Paginator:
+            def paginate(self, NameContains):
+                return pages
+        return Paginator()
+
+    def delete_model(self, ModelName):
+        self.deleted.append(ModelName)
+
+    def delete_endpoint_config(self, EndpointConfigName):
+        self.deleted.append(EndpointConfigName)
+
+
+def test_superseded_models_and_endpoint_configs_are_deleted_configs_first():
+    sm = FakeSageMaker(
+        models=[f"tenant-1-SageMaker-Model-{version}" for version in range(1, 6)] + ["tenant-1-SageMaker-Model-x"],
+        endpoint_configs=["tenant-1-EndpointConfig-1", "tenant-1-EndpointConfig-2-canary", "tenant-1-EndpointConfig-5",
+                          "tenant-10-EndpointConfig-1"])
+
+    deleted = model_retention.prune_sagemaker_resources(sm, "tenant-1", keep=2, protected=[4])
+
+    assert deleted == {"endpointConfigs": ["tenant-1-EndpointConfig-1", "tenant-1-EndpointConfig-2-canary"],
+                       "models": ["tenant-1-SageMaker-Model-1", "tenant-1-SageMaker-Model-2",
+                                  "tenant-1-SageMaker-Model-3"]}
+    assert sm.deleted == deleted["endpointConfigs"] + deleted["models"]
+
+
+def test_parse_mme_artifact_key():
+    assert model_retention.parse_mme_artifact_key("model_artifacts_mme/tenant-1.model.12.tar.gz") == ("tenant-1", 12)
+    assert model_retention.parse_mme_artifact_key("tenant-1/model_artifacts_mme/tenant-1.model.12.tar.gz") is None
+    assert model_retention.parse_mme_artifact_key("model_artifacts_mme/sample.tar.gz") is None
+
+
+@pytest.fixture
+def mme_retention(monkeypatch):
+    class FakeMetricsManager:
+        def record_tenant_metric(self, tenant_id, metric_name, metric_unit, metric_value):
+            pass
+
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="models-bucket")
+        for tenant_id in ("tenant-1", "tenant-2"):
+            for version in range(1, 8):
+                s3.put_object(Bucket="models-bucket", Key=f"model_artifacts_mme/{tenant_id}.model.{version}.tar.gz",
+                              Body=b"x")
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName="MLaaS-TenantDetails",
+            KeySchema=[{"AttributeName": "tenantId", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "tenantId", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST")
+        table.put_item(Item={"tenantId": "tenant-1", "tenantTier": "Bronze", "modelVersion": 4})
+        table.put_item(Item={"tenantId": "tenant-2", "tenantTier": "Gold", "modelVersion": 4})
+        monkeypatch.setattr(mme_model_retention, "s3", s3)
+        monkeypatch.setattr(mme_model_retention, "table_tenant_details", table)
+        monkeypatch.setattr(mme_model_retention, "metrics_manager", FakeMetricsManager())
+        monkeypatch.setattr(model_retention, "retained_versions", 2)
+        yield mme_model_retention
+
+
+def artifact_event(key):
+    return {"detail": {"bucket": {"name": "models-bucket"}, "object": {"key": key}}}
+
+
+def test_mme_retention_keeps_the_previously_served_version(mme_retention):
+    report = mme_retention.handler(artifact_event("model_artifacts_mme/tenant-1.model.7.tar.gz"), None)
+
+    assert report["deletedVersions"] == [1, 2]
+
+
+def test_mme_retention_skips_gold_tenants(mme_retention):
+    assert mme_retention.handler(artifact_event("model_artifacts_mme/tenant-2.model.7.tar.gz"), None) is None
+    assert len(mme_retention.s3.list_objects_v2(Bucket="models-bucket", Prefix="model_artifacts_mme/tenant-2.")
+               ["Contents"]) == 7
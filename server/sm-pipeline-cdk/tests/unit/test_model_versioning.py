@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import model_versioning
+
+
+@pytest.fixture
+def table():
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName="MLaaS-TenantDetails",
+            KeySchema=[{"AttributeName": "tenantId", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "tenantId", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST")
+        table.put_item(Item={"tenantId": "tenant-1", "modelVersion": 3})
+        yield table
+
+
+def test_first_allocation_continues_from_the_served_version(table):
+    assert model_versioning.allocate_model_version(table, "tenant-1") == 4
+    assert model_versioning.allocate_model_version(table, "tenant-1") == 5
+    assert model_versioning.current_model_version(table, "tenant-1") == 3
+
+
+def test_concurrent_allocations_never_share_a_version(table):
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        versions = list(executor.map(
+            lambda _: model_versioning.allocate_model_version(table, "tenant-1"), range(50)))
+
+    assert sorted(versions) == list(range(4, 54))
+
+
+def test_allocation_for_unknown_tenant_fails(table):
+    with pytest.raises(KeyError):
+        model_versioning.allocate_model_version(table, "missing")
+    assert "Item" not in table.get_item(Key={"tenantId": "missing"})
+
+
+def test_promotion_is_monotonic(table):
+    assert model_versioning.promote_model_version(table, "tenant-1", 5)
+    assert not model_versioning.promote_model_version(table, "tenant-1", 4)
+    assert model_versioning.current_model_version(table, "tenant-1") == 5
+
+
+def test_candidate_falls_back_to_the_served_version(table):
+    assert model_versioning.candidate_model_version(table, "tenant-1") == 3
+    table.update_item(Key={"tenantId": "tenant-1"}, UpdateExpression="SET candidateModelVersion = :v",
+                      ExpressionAttributeValues={":v": 4})
+    assert model_versioning.candidate_model_version(table, "tenant-1") == 4
+    assert model_versioning.current_model_version(table, "tenant-1") == 3
+
+
+def test_parse_model_version():
+    assert model_versioning.parse_model_version("model_artifacts_mme/tenant-1.model.12.tar.gz") == 12
+    assert model_versioning.parse_model_version("model_artifacts/output/model.tar.gz") is None
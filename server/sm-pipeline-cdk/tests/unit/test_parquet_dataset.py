@@ -0,0 +1,108 @@
+import io
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import dataset_profile
+import dataset_splitter
+import parquet_dataset
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+BUCKET = "sagemaker-bucket"
+TARGET_KEYS = {
+    dataset_splitter.TRAIN: "tenant-1/data/train",
+    dataset_splitter.VALIDATION: "tenant-1/data/validation",
+    dataset_splitter.TEST: "tenant-1/data/test",
+}
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def put_parquet(s3, key, rows, row_group_size):
+    table = pa.table({"label": [i % 2 for i in range(rows)], "feature": [float(i) for i in range(rows)]})
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, row_group_size=row_group_size)
+    s3.put_object(Bucket=BUCKET, Key=key, Body=buffer.getvalue())
+
+
+def test_plan_keeps_whole_row_groups_when_there_are_enough():
+    plan = parquet_dataset.plan_row_groups([100] * 100)
+
+    assert all(len(slices) == 1 for slices in plan)
+    assert sum(1 for slices in plan if slices[0][0] == dataset_splitter.TRAIN) == 70
+
+
+def test_plan_slices_row_groups_when_there_are_few():
+    assert parquet_dataset.plan_row_groups([1000]) == [
+        [(dataset_splitter.TRAIN, 0, 700), (dataset_splitter.VALIDATION, 700, 150), (dataset_splitter.TEST, 850, 150)]]
+
+
+def test_split_parquet_to_csv(s3):
+    put_parquet(s3, "tenant-1/upload.parquet", 1000, row_group_size=10)
+
+    stats = parquet_dataset.split_parquet_objects(
+        s3, [(BUCKET, "tenant-1/upload.parquet")], BUCKET, TARGET_KEYS)
+
+    assert {split: stat["rows"] for split, stat in stats.items()} == {"train": 700, "validation": 150, "test": 150}
+    lines = s3.get_object(Bucket=BUCKET, Key=TARGET_KEYS["test"])["Body"].read().decode().splitlines()
+    assert len(lines) == 150
+    assert lines[0].count(",") == 1
+
+
+def test_split_parquet_to_parquet_merges_sources(s3):
+    put_parquet(s3, "tenant-1/a.parquet", 500, row_group_size=500)
+    put_parquet(s3, "tenant-1/b.parquet", 500, row_group_size=500)
+
+    parquet_dataset.split_parquet_objects(
+        s3, [(BUCKET, "tenant-1/a.parquet"), (BUCKET, "tenant-1/b.parquet")], BUCKET, TARGET_KEYS,
+        output_format=parquet_dataset.PARQUET_FORMAT)
+
+    train = pq.read_table(io.BytesIO(s3.get_object(Bucket=BUCKET, Key=TARGET_KEYS["train"])["Body"].read()))
+    assert train.num_rows == 700
+    assert train.column_names == ["label", "feature"]
+
+
+def test_range_reader_fetches_parts_of_the_object(s3):
+    put_parquet(s3, "tenant-1/upload.parquet", 10000, row_group_size=1000)
+    reader = parquet_dataset.S3RangeReader(s3, BUCKET, "tenant-1/upload.parquet")
+
+    parquet_file = pq.ParquetFile(reader)
+    parquet_file.read_row_group(0, columns=["label"])
+
+    assert parquet_file.metadata.num_rows == 10000
+    assert 0 < reader.requests < 10
+
+
+def test_csv_is_converted_to_parquet_once(s3):
+    s3.put_object(Bucket=BUCKET, Key="tenant-1/upload.csv", Body="".join(f"{i % 2},{i}\n" for i in range(300)))
+
+    rows = parquet_dataset.convert_csv_to_parquet(
+        s3, BUCKET, "tenant-1/upload.csv", BUCKET, "tenant-1/data/parquet/upload.parquet")
+
+    table = pq.read_table(io.BytesIO(
+        s3.get_object(Bucket=BUCKET, Key="tenant-1/data/parquet/upload.parquet")["Body"].read()))
+    assert rows == table.num_rows == 300
+    assert table.column("f1").to_pylist()[:3] == [0, 1, 2]
+
+
+def test_profile_keeps_the_narrowest_row_group():
+    def row_group(columns):
+        buffer = io.BytesIO()
+        pq.write_table(pa.table({f"c{index}": [1.0, 2.0] for index in range(columns)}), buffer)
+        return pq.ParquetFile(io.BytesIO(buffer.getvalue())).metadata.row_group(0)
+
+    profiler = dataset_profile.DatasetProfiler()
+    for columns in (3, 2, 3):
+        parquet_dataset.profile_row_group(profiler, row_group(columns), ["c0", "c1", "c2"])
+
+    profile = profiler.to_dict()
+    assert (profile["rows"], profile["columnCount"], profile["raggedRows"]) == (6, 3, True)
@@ -0,0 +1,77 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from pipeline_resolver import PIPELINE_NAME_SETTING, PipelineNameResolver
+
+
+class FakeCloudFormation:
+    def __init__(self):
+        self.calls = 0
+
+    def describe_stacks(self, StackName):
+        self.calls += 1
+        return {"Stacks": [{"Outputs": [
+            {"OutputKey": "MlaasPoolSagemakerProjectName", "OutputValue": "mlaas-pooled"}]}]}
+
+
+class FakeSageMaker:
+    def __init__(self):
+        self.project_id = "p-1"
+
+    def describe_project(self, ProjectName):
+        return {"ProjectName": ProjectName, "ProjectId": self.project_id}
+
+
+def test_pipeline_name_is_looked_up_once_per_ttl():
+    cf = FakeCloudFormation()
+    resolver = PipelineNameResolver(cf, FakeSageMaker(), ttl_seconds=300)
+
+    assert [resolver.resolve() for _ in range(5)] == ["mlaas-pooled-p-1"] * 5
+    assert cf.calls == 1
+
+
+def test_invalidate_picks_up_a_recreated_project():
+    cf, sm = FakeCloudFormation(), FakeSageMaker()
+    resolver = PipelineNameResolver(cf, sm, ttl_seconds=300)
+    resolver.resolve()
+
+    sm.project_id = "p-2"
+    resolver.invalidate()
+
+    assert resolver.resolve() == "mlaas-pooled-p-2"
+    assert cf.calls == 2
+
+
+def test_pinned_pipeline_name_skips_the_lookup():
+    cf = FakeCloudFormation()
+    resolver = PipelineNameResolver(cf, FakeSageMaker(), pipeline_name="pinned")
+
+    assert resolver.resolve() == "pinned"
+    assert cf.calls == 0
+
+
+@pytest.fixture
+def settings_table():
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        yield dynamodb.create_table(
+            TableName="MLaaS-Setting",
+            KeySchema=[{"AttributeName": "settingName", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "settingName", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST")
+
+
+def test_settings_table_takes_precedence_over_stack_outputs(settings_table):
+    cf = FakeCloudFormation()
+    resolver = PipelineNameResolver(cf, FakeSageMaker(), settings_table=settings_table)
+    settings_table.put_item(Item={"settingName": PIPELINE_NAME_SETTING, "settingValue": "from-settings"})
+
+    assert resolver.resolve() == "from-settings"
+    assert cf.calls == 0
+
+
+def test_missing_setting_falls_back_to_stack_outputs(settings_table):
+    resolver = PipelineNameResolver(FakeCloudFormation(), FakeSageMaker(), settings_table=settings_table)
+
+    assert resolver.resolve() == "mlaas-pooled-p-1"
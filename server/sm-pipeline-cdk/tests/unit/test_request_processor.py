@@ -0,0 +1,175 @@
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+import request_processor
+from request_processor import RuntimeClientCache
+
+
+def test_runtime_client_cache_reuses_client_per_access_key():
+    cache = RuntimeClientCache(max_size=2, ttl_seconds=900)
+
+    first = cache.get_client("AKIA1", "secret", "token")
+    second = cache.get_client("AKIA1", "secret", "token")
+
+    assert first is second
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_runtime_client_cache_evicts_least_recently_used():
+    cache = RuntimeClientCache(max_size=2, ttl_seconds=900)
+
+    client_1 = cache.get_client("AKIA1", "secret", "token")
+    cache.get_client("AKIA2", "secret", "token")
+    cache.get_client("AKIA1", "secret", "token")
+    cache.get_client("AKIA3", "secret", "token")
+
+    assert cache.get_client("AKIA1", "secret", "token") is client_1
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_runtime_client_cache_expires_entries(monkeypatch):
+    cache = RuntimeClientCache(max_size=2, ttl_seconds=900)
+    now = [1000.0]
+    monkeypatch.setattr(request_processor.time, "monotonic", lambda: now[0])
+
+    client_1 = cache.get_client("AKIA1", "secret", "token")
+    now[0] += 901
+
+    assert cache.get_client("AKIA1", "secret", "token") is not client_1
+    assert cache.stats()["misses"] == 2
+
+
+class FakeRuntimeClient:
+    def __init__(self):
+        self.calls = []
+
+    def invoke_endpoint(self, **kwargs):
+        self.calls.append(kwargs)
+        return {"Body": FakeBody(b"0.5")}
+
+
+class FakeBody:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def read(self):
+        return self.payload
+
+
+def inference_event(authorizer_context):
+    authorizer = {
+        "principalId": "tenant-1",
+        "aws_access_key_id": "AKIA1",
+        "aws_secret_access_key": "secret",
+        "aws_session_token": "token",
+    }
+    authorizer.update(authorizer_context)
+    return {"body": "1,2,3", "requestContext": {"authorizer": authorizer}}
+
+
+def test_model_version_from_authorizer_context_skips_tenant_lookup(monkeypatch):
+    client = FakeRuntimeClient()
+    monkeypatch.setattr(request_processor.runtime_client_cache, "get_client", lambda *args: client)
+
+    def fail_lookup(*args, **kwargs):
+        raise AssertionError("tenant details should not be read")
+
+    monkeypatch.setattr(request_processor.tenant_details_cache, "get", fail_lookup)
+
+    response = request_processor.lambda_handler(inference_event({"model_version": "3"}), None)
+
+    assert response["statusCode"] == request_processor.HTTP_OK
+    assert client.calls[0]["TargetModel"] == "tenant-1.model.3.tar.gz"
+
+
+def test_model_version_falls_back_to_tenant_lookup(monkeypatch):
+    client = FakeRuntimeClient()
+    monkeypatch.setattr(request_processor.runtime_client_cache, "get_client", lambda *args: client)
+    monkeypatch.setattr(request_processor.tenant_details_cache, "get", lambda tenant_id: {"modelVersion": 7})
+
+    request_processor.lambda_handler(inference_event({}), None)
+
+    assert client.calls[0]["TargetModel"] == "tenant-1.model.7.tar.gz"
+
+
+def test_runtime_client_cache_never_outlives_credentials(monkeypatch):
+    cache = RuntimeClientCache(max_size=2, ttl_seconds=900)
+    now = [1000.0]
+    monkeypatch.setattr(request_processor.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(request_processor.time, "time", lambda: now[0])
+
+    client_1 = cache.get_client("AKIA1", "secret", "token", 1060)
+    now[0] += 61
+
+    assert cache.get_client("AKIA1", "secret", "token", 1060) is not client_1
+
+
+def test_batch_mode_returns_results_per_row(monkeypatch):
+    class BatchRuntimeClient(FakeRuntimeClient):
+        def invoke_endpoint(self, **kwargs):
+            self.calls.append(kwargs)
+            rows = kwargs["Body"].split("\n")
+            return {"Body": FakeBody("\n".join("0.5" for _ in rows).encode())}
+
+    client = BatchRuntimeClient()
+    monkeypatch.setattr(request_processor.runtime_client_cache, "get_client", lambda *args: client)
+    event = inference_event({"model_version": "3"})
+    event["body"] = "1,2,3\n4,5,6"
+    event["queryStringParameters"] = {"mode": "batch"}
+
+    response = request_processor.lambda_handler(event, None)
+    body = json.loads(response["body"])
+
+    assert body["succeeded"] == 2
+    assert [result["prediction"] for result in body["results"]] == ["0.5", "0.5"]
+
+
+def batch_event(body):
+    event = inference_event({"model_version": "3"})
+    event["body"] = body
+    event["queryStringParameters"] = {"mode": "batch"}
+    return event
+
+
+def test_batch_mode_rejects_a_malformed_body(monkeypatch):
+    monkeypatch.setattr(request_processor.runtime_client_cache, "get_client", lambda *args: FakeRuntimeClient())
+
+    assert request_processor.lambda_handler(batch_event("[1, 2"), None)["statusCode"] == \
+        request_processor.HTTP_BAD_REQUEST
+    assert request_processor.lambda_handler(batch_event("[1, 2]"), None)["statusCode"] == \
+        request_processor.HTTP_BAD_REQUEST
+
+
+def test_batch_mode_reports_rows_rejected_by_the_model(monkeypatch):
+    class RejectingRuntimeClient(FakeRuntimeClient):
+        def invoke_endpoint(self, **kwargs):
+            raise ClientError({"Error": {"Code": "ModelError", "Message": "bad features"},
+                               "OriginalStatusCode": 415}, "InvokeEndpoint")
+
+    monkeypatch.setattr(request_processor.runtime_client_cache, "get_client",
+                        lambda *args: RejectingRuntimeClient())
+
+    response = request_processor.lambda_handler(batch_event("1,2,3\n4,5,6"), None)
+
+    assert response["statusCode"] == request_processor.HTTP_OK
+    assert json.loads(response["body"])["failed"] == 2
+
+
+@pytest.mark.parametrize("code", ["ThrottlingException", "ExpiredTokenException", "InternalFailure"])
+def test_batch_mode_server_errors_drop_the_cached_client(monkeypatch, code):
+    class FailingRuntimeClient(FakeRuntimeClient):
+        def invoke_endpoint(self, **kwargs):
+            raise ClientError({"Error": {"Code": code, "Message": "failed"}}, "InvokeEndpoint")
+
+    invalidated = []
+    monkeypatch.setattr(request_processor.runtime_client_cache, "get_client", lambda *args: FailingRuntimeClient())
+    monkeypatch.setattr(request_processor.runtime_client_cache, "invalidate", invalidated.append)
+
+    response = request_processor.lambda_handler(batch_event("1,2,3\n4,5,6"), None)
+
+    assert response["statusCode"] == request_processor.HTTP_INTERNAL_ERROR
+    assert invalidated == ["AKIA1"]
@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from s3_multipart_writer import MIN_PART_SIZE, S3MultipartWriter
+
+BUCKET = "tenant-bucket"
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def test_multipart_writer_uploads_parts(s3):
+    payload = b"x" * (MIN_PART_SIZE + 1024)
+
+    with S3MultipartWriter(s3, BUCKET, "big.bin", part_size=MIN_PART_SIZE) as writer:
+        writer.write(payload[:MIN_PART_SIZE // 2])
+        writer.write(payload[MIN_PART_SIZE // 2:])
+
+    assert writer.upload_id is not None
+    assert s3.get_object(Bucket=BUCKET, Key="big.bin")["Body"].read() == payload
+
+
+def test_multipart_writer_uploads_parts_in_background(s3):
+    payload = bytes(range(256)) * (3 * MIN_PART_SIZE // 256 + 100)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        with S3MultipartWriter(s3, BUCKET, "async.bin", part_size=MIN_PART_SIZE, executor=executor) as writer:
+            for offset in range(0, len(payload), 1024 * 1024):
+                writer.write(payload[offset:offset + 1024 * 1024])
+
+    assert [part["PartNumber"] for part in writer._parts] == [1, 2, 3, 4]
+    assert s3.get_object(Bucket=BUCKET, Key="async.bin")["Body"].read() == payload
+
+
+def test_multipart_writer_aborts_on_error(s3):
+    with pytest.raises(RuntimeError):
+        with S3MultipartWriter(s3, BUCKET, "aborted.bin", part_size=MIN_PART_SIZE) as writer:
+            writer.write(b"x" * MIN_PART_SIZE)
+            raise RuntimeError("interrupted")
+
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET, Prefix="aborted.bin")
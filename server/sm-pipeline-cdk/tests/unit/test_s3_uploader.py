@@ -0,0 +1,116 @@
+import json
+
+import boto3
+import pytest
+import requests
+from moto import mock_aws
+
+import s3_uploader
+
+BUCKET = "tenant-bucket"
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def api_event(resource="/upload", method="PUT", headers=None, body=None):
+    return {
+        "resource": resource,
+        "httpMethod": method,
+        "headers": headers or {},
+        "body": body,
+        "requestContext": {"authorizer": {
+            "principalId": "tenant-1",
+            "bucket": BUCKET,
+            "aws_access_key_id": "testing",
+            "aws_secret_access_key": "testing",
+            "aws_session_token": "testing",
+        }},
+    }
+
+
+def start_upload(headers):
+    response = s3_uploader.lambda_handler(api_event(headers=dict({"upload-mode": "multipart"}, **headers)), None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_part_size_grows_to_stay_within_the_part_limit():
+    assert s3_uploader.choose_part_size(100) == s3_uploader.DEFAULT_PART_SIZE
+    assert s3_uploader.choose_part_size(100, 1024) == s3_uploader.MIN_PART_SIZE
+    assert s3_uploader.choose_part_size(10 ** 12) == 10 ** 8
+
+
+def test_presigned_multipart_upload_round_trip(s3):
+    payload = b"1,2\n" * (3 * 1024 * 1024)
+    status, upload = start_upload({"file-name": "train.csv", "file-size": str(len(payload)),
+                                   "part-size": str(s3_uploader.MIN_PART_SIZE)})
+    assert status == 200
+    assert [part["partNumber"] for part in upload["parts"]] == [1, 2, 3]
+
+    parts = []
+    for part in upload["parts"]:
+        offset = (part["partNumber"] - 1) * upload["partSize"]
+        put = requests.put(part["url"], data=payload[offset:offset + upload["partSize"]])
+        parts.append({"partNumber": part["partNumber"], "etag": put.headers["ETag"]})
+
+    response = s3_uploader.lambda_handler(api_event("/upload/complete", "POST", body=json.dumps(
+        {"uploadId": upload["uploadId"], "fileName": "train.csv", "parts": parts[::-1]})), None)
+
+    assert response["statusCode"] == 200
+    assert s3.get_object(Bucket=BUCKET, Key="tenant-1/train.csv")["Body"].read() == payload
+
+
+def test_part_urls_can_be_signed_again(s3):
+    _, upload = start_upload({"file-name": "train.csv", "file-size": str(20 * 1024 * 1024)})
+
+    _, refreshed = start_upload({"file-name": "train.csv", "upload-id": upload["uploadId"], "part-numbers": "1"})
+
+    assert refreshed["uploadId"] == upload["uploadId"]
+    assert [part["partNumber"] for part in refreshed["parts"]] == [1]
+
+
+def test_abort_removes_the_upload(s3):
+    _, upload = start_upload({"file-name": "data.csv", "file-type": "inference", "file-size": "10"})
+
+    response = s3_uploader.lambda_handler(api_event("/upload/complete", "DELETE", body=json.dumps(
+        {"uploadId": upload["uploadId"], "fileName": "data.csv", "fileType": "inference"})), None)
+
+    assert response["statusCode"] == 200
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+
+
+def test_missing_file_size_is_rejected(s3):
+    status, _ = start_upload({"file-name": "train.csv"})
+
+    assert status == 400
+
+
+@pytest.mark.parametrize("body", [{"uploadId": "upload-1", "fileName": "train.csv"},
+                                  {"uploadId": "upload-1", "fileName": "train.csv", "parts": [{"partNumber": 1}]},
+                                  {"uploadId": "upload-1", "fileName": "train.csv", "parts": [{"etag": "e"}]}])
+def test_malformed_completion_is_rejected(s3, body):
+    response = s3_uploader.lambda_handler(api_event("/upload/complete", "POST", body=json.dumps(body)), None)
+
+    assert response["statusCode"] == 400
+
+
+def test_abort_of_an_unknown_upload_is_a_client_error(s3):
+    response = s3_uploader.lambda_handler(api_event("/upload/complete", "DELETE", body=json.dumps(
+        {"uploadId": "missing", "fileName": "train.csv"})), None)
+
+    assert response["statusCode"] == 404
+    assert "NoSuchUpload" in json.loads(response["body"])["message"]
+
+
+def test_completion_with_an_unknown_part_is_a_client_error(s3):
+    _, upload = start_upload({"file-name": "train.csv", "file-size": "10"})
+
+    response = s3_uploader.lambda_handler(api_event("/upload/complete", "POST", body=json.dumps(
+        {"uploadId": upload["uploadId"], "fileName": "train.csv", "parts": [{"partNumber": 1, "etag": "e"}]})), None)
+
+    assert response["statusCode"] == 400
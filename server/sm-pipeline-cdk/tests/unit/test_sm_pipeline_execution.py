@@ -0,0 +1,106 @@
+import threading
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import sm_pipeline_execution
+
+SOURCE_BUCKET = "tenant-bucket"
+SM_BUCKET = "sagemaker-bucket"
+
+
+class FakePipelineResolver:
+    """Resolves the pipeline name only once the tenant session exists, i.e. concurrently with it"""
+
+    def __init__(self):
+        self.tenant_session_created = threading.Event()
+        self.overlapped = None
+
+    def resolve(self):
+        self.overlapped = self.tenant_session_created.wait(timeout=5)
+        return "tenant-pipeline"
+
+    def invalidate(self):
+        pass
+
+
+class FakeSageMaker:
+
+    def __init__(self):
+        self.executions = []
+
+    def start_pipeline_execution(self, PipelineName, PipelineParameters):
+        self.executions.append((PipelineName, {p['Name']: p['Value'] for p in PipelineParameters}))
+        return {'PipelineExecutionArn': 'arn:aws:sagemaker:execution/1'}
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=SOURCE_BUCKET)
+        s3.create_bucket(Bucket=SM_BUCKET)
+        table = boto3.resource("dynamodb", region_name="us-east-1").create_table(
+            TableName="MLaaS-TenantDetails",
+            KeySchema=[{"AttributeName": "tenantId", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "tenantId", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        table.put_item(Item={'tenantId': 'tenant-1', 'tenantTier': 'BASIC', 's3BucketTenantRole': 'tenant-role',
+                             'sagemakerS3Bucket': SM_BUCKET, 'modelVersion': 3, 'modelVersionCounter': 3})
+
+        resolver = FakePipelineResolver()
+        sagemaker = FakeSageMaker()
+
+        def create_temp_tenant_session(*args):
+            resolver.tenant_session_created.set()
+            return boto3.Session(region_name="us-east-1")
+
+        monkeypatch.setenv("dynamodb_access_role_arn", "dynamodb-role")
+        monkeypatch.setenv("tenant_type", "pooled")
+        monkeypatch.setattr(sm_pipeline_execution, "create_temp_tenant_session", create_temp_tenant_session)
+        monkeypatch.setattr(sm_pipeline_execution, "pipeline_resolver", resolver)
+        monkeypatch.setattr(sm_pipeline_execution, "sm", sagemaker)
+        monkeypatch.setattr(sm_pipeline_execution.dataset_profile, "record_profile_metrics", lambda *args: None)
+        yield s3, resolver, sagemaker
+
+
+def test_upload_without_training_data_keeps_the_model_version(monkeypatch):
+    allocated = []
+    monkeypatch.setattr(sm_pipeline_execution.model_versioning, "allocate_model_version",
+                        lambda table, tenant_id: allocated.append(tenant_id))
+    monkeypatch.setattr(sm_pipeline_execution, "create_temp_tenant_session",
+                        lambda *args: (_ for _ in ()).throw(AssertionError("tenant session created")))
+
+    assert sm_pipeline_execution.start_training("tenant-bucket", "tenant-1", ["tenant-1/notes.txt"]) is None
+    assert allocated == []
+
+
+def test_pipeline_lookup_runs_while_the_tenant_is_read(aws):
+    s3, resolver, sagemaker = aws
+    s3.put_object(Bucket=SOURCE_BUCKET, Key="tenant-1/data.csv",
+                  Body="".join(f"{row},{row * 2}\n" for row in range(100)).encode())
+
+    sm_pipeline_execution.start_training(SOURCE_BUCKET, "tenant-1", ["tenant-1/data.csv"])
+
+    assert resolver.overlapped
+    [(pipeline_name, parameters)] = sagemaker.executions
+    assert pipeline_name == "tenant-pipeline"
+    assert parameters['ModelVersion'] == "4"
+    assert parameters['TrainDataPath'] == f"s3://{SM_BUCKET}/tenant-1/data/train.csv"
+
+
+def test_split_failure_aborts_the_split_uploads(aws):
+    s3, _, sagemaker = aws
+    # large enough for the train split to start its multipart upload before the missing file is read
+    row = b"1," + b"x" * 1022 + b"\n"
+    s3.put_object(Bucket=SOURCE_BUCKET, Key="tenant-1/large.csv", Body=row * (16 * 1024))
+
+    with pytest.raises(IOError):
+        sm_pipeline_execution.start_training(SOURCE_BUCKET, "tenant-1",
+                                             ["tenant-1/large.csv", "tenant-1/missing.csv"])
+
+    assert s3.list_multipart_uploads(Bucket=SM_BUCKET).get("Uploads", []) == []
+    assert "Contents" not in s3.list_objects_v2(Bucket=SM_BUCKET, Prefix="tenant-1/data/")
+    assert sagemaker.executions == []
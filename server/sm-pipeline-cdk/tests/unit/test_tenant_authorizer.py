@@ -0,0 +1,107 @@
+import datetime
+import threading
+
+import pytest
+
+import tenant_authorizer
+from authorizer_layer import SessionParameters
+
+
+@pytest.fixture
+def fake_assume_role(monkeypatch):
+    calls = []
+
+    def assume_role(access_role_arn, tenant_id):
+        calls.append(tenant_id)
+        expiration = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=900)
+        return SessionParameters(f"AKIA{len(calls)}", "secret", "token"), expiration.timestamp()
+
+    monkeypatch.setattr(tenant_authorizer, "assume_role", assume_role)
+    monkeypatch.setattr(tenant_authorizer.metrics_manager, "record_tenant_metric", lambda *args: None)
+    return calls
+
+
+def test_credentials_reused_until_safety_margin(fake_assume_role, monkeypatch):
+    cache = tenant_authorizer.TenantCredentialsCache(safety_margin_seconds=300)
+
+    first, _ = cache.get_credentials("role", "tenant-1")
+    second, _ = cache.get_credentials("role", "tenant-1")
+    assert first is second
+    assert cache.sts_calls == 1
+    assert cache.sts_calls_saved == 1
+
+    later = tenant_authorizer.time.time() + 601
+    monkeypatch.setattr(tenant_authorizer.time, "time", lambda: later)
+    third, _ = cache.get_credentials("role", "tenant-1")
+
+    assert third is not first
+    assert cache.sts_calls == 2
+
+
+def test_credentials_are_per_tenant(fake_assume_role):
+    cache = tenant_authorizer.TenantCredentialsCache(safety_margin_seconds=300)
+
+    cache.get_credentials("role", "tenant-1")
+    cache.get_credentials("role", "tenant-2")
+
+    assert fake_assume_role == ["tenant-1", "tenant-2"]
+
+
+def test_concurrent_refreshes_are_single_flighted(fake_assume_role):
+    cache = tenant_authorizer.TenantCredentialsCache(safety_margin_seconds=300)
+    threads = [threading.Thread(target=cache.get_credentials, args=("role", "tenant-1")) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert fake_assume_role == ["tenant-1"]
+    assert cache.sts_calls_saved == 7
+
+
+def test_cached_policy_covers_every_route_of_the_stage():
+    method_arn = "arn:aws:execute-api:us-east-1:123456789012:abc123/v1/PUT/upload"
+
+    assert tenant_authorizer.api_wildcard_arn(method_arn) == "arn:aws:execute-api:us-east-1:123456789012:abc123/v1/*"
+
+
+@pytest.fixture
+def authorizer_event(monkeypatch):
+    """A valid token for tenant-1, with credentials from a fake AssumeRole and the real metrics_manager"""
+    def assume_role(access_role_arn, tenant_id):
+        expiration = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=900)
+        return SessionParameters("AKIA", "secret", "token"), expiration.timestamp()
+
+    claims = {"sub": "user", "cognito:username": "user", "custom:tenantId": "tenant-1", "custom:userRole": "User"}
+    monkeypatch.setattr(tenant_authorizer, "assume_role", assume_role)
+    monkeypatch.setattr(tenant_authorizer, "tenant_credentials_cache",
+                        tenant_authorizer.TenantCredentialsCache(safety_margin_seconds=300))
+    monkeypatch.setattr(tenant_authorizer.jwt, "get_unverified_claims", lambda token: claims)
+    monkeypatch.setattr(tenant_authorizer.tenant_details_cache, "get", lambda tenant_id: {
+        "userPoolId": "pool", "appClientId": "client", "tenantTier": "Bronze", "s3Bucket": "bucket",
+        "modelVersion": 3})
+    monkeypatch.setattr(tenant_authorizer.jwks_cache, "key_resolver", lambda userpool_id: [])
+    monkeypatch.setattr(tenant_authorizer.authorizer_layer, "validateJWT", lambda token, client, keys: claims)
+    return {"authorizationToken": "Bearer token",
+            "methodArn": "arn:aws:execute-api:us-east-1:123456789012:abc123/v1/PUT/upload"}
+
+
+class FakeContext:
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:authorizer"
+
+
+def effect_of(policy):
+    return policy["policyDocument"]["Statement"][0]["Effect"]
+
+
+def test_metrics_without_namespace_do_not_deny_the_request(authorizer_event, monkeypatch):
+    monkeypatch.setattr(tenant_authorizer.metrics_manager.metrics, "namespace", None)
+
+    assert effect_of(tenant_authorizer.lambda_handler(authorizer_event, FakeContext())) == "Allow"
+
+
+def test_metrics_are_emitted_with_the_configured_namespace(authorizer_event, monkeypatch, capsys):
+    monkeypatch.setattr(tenant_authorizer.metrics_manager.metrics, "namespace", "MLaaS")
+
+    assert effect_of(tenant_authorizer.lambda_handler(authorizer_event, FakeContext())) == "Allow"
+    assert '"STSAssumeRoleCalls"' in capsys.readouterr().out
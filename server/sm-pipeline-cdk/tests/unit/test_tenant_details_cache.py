@@ -0,0 +1,59 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from tenant_details_cache import TenantDetailsCache
+
+
+@pytest.fixture
+def tenant_details_table():
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName="MLaaS-TenantDetails",
+            KeySchema=[{"AttributeName": "tenantId", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "tenantId", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        table.put_item(Item={"tenantId": "tenant-1", "modelVersion": 1})
+        yield table
+
+
+def test_get_reads_through_once(tenant_details_table):
+    cache = TenantDetailsCache(tenant_details_table)
+
+    assert cache.get("tenant-1")["modelVersion"] == 1
+    tenant_details_table.put_item(Item={"tenantId": "tenant-1", "modelVersion": 2})
+
+    assert cache.get("tenant-1")["modelVersion"] == 1
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_unknown_tenant_is_negatively_cached(tenant_details_table):
+    cache = TenantDetailsCache(tenant_details_table)
+
+    assert cache.get("missing") is None
+    tenant_details_table.put_item(Item={"tenantId": "missing", "modelVersion": 0})
+
+    assert cache.get("missing") is None
+    assert cache.hits == 1
+
+
+def test_min_version_refreshes_stale_item(tenant_details_table):
+    cache = TenantDetailsCache(tenant_details_table, version_attribute="modelVersion")
+
+    cache.get("tenant-1")
+    tenant_details_table.put_item(Item={"tenantId": "tenant-1", "modelVersion": 2})
+
+    assert cache.get("tenant-1", min_version=2)["modelVersion"] == 2
+
+
+def test_bounded_size_and_invalidate(tenant_details_table):
+    cache = TenantDetailsCache(tenant_details_table, max_size=1)
+
+    cache.get("tenant-1")
+    cache.get("missing")
+    assert cache.stats()["size"] == 1
+
+    cache.invalidate()
+    assert cache.stats()["size"] == 0
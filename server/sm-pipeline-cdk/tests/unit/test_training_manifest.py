@@ -0,0 +1,53 @@
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import dataset_splitter
+import training_manifest
+
+BUCKET = "sagemaker-bucket"
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def write_shards(s3, version):
+    keys = training_manifest.shard_keys("tenant-1", version, dataset_splitter.SPLITS, "csv")
+    for key in keys.values():
+        s3.put_object(Bucket=BUCKET, Key=key, Body=b"1,2\n")
+    return keys
+
+
+def test_shards_are_versioned_per_run():
+    assert training_manifest.shard_keys("tenant-1", 7, ["train"], "csv") == {
+        "train": "tenant-1/data/shards/v7/train.csv"}
+
+
+def test_manifest_lists_every_shard_in_version_order(s3):
+    for version in (2, 10, 1):
+        write_shards(s3, version)
+    s3.put_object(Bucket=BUCKET, Key="tenant-2/data/shards/v3/train.csv", Body=b"1,2\n")
+
+    uris = training_manifest.write_manifests(s3, BUCKET, "tenant-1", 10, dataset_splitter.SPLITS, "csv")
+
+    assert uris["train"] == f"s3://{BUCKET}/tenant-1/data/manifests/v10/train.manifest"
+    manifest = json.loads(s3.get_object(Bucket=BUCKET, Key="tenant-1/data/manifests/v10/train.manifest")["Body"].read())
+    assert manifest == [{"prefix": f"s3://{BUCKET}/tenant-1/data/shards/"},
+                        "v1/train.csv", "v2/train.csv", "v10/train.csv"]
+
+
+def test_earlier_manifests_are_left_untouched(s3):
+    write_shards(s3, 1)
+    training_manifest.write_manifests(s3, BUCKET, "tenant-1", 1, dataset_splitter.SPLITS, "csv")
+    write_shards(s3, 2)
+    training_manifest.write_manifests(s3, BUCKET, "tenant-1", 2, dataset_splitter.SPLITS, "csv")
+
+    first = json.loads(s3.get_object(Bucket=BUCKET, Key="tenant-1/data/manifests/v1/test.manifest")["Body"].read())
+    assert first[1:] == ["v1/test.csv"]
@@ -0,0 +1,146 @@
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import sm_pipeline_execution
+import upload_coalescing
+
+
+def upload_record(message_id, key, sent_at):
+    body = {"detail": {"bucket": {"name": "tenant-bucket"}, "object": {"key": key}}}
+    return {"messageId": message_id, "body": json.dumps(body),
+            "attributes": {"SentTimestamp": str(int(sent_at * 1000))}}
+
+
+def test_uploads_are_grouped_and_deduplicated_per_tenant():
+    records = [
+        upload_record("m1", "tenant-1/a.csv", 100),
+        upload_record("m2", "tenant-2/a.csv", 101),
+        upload_record("m3", "tenant-1/b.csv", 105),
+        upload_record("m4", "tenant-1/a.csv", 106),
+        upload_record("m5", "tenant-1/inference/input/c.csv", 107),
+    ]
+
+    pending = upload_coalescing.group_upload_records(records)
+
+    assert sorted(pending) == ["tenant-1", "tenant-2"]
+    assert pending["tenant-1"].object_keys == ["tenant-1/a.csv", "tenant-1/b.csv"]
+    assert pending["tenant-1"].last_upload_at == 106
+    assert pending["tenant-1"].message_ids == ["m1", "m3", "m4"]
+
+
+def requeued_record(message_id, tenant_id, last_upload_at):
+    requeued = upload_coalescing.PendingUploads(tenant_id, "tenant-bucket")
+    return {"messageId": message_id, "body": requeued.to_message(last_upload_at),
+            "attributes": {"SentTimestamp": "220000"}}
+
+
+def test_requeued_message_merges_with_new_uploads():
+    records = [requeued_record("m2", "tenant-1", 100), upload_record("m3", "tenant-1/c.csv", 150)]
+
+    pending = upload_coalescing.group_upload_records(records)["tenant-1"]
+
+    assert pending.object_keys == ["tenant-1/c.csv"]
+    assert pending.last_upload_at == 150
+    assert pending.message_ids == ["m2", "m3"]
+
+
+def test_debounce_delay_waits_for_the_window_to_close():
+    assert upload_coalescing.debounce_delay(100, 130, debounce_seconds=120) == 90
+    assert upload_coalescing.debounce_delay(100, 220, debounce_seconds=120) == 0
+    assert upload_coalescing.debounce_delay(100, 100, debounce_seconds=3600) == upload_coalescing.MAX_DELAY_SECONDS
+
+
+class FakeSqs:
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, QueueUrl, MessageBody, DelaySeconds):
+        self.messages.append((json.loads(MessageBody), DelaySeconds))
+
+
+@pytest.fixture
+def table():
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName="MLaaS-TenantDetails",
+            KeySchema=[{"AttributeName": "tenantId", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "tenantId", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST")
+        for tenant_id in ("tenant-1", "tenant-2"):
+            table.put_item(Item={"tenantId": tenant_id})
+        yield table
+
+
+@pytest.fixture
+def pipeline(monkeypatch, table):
+    """The handler with its clock, queue and training run faked, returns them"""
+    class Pipeline:
+        now = 10_000
+        sqs = FakeSqs()
+        trained = []
+        failing_tenants = set()
+
+    def start_training(bucket_name, tenant_id, object_keys):
+        if tenant_id in Pipeline.failing_tenants:
+            raise RuntimeError("boom")
+        Pipeline.trained.append((tenant_id, object_keys))
+
+    monkeypatch.setattr(sm_pipeline_execution.time, "time", lambda: Pipeline.now)
+    monkeypatch.setattr(sm_pipeline_execution, "sqs", Pipeline.sqs)
+    monkeypatch.setattr(sm_pipeline_execution, "tenant_details_table", lambda tenant_id: table)
+    monkeypatch.setattr(sm_pipeline_execution, "start_training", start_training)
+    return Pipeline
+
+
+def test_handler_trains_quiet_tenants_once_and_requeues_busy_ones(pipeline):
+    now = pipeline.now
+    records = [upload_record(f"q{i}", f"tenant-1/{i:02}.csv", now - 600 + i) for i in range(20)]
+    records.append(upload_record("b1", "tenant-2/x.csv", now - 10))
+
+    response = sm_pipeline_execution.handler({"Records": records}, None)
+
+    assert pipeline.trained == [("tenant-1", [f"tenant-1/{i:02}.csv" for i in range(20)])]
+    assert pipeline.sqs.messages == [({"tenantId": "tenant-2", "bucketName": "tenant-bucket", "lastUploadAt": now - 10},
+                                      upload_coalescing.UPLOAD_DEBOUNCE_SECONDS - 10)]
+    assert response == {"batchItemFailures": []}
+
+
+def test_burst_spread_over_batches_is_trained_once(pipeline):
+    now = pipeline.now
+    # two pollers receive parts of the same burst
+    sm_pipeline_execution.handler({"Records": [upload_record("m1", "tenant-1/a.csv", now - 30)]}, None)
+    sm_pipeline_execution.handler({"Records": [upload_record("m2", "tenant-1/b.csv", now - 20),
+                                               upload_record("m3", "tenant-1/c.csv", now - 5)]}, None)
+    # an upload delivered late, after a later one was recorded
+    sm_pipeline_execution.handler({"Records": [upload_record("m4", "tenant-1/d.csv", now - 25)]}, None)
+    assert [message["lastUploadAt"] for message, _ in pipeline.sqs.messages] == [now - 30, now - 5]
+
+    pipeline.now = now + upload_coalescing.UPLOAD_DEBOUNCE_SECONDS
+    requeued = [{"messageId": f"r{i}", "body": json.dumps(message), "attributes": {"SentTimestamp": "0"}}
+                for i, (message, _) in enumerate(pipeline.sqs.messages)]
+    for record in requeued:
+        sm_pipeline_execution.handler({"Records": [record]}, None)
+    # a second delivery of the winning message
+    sm_pipeline_execution.handler({"Records": [requeued[-1]]}, None)
+
+    assert pipeline.trained == [("tenant-1", ["tenant-1/a.csv", "tenant-1/b.csv", "tenant-1/c.csv",
+                                              "tenant-1/d.csv"])]
+
+
+def test_handler_reports_only_the_failed_tenant(pipeline):
+    pipeline.failing_tenants.add("tenant-2")
+    records = [upload_record("m1", "tenant-1/a.csv", 0), upload_record("m2", "tenant-2/a.csv", 0)]
+
+    response = sm_pipeline_execution.handler({"Records": records}, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "m2"}]}
+    assert pipeline.trained == [("tenant-1", ["tenant-1/a.csv"])]
+
+    # the failed uploads stay pending for the retried message
+    pipeline.failing_tenants.clear()
+    sm_pipeline_execution.handler({"Records": [requeued_record("m2", "tenant-2", 0)]}, None)
+    assert pipeline.trained[-1] == ("tenant-2", ["tenant-2/a.csv"])
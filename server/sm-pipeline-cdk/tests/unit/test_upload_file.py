@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import upload_file
+
+PART_SIZE = 1024
+
+
+class FakeUploadApi:
+    """Local stand-in of the upload API and of the presigned part URLs it hands out"""
+
+    def __init__(self):
+        self.parts = {}
+        self.part_puts = []
+        self.failures = {}
+        self.completed = None
+        self.lock = threading.Lock()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_PUT(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self.path.startswith('/part/'):
+                    return api.put_part(self, int(self.path.rsplit('/', 1)[1]), body)
+                upload_id = self.headers.get('upload-id')
+                if upload_id:
+                    part_numbers = [int(number) for number in self.headers['part-numbers'].split(',')]
+                else:
+                    upload_id = 'upload-1'
+                    file_size = int(self.headers['file-size'])
+                    part_numbers = range(1, -(-file_size // PART_SIZE) + 1)
+                api.respond(self, 200, {
+                    'uploadId': upload_id, 'partSize': PART_SIZE,
+                    'parts': [{'partNumber': number, 'url': f"{api.url}part/{number}"} for number in part_numbers]})
+
+            def do_POST(self):
+                api.completed = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                api.respond(self, 200, {'message': 'uploaded'})
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def put_part(self, handler, part_number, body):
+        with self.lock:
+            self.part_puts.append(part_number)
+            status = self.failures.get(part_number, [])
+            status = status.pop(0) if status else 200
+        if status != 200:
+            return self.respond(handler, status, {'message': 'failed'})
+        self.parts[part_number] = body
+        handler.send_response(200)
+        handler.send_header('ETag', f'"etag-{part_number}"')
+        handler.send_header('Content-Length', '0')
+        handler.end_headers()
+
+    @staticmethod
+    def respond(handler, status, body):
+        data = json.dumps(body).encode()
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def assembled(self):
+        return b''.join(self.parts[part['partNumber']] for part in self.completed['parts'])
+
+
+@pytest.fixture
+def api():
+    fake_api = FakeUploadApi()
+    yield fake_api
+    fake_api.server.shutdown()
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'train.csv'
+    path.write_bytes(os.urandom(PART_SIZE * 9 + 100))
+    return str(path)
+
+
+def uploader(api, **kwargs):
+    return upload_file.MultipartUploader(api.url, 'jwt', concurrency=4, backoff_seconds=0, **kwargs)
+
+
+def test_uploads_parts_concurrently_and_completes(api, data_file):
+    uploader(api).upload(data_file, 'training')
+
+    assert api.completed['uploadId'] == 'upload-1'
+    assert [part['partNumber'] for part in api.completed['parts']] == list(range(1, 11))
+    assert api.assembled() == open(data_file, 'rb').read()
+    assert not os.path.exists(data_file + '.upload.json')
+
+
+def test_retries_failed_parts(api, data_file):
+    api.failures = {3: [500, 503], 7: [403]}
+
+    uploader(api).upload(data_file, 'training')
+
+    assert api.part_puts.count(3) == 3
+    assert api.part_puts.count(7) == 2
+    assert api.assembled() == open(data_file, 'rb').read()
+
+
+def test_resumes_from_checkpoint(api, data_file):
+    api.failures = {5: [500] * 10}
+    with pytest.raises(Exception):
+        uploader(api, retries=1).upload(data_file, 'training')
+    checkpoint = json.load(open(data_file + '.upload.json'))
+    assert '5' not in checkpoint['etags'] and len(checkpoint['etags']) == 9
+    api.failures = {}
+    api.part_puts.clear()
+
+    uploader(api).upload(data_file, 'training')
+
+    assert api.part_puts == [5]
+    assert api.assembled() == open(data_file, 'rb').read()
+    assert not os.path.exists(data_file + '.upload.json')
+
+
+def test_ignores_checkpoint_of_changed_file(api, data_file):
+    upload_file.UploadCheckpoint(data_file + '.upload.json').save(
+        {'fileName': 'train.csv', 'fileType': 'training', 'fileSize': 1, 'modifiedNs': 0, 'etags': {}})
+
+    uploader(api).upload(data_file, 'training')
+
+    assert sorted(api.part_puts) == list(range(1, 11))